@@ -1,7 +1,10 @@
 __all__ = [
+    "archive",
+    "bundle",
     "checkout",
     "commit",
     "fetch",
     "interrogate",
     "execute",
+    "stats",
     ]
@@ -0,0 +1,35 @@
+from pathlib import Path
+from lib.command import GripCommandBase, ParsedCommand
+from lib.options import Options
+from lib.archive import GripArchive
+from typing import Optional
+
+#c archive
+class archive(GripCommandBase):
+    """
+    Create a source archive of the grip repo and its subrepos
+
+    The archive is a tar file (or a compressed tar file) of the files of
+    the grip repo at its head and of each subrepo at the changeset in
+    the state, at their paths in the grip repo, without any .git
+    directories. The 'git archive' of each repository is run
+    concurrently, and the results streamed in to the archive.
+    """
+    names = ["archive"]
+    command_options = {
+        ("file",):            {"help":"archive file to create; the format is determined by the suffix (.tar, .tar.gz, .tar.xz, .tar.bz2, .tar.zst) unless --format is given"},
+        ("--format",):        {"dest":"archive_format", "choices":GripArchive.formats, "default":None, "help":"format of the archive"},
+        ("--prefix",):        {"dest":"prefix", "default":None, "help":"directory in the archive for the grip repo (default is the archive file name without its suffix)"},
+        ("-j", "--jobs"):     {"dest":"jobs", "type":int, "default":None, "help":"number of repositories to archive concurrently"},
+    }
+    class ArchiveOptions(Options):
+        file           : str
+        archive_format : Optional[str]
+        prefix         : Optional[str]
+        jobs           : Optional[int]
+    options : ArchiveOptions
+    def execute(self, cmd:ParsedCommand) -> Optional[int]:
+        self.get_grip_repo()
+        self.grip_repo.archive(path=Path(self.options.file), format=self.options.archive_format, prefix=self.options.prefix, jobs=self.options.jobs)
+        return 0
+    pass
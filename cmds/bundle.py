@@ -0,0 +1,35 @@
+from pathlib import Path
+from lib.command import GripCommandBase, ParsedCommand
+from lib.options import Options
+from typing import Optional
+
+#c bundle
+class bundle(GripCommandBase):
+    """
+    Create a grip bundle of the grip repo and its subrepos
+
+    A grip bundle is a single file containing a git bundle of the grip
+    repo and of every subrepo at the changesets of its state, so that
+    the grip repo can be checked out with 'grip checkout --from-bundle'
+    without access to any of the remotes. With '--since' the git
+    bundles only contain what is new since a previous grip bundle; a
+    checkout then requires that bundle and the new one, in order.
+    """
+    names = ["bundle"]
+    command_options = {
+        ("action",):    {"choices":["create"], "help":"bundle action to perform"},
+        ("file",):      {"help":"grip bundle file to create"},
+        ("--since",):   {"dest":"since", "default":None, "help":"previous grip bundle to create an incremental bundle from"},
+    }
+    class BundleOptions(Options):
+        action : str
+        file   : str
+        since  : Optional[str]
+    options : BundleOptions
+    def execute(self, cmd:ParsedCommand) -> Optional[int]:
+        self.get_grip_repo()
+        since = None
+        if self.options.since is not None: since = Path(self.options.since)
+        self.grip_repo.create_bundle(path=Path(self.options.file), since=since)
+        return 0
+    pass
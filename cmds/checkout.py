@@ -1,8 +1,10 @@
 import os
 from pathlib import Path
 import lib.grip
+from lib.bundle import GripBundle
 from lib.command import GripCommandBase, ParsedCommand
 from lib.options import Options
+from lib.exceptions import UserError
 from typing import Optional, List
 
 class clone(GripCommandBase):
@@ -11,25 +13,55 @@ class clone(GripCommandBase):
     """
     names = ["checkout"]
     command_options = {
-        ("repo_url",):      {"help":'repository to clone'},
+        ("repo_url",):      {"help":'repository to clone (with --worktree-of or --from-bundle, the destination name)'},
         ("checkoutname",):  {"nargs":"?", "help":'destination name', "default":None},
         ("--config",):      {"dest":"config", "help":"specify a configuration to check out", "default":None},
         ("--branch",):      {"dest":"branch", "help":"specify a git branch of the main grip repo to check out", "default":None},
+        ("--mirror",):      {"dest":"mirror", "action":"store_true", "default":False, "help":"clone using local mirrors of the repositories (in ~/.cache/grip/mirrors, or $GRIP_MIRROR_DIR) as references"},
+        ("--mirror-dir",):  {"dest":"mirror_dir", "default":None, "help":"clone using local mirrors of the repositories in this directory as references"},
+        ("--dissociate",):  {"dest":"dissociate", "action":"store_true", "default":False, "help":"copy objects from mirrors so that the clones do not depend on them"},
+        ("--worktree-of",): {"dest":"worktree_of", "default":None, "help":"create the grip repo and its subrepos as git worktrees of those of an existing grip repo checkout, sharing their object stores and fetches"},
+        ("--from-bundle",): {"dest":"from_bundle", "action":"append", "default":None, "help":"create the grip repo and its subrepos from a grip bundle file without contacting their remotes; give it again for each incremental bundle, in order"},
     }
     class CloneOptions(Options):
         repo_url    : str
+        worktree_of  : Optional[str]
+        from_bundle  : Optional[List[str]]
         checkoutname : Optional[str]
         config       : Optional[str]
         branch       : Optional[str]
     options : CloneOptions
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
-        repo_url     = self.options.repo_url.rstrip('/')
         checkoutname = self.options.checkoutname
-        if checkoutname is None: dest=None
-        else: dest = Path(checkoutname)
         branch       = self.options.branch
-        grip_repo    = lib.grip.Toplevel.clone(options=self.options, repo_url=repo_url, dest=dest, branch=branch, invocation=self.invocation)
+        if self.options.worktree_of is not None:
+            if checkoutname is not None: raise UserError("Only a destination name is required to check out a worktree")
+            checkoutname = self.options.repo_url
+            grip_repo = lib.grip.Toplevel.worktree(options=self.options, worktree_of=Path(self.options.worktree_of), dest=Path(checkoutname), branch=branch, invocation=self.invocation, metrics=self.metrics)
+            pass
+        elif self.options.from_bundle is not None:
+            if checkoutname is not None: raise UserError("Only a destination name is required to check out from a bundle")
+            bundle = GripBundle([Path(f) for f in self.options.from_bundle])
+            try:
+                grip_repo = lib.grip.Toplevel.from_bundle(options=self.options, bundle=bundle, dest=Path(self.options.repo_url), invocation=self.invocation, metrics=self.metrics)
+                self.add_logger(grip_repo.log)
+                self.grip_repo = grip_repo
+                config_name = self.options.config
+                if config_name is None: config_name = bundle.manifest().config
+                grip_repo.configure(config_name = config_name)
+                pass
+            finally:
+                bundle.cleanup()
+                pass
+            return 0
+        else:
+            repo_url = self.options.repo_url.rstrip('/')
+            if checkoutname is None: dest=None
+            else: dest = Path(checkoutname)
+            grip_repo = lib.grip.Toplevel.clone(options=self.options, repo_url=repo_url, dest=dest, branch=branch, invocation=self.invocation, metrics=self.metrics)
+            pass
         self.add_logger(grip_repo.log)
+        self.grip_repo = grip_repo
         #print(grip_repo.debug_repodesc())
         grip_repo.configure(config_name = self.options.config)
         return 0
@@ -43,6 +75,9 @@ class configure(GripCommandBase):
     command_options = {
         ("--force",):         {"dest":"force_configure", "action":"store_true", "default":False, "help":"a configure grip repo may not safely be configured again; use this option to configure again, but only with the current configuration", "default":None},
         ("configuration",):   {"nargs":"?", "help":"specify a configuration to check out - if not supplied, use default from grip.toml", "default":None},
+        ("--mirror",):        {"dest":"mirror", "action":"store_true", "default":False, "help":"clone using local mirrors of the repositories (in ~/.cache/grip/mirrors, or $GRIP_MIRROR_DIR) as references"},
+        ("--mirror-dir",):    {"dest":"mirror_dir", "default":None, "help":"clone using local mirrors of the repositories in this directory as references"},
+        ("--dissociate",):    {"dest":"dissociate", "action":"store_true", "default":False, "help":"copy objects from mirrors so that the clones do not depend on them"},
     }
     class ConfigureOptions(Options):
         configuration : Optional[str]
@@ -8,13 +8,20 @@ class commit(GripCommandBase):
     Commit changes to the grip repo
     """
     names = ["commit"]
+    intermixed_args = True
     command_options = {
+                    **GripCommandBase.repo_selection_options,
                     ("--ignore-untracked",):{"action":"store_true", "dest":"ignore_untracked",  "default":False, "help":"Ignore untracked files in git repositories in appropriate workflows"},
                     ("--ignore-modified",):{"action":"store_true", "dest":"ignore_modified",  "default":False, "help":"Ignore modified files in git repositories in appropriate workflows"},
+                    ("-m", "--message"):{"dest":"message", "default":None, "help":"commit message for every modified git repository (otherwise an editor is run for each, one at a time)"},
+                    ("-j", "--jobs"):  {"dest":"jobs", "type":int, "default":None, "help":"number of subrepos to commit at once"},
     }
+    class CommitOptions(Options):
+        jobs : Optional[int]
+    options : CommitOptions
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         self.get_grip_repo()
-        self.grip_repo.commit()
+        self.grip_repo.commit(repos=self.get_selected_repos(), jobs=self.options.jobs)
         return 0
 
 class merge(GripCommandBase):
@@ -22,13 +29,15 @@ class merge(GripCommandBase):
     Merge upstream and WIP in to WIP for the grip repo
     """
     names = ["merge"]
+    intermixed_args = True
     command_options = {
+                    **GripCommandBase.repo_selection_options,
                     ("--ignore-untracked",):{"action":"store_true", "dest":"ignore_untracked",  "default":False, "help":"Ignore untracked files in git repositories in appropriate workflows"},
                     ("--interactive",):{"action":"store_true", "dest":"interactive",  "default":False, "help":"Use interactive git rebase"},
     }
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         self.get_grip_repo()
-        self.grip_repo.merge()
+        self.grip_repo.merge(repos=self.get_selected_repos())
         return 0
 
 class prepublish(GripCommandBase):
@@ -36,10 +45,17 @@ class prepublish(GripCommandBase):
     Check if subrepos are ready to publish
     """
     names = ["prepublish"]
-    # command_options = {}
+    intermixed_args = True
+    command_options = {
+                    **GripCommandBase.repo_selection_options,
+                    ("-j", "--jobs"):  {"dest":"jobs", "type":int, "default":None, "help":"number of subrepos to check at once"},
+    }
+    class PublishOptions(Options):
+        jobs : Optional[int]
+    options : PublishOptions
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         self.get_grip_repo()
-        self.grip_repo.publish(prepush_only=True)
+        self.grip_repo.publish(prepush_only=True, repos=self.get_selected_repos(), jobs=self.options.jobs)
         return 0
 
 class publish(GripCommandBase):
@@ -47,9 +63,16 @@ class publish(GripCommandBase):
     Attempt to push subrepos
     """
     names = ["publish"]
-    # command_options = {}
+    intermixed_args = True
+    command_options = {
+                    **GripCommandBase.repo_selection_options,
+                    ("-j", "--jobs"):  {"dest":"jobs", "type":int, "default":None, "help":"number of subrepos to push at once"},
+    }
+    class PublishOptions(Options):
+        jobs : Optional[int]
+    options : PublishOptions
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         self.get_grip_repo()
-        self.grip_repo.publish(prepush_only=False)
+        self.grip_repo.publish(prepush_only=False, repos=self.get_selected_repos(), jobs=self.options.jobs)
         return 0
 
@@ -1,4 +1,4 @@
-import os, sys, argparse
+import os, argparse
 from lib.command import GripCommandBase, ParsedCommand
 from lib.options import Options
 from typing import Optional, List
@@ -43,3 +43,34 @@ class shell(GripCommandBase):
         self.grip_repo.invoke_shell(self.options.shell, self.options.args)
         return 0
 
+class foreach(GripCommandBase):
+    """
+    Run a command in every subrepo
+
+    The command is run in the directory of each subrepo with the
+    environment of the subrepo from the configuration, in several
+    subrepos at once. The output from each is printed, prefixed by the
+    subrepo name, when it completes. The exit status is non-zero if the
+    command fails in any subrepo.
+
+    The subrepos may be selected by name or path (or globs of those);
+    the command follows a '--'.
+
+    e.g. grip foreach -j 4 'lib*' -- git log -1
+    """
+    names = ["foreach"]
+    intermixed_args = True
+    separated_args = True
+    command_options = {
+        **GripCommandBase.repo_selection_options,
+        ("-j", "--jobs"):    {"dest":"jobs", "type":int, "default":None, "help":"number of subrepos to run the command in at once"},
+        ("--fail-fast",):    {"dest":"fail_fast", "action":"store_true", "default":False, "help":"stop (killing commands that are running) as soon as the command fails in any subrepo"},
+    }
+    class ForeachOptions(Options):
+        jobs      : Optional[int]
+        fail_fast : bool
+        args      : List[str]
+    options : ForeachOptions
+    def execute(self, cmd:ParsedCommand) -> Optional[int]:
+        self.get_grip_repo(ensure_configured=True)
+        return self.grip_repo.foreach(cmd=self.options.args, repos=self.get_selected_repos(), jobs=self.options.jobs, fail_fast=self.options.fail_fast)
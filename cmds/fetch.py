@@ -9,10 +9,14 @@ class fetch(GripCommandBase):
     Fetch changes to the grip repo
     """
     names = ["fetch"]
-    # command_options = {}
+    intermixed_args = True
+    command_options = {
+        **GripCommandBase.repo_selection_options,
+        ("--tags",): {"dest":"fetch_tags", "action":"store_true", "default":False, "help":"fetch tags as well as the upstream branch of each repository"},
+    }
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         self.get_grip_repo()
-        self.grip_repo.fetch()
+        self.grip_repo.fetch(repos=self.get_selected_repos())
         return 0
 
 class update(GripCommandBase):
@@ -20,12 +24,18 @@ class update(GripCommandBase):
     Update upstream and WIP in to WIP for the grip repo
     """
     names = ["update"]
+    intermixed_args = True
     command_options = {
-                    ("--interactive",):{"action":"store_true", "dest":"interactive",  "default":False, "help":"Use interactive git rebase"},
+                    **GripCommandBase.repo_selection_options,
+                    ("--interactive",):{"action":"store_true", "dest":"interactive",  "default":False, "help":"Use interactive git rebase (updating one subrepo at a time)"},
+                    ("-j", "--jobs"):  {"dest":"jobs", "type":int, "default":None, "help":"number of subrepos to update at once"},
     }
+    class UpdateOptions(Options):
+        jobs : Optional[int]
+    options : UpdateOptions
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         self.get_grip_repo()
-        self.grip_repo.update()
+        self.grip_repo.update(repos=self.get_selected_repos(), jobs=self.options.jobs)
         return 0
 
     
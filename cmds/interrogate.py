@@ -6,7 +6,7 @@ import lib.env
 from lib.command import GripCommandBase, ParsedCommand
 from lib.options import Options
 from lib.types   import Documentation, DocumentationHeadedContent
-from typing import Optional, Tuple, Any, cast
+from typing import Optional, Tuple, List, Any, cast
 
 #a Commands classes
 #c root
@@ -73,6 +73,9 @@ class doc(GripCommandBase):
     If the repository has a configuration warning, such as from
     an undefined environment variable, then the return code will be 1
 
+    Every configuration in the grip.toml file is validated, not just
+    the one in use
+
     With no warnings or errors the return code will be 0
     """
     names = ["doc"]
@@ -84,6 +87,7 @@ class doc(GripCommandBase):
             ge = cast(lib.env.GripEnvValueError, e)
             ge.grip_env.get_root().add_values({ge.key:""})
             return ("",)
+        self.options.validate_all = True # type: ignore
         self.get_grip_repo(ensure_configured=False, error_handler=lib.env.GripEnvValueError.error_handler(f))
         for w in warnings:
             self.grip_repo.verbose.warning(w)
@@ -108,9 +112,68 @@ class status(GripCommandBase):
     Get status
     """
     names = ["status"]
-    # command_options = {}
+    intermixed_args = True
+    command_options = GripCommandBase.repo_selection_options
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         self.get_grip_repo()
-        self.grip_repo.status()
+        self.grip_repo.status(repos=self.get_selected_repos())
         return 0
     pass
+
+#c grep
+class grep(GripCommandBase):
+    """
+    Search the subrepos with git grep
+
+    'git grep' is run in every subrepo at once, and the results are
+    printed as they arrive, with paths relative to the grip repo root.
+    The working trees are searched, or with --state the changesets of
+    the subrepos in the state.
+
+    e.g. grip grep -i --limit 20 'some_function' '*.py'
+    """
+    names = ["grep"]
+    command_options = {
+        ("-i", "--ignore-case"):         {"dest":"grep_options", "action":"append_const", "const":"-i", "help":"ignore case"},
+        ("-w", "--word-regexp"):         {"dest":"grep_options", "action":"append_const", "const":"-w", "help":"match only whole words"},
+        ("-F", "--fixed-strings"):       {"dest":"grep_options", "action":"append_const", "const":"-F", "help":"patterns are fixed strings"},
+        ("-E", "--extended-regexp"):     {"dest":"grep_options", "action":"append_const", "const":"-E", "help":"patterns are extended regular expressions"},
+        ("-l", "--files-with-matches"):  {"dest":"grep_options", "action":"append_const", "const":"-l", "help":"show only the names of files that match"},
+        ("-A", "--after-context"):       {"dest":"after_context", "type":int, "default":None, "help":"show this many lines of context after each match"},
+        ("-B", "--before-context"):      {"dest":"before_context", "type":int, "default":None, "help":"show this many lines of context before each match"},
+        ("-C", "--context"):             {"dest":"context", "type":int, "default":None, "help":"show this many lines of context before and after each match"},
+        ("-e",):                         {"dest":"patterns", "action":"append", "default":None, "help":"additional pattern to search for"},
+        ("--state",):                    {"dest":"state", "action":"store_true", "default":False, "help":"search the changesets of the subrepos in the state rather than their working trees"},
+        ("--limit",):                    {"dest":"limit", "type":int, "default":None, "help":"stop searching once this many results have been found"},
+        ("--repos",):                    GripCommandBase.repo_selection_options[("--repos",)],
+        ("-j", "--jobs"):                {"dest":"jobs", "type":int, "default":None, "help":"number of subrepos to search at once"},
+        ("pattern",):                    {"help":"pattern to search for"},
+        ("pathspecs",):                  {"nargs":"*", "help":"only search files matching these pathspecs"},
+    }
+    class GrepOptions(Options):
+        grep_options : Optional[List[str]]
+        after_context  : Optional[int]
+        before_context : Optional[int]
+        context        : Optional[int]
+        patterns     : Optional[List[str]]
+        state        : bool
+        limit        : Optional[int]
+        jobs         : Optional[int]
+        pattern      : str
+        pathspecs    : List[str]
+    options : GrepOptions
+    def execute(self, cmd:ParsedCommand) -> Optional[int]:
+        self.get_grip_repo()
+        patterns = [self.options.pattern] + (self.options.patterns or [])
+        grep_options = list(self.options.grep_options or [])
+        for (option, lines) in [("-A", self.options.after_context), ("-B", self.options.before_context), ("-C", self.options.context)]:
+            if lines is not None: grep_options.append("%s%d"%(option, lines))
+            pass
+        return self.grip_repo.grep(patterns=patterns,
+                                   grep_options=grep_options,
+                                   pathspecs=self.options.pathspecs,
+                                   state=self.options.state,
+                                   limit=self.options.limit,
+                                   repos=self.get_selected_repos(),
+                                   jobs=self.options.jobs)
+    pass
@@ -0,0 +1,63 @@
+from pathlib import Path
+from lib.command import GripCommandBase, ParsedCommand
+from lib.options import Options
+from lib.metrics import MetricsHistory
+from typing import Optional
+
+#c stats
+class stats(GripCommandBase):
+    """
+    Analyze the metrics recorded for previous grip commands in this grip repository
+
+    Reports the number of invocations and the median (p50) and p95
+    durations of each command, the time and count of each git verb,
+    the repositories in which most time was spent, and the median
+    duration of each command over time.
+    """
+    names = ["stats"]
+    command_options = {
+        ("--command",):  {"dest":"stats_command", "default":None, "help":"only analyze invocations of this grip command"},
+        ("--last",):     {"dest":"last", "type":int, "default":None, "help":"only analyze the most recent invocations"},
+        ("--top-repos",):{"dest":"num_repos", "type":int, "default":10, "help":"number of slowest repositories to report"},
+        ("--period",):   {"dest":"period", "choices":["day","week","month"], "default":"week", "help":"period over which to report trends"},
+    }
+    records_metrics = False
+    period_formats = {"day":"%Y-%m-%d", "week":"%Y-w%W", "month":"%Y-%m"}
+    class StatsOptions(Options):
+        stats_command : Optional[str]
+        last          : Optional[int]
+        num_repos     : int
+        period        : str
+    options : StatsOptions
+    def execute(self, cmd:ParsedCommand) -> Optional[int]:
+        self.get_grip_repo(ensure_configured=False)
+        path = self.grip_repo.grip_path(self.grip_repo.grip_metrics_filename)
+        history = MetricsHistory()
+        if path.is_file(): history.read_file(path)
+        history = history.select(command=self.options.stats_command, last=self.options.last)
+        if len(history.records)==0:
+            print("No metrics recorded in '%s'"%str(path))
+            return 0
+        print("%d invocations, %d bytes fetched"%(len(history.records), history.bytes_fetched()))
+        print()
+        print("%-20s %8s %10s %10s"%("Command", "Count", "p50 (s)", "p95 (s)"))
+        for (c,n,p50,p95) in history.command_summary():
+            print("%-20s %8d %10.3f %10.3f"%(c,n,p50,p95))
+            pass
+        print()
+        print("%-20s %8s %10s"%("Subprocess", "Count", "Time (s)"))
+        for (s,n,t) in history.subprocess_summary():
+            print("%-20s %8d %10.3f"%(s,n,t))
+            pass
+        print()
+        print("%-40s %8s %10s %10s"%("Slowest repositories", "Count", "Time (s)", "p95 (s)"))
+        for (r,n,t,p95) in history.slowest_repos(self.options.num_repos):
+            print("%-40s %8d %10.3f %10.3f"%(r,n,t,p95))
+            pass
+        print()
+        print("%-12s %-20s %8s %10s"%("Period", "Command", "Count", "p50 (s)"))
+        for (p,c,n,p50) in history.trend(self.period_formats[self.options.period]):
+            print("%-12s %-20s %8d %10.3f"%(p,c,n,p50))
+            pass
+        return 0
+    pass
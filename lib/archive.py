@@ -0,0 +1,159 @@
+#a Imports
+import shutil, tarfile, threading, subprocess
+from pathlib import Path
+from typing import Optional, List, Tuple, Dict, Any, IO
+
+from .log import Log
+from .os_command import OSCommand, Cancellation
+from .parallel import ParallelJobs
+from .exceptions import *
+
+#a Classes
+#c ArchiveSource - a repository to add to an archive
+class ArchiveSource:
+    """
+    A repository to archive: the working tree path of the git repository,
+    the changeset to archive, and the prefix of its files in the archive
+    """
+    name      : str
+    path      : Path
+    changeset : str
+    prefix    : str
+    #f __init__
+    def __init__(self, name:str, path:Path, changeset:str, prefix:str) -> None:
+        self.name = name
+        self.path = path
+        self.changeset = changeset
+        self.prefix = prefix
+        pass
+    #f All done
+    pass
+
+#c GripArchive - a tar file of the sources of many repositories
+class GripArchive:
+    """
+    A tar file (optionally compressed) of the files of many git
+    repositories at given changesets, without their .git directories
+
+    A 'git archive' is run for each repository concurrently, and the
+    tar stream from each is read member by member and written to the
+    single output tar stream (which is compressed as it is written), so
+    nothing is staged on disk. The members of the different
+    repositories are interleaved in the output.
+
+    zstd compression requires the 'zstd' executable; the others use the
+    python tarfile compression.
+    """
+    formats = ["tar", "tgz", "txz", "tbz2", "tzst"]
+    suffixes = [(".tar.gz","tgz"), (".tgz","tgz"), (".tar.xz","txz"), (".txz","txz"),
+                (".tar.bz2","tbz2"), (".tbz2","tbz2"), (".tar.zst","tzst"), (".tzst","tzst"), (".tar","tar")]
+    tarfile_modes : Dict[str,Any] = {"tar":"w|", "tgz":"w|gz", "txz":"w|xz", "tbz2":"w|bz2", "tzst":"w|"}
+    path         : Path
+    format       : str
+    sources      : List[ArchiveSource]
+    log          : Optional[Log]
+    lock         : threading.Lock
+    #f split_suffix - classmethod to split a path in to its stem and archive format
+    @classmethod
+    def split_suffix(cls, path:Path) -> Tuple[str, Optional[str]]:
+        for (suffix, format) in cls.suffixes:
+            if path.name.endswith(suffix): return (path.name[:-len(suffix)], format)
+            pass
+        return (path.name, None)
+    #f __init__
+    def __init__(self, path:Path, format:Optional[str]=None, log:Optional[Log]=None) -> None:
+        """
+        If format is None then it is determined from the suffix of the path (defaulting to an uncompressed tar)
+        """
+        if format is None: format = self.split_suffix(path)[1]
+        if format is None: format = "tar"
+        if format not in self.formats: raise UserError("Unknown archive format '%s'"%(format))
+        self.path = path
+        self.format = format
+        self.sources = []
+        self.log = log
+        self.lock = threading.Lock()
+        pass
+    #f add_log_string
+    def add_log_string(self, s:str) -> None:
+        if self.log: self.log.add_entry_string(s)
+        pass
+    #f add_source - add a repository to be archived
+    def add_source(self, source:ArchiveSource) -> None:
+        self.sources.append(source)
+        pass
+    #f archive_source - run git archive on a source and copy its members to the output tar
+    def archive_source(self, tar:tarfile.TarFile, source:ArchiveSource, cancellation:Cancellation, timeout:Optional[float]=None) -> int:
+        """
+        Return the number of members added to the archive
+
+        The git archive is killed (and OSCommand.Timeout raised) if the
+        timeout expires or the cancellation is cancelled or reaches its deadline
+        """
+        num_members = 0
+        def copy_members(stdout:IO[bytes]) -> None:
+            nonlocal num_members
+            try:
+                with tarfile.open(fileobj=stdout, mode="r|") as source_tar:
+                    for member in source_tar:
+                        data = source_tar.extractfile(member) if member.isfile() else None
+                        with self.lock:
+                            tar.addfile(member, data)
+                            pass
+                        num_members += 1
+                        pass
+                    pass
+                pass
+            except tarfile.ReadError:
+                # git archive failed before producing a tar stream; the error is reported below
+                pass
+            pass
+        self.add_log_string("Archiving '%s' cs %s with prefix '%s'"%(source.name, source.changeset, source.prefix))
+        cmd = OSCommand(cmd=["git", "archive", "--format=tar", "--prefix=%s"%source.prefix, source.changeset],
+                        cwd = str(source.path),
+                        timeout = timeout,
+                        cancellation = cancellation,
+                        stdout_fn = copy_members,
+                        log = self.log).run()
+        if cmd.rc()!=0:
+            raise UserError("Failed to archive '%s' cs %s - %s"%(source.name, source.changeset, cmd.stderr().strip()))
+        return num_members
+    #f open_output - open the output file, returning the file to write the tar stream to and a compression process if required
+    def open_output(self) -> Tuple[IO[bytes], Optional['subprocess.Popen[bytes]']]:
+        if self.format!="tzst": return (open(self.path, "wb"), None)
+        zstd = shutil.which("zstd")
+        if zstd is None: raise UserError("The 'zstd' executable is required to write a zstd compressed archive")
+        process = subprocess.Popen(args=[zstd, "--quiet", "--force", "-o", str(self.path)], stdin=subprocess.PIPE)
+        assert process.stdin is not None
+        return (process.stdin, process)
+    #f write - write the archive of all the sources
+    def write(self, jobs:Optional[int]=None, cancellation:Optional[Cancellation]=None, timeout:Optional[float]=None) -> int:
+        """
+        Write the archive, running up to 'jobs' git archives concurrently,
+        each with the command timeout (if given)
+
+        Return the number of members in the archive; on failure the output file is removed
+        """
+        parallel : ParallelJobs[ArchiveSource,int] = ParallelJobs(jobs=jobs, fail_fast=True, cancellation=cancellation)
+        (output, compressor) = self.open_output()
+        try:
+            try:
+                with tarfile.open(fileobj=output, mode=self.tarfile_modes[self.format], format=tarfile.PAX_FORMAT) as tar:
+                    results = parallel.run(lambda s:self.archive_source(tar, s, parallel.cancellation, timeout=timeout), self.sources)
+                    for r in results:
+                        if r.exception is not None: raise r.exception
+                        pass
+                    pass
+                pass
+            finally:
+                output.close()
+                if compressor is not None and (compressor.wait()!=0):
+                    raise UserError("Failed to compress archive '%s'"%(str(self.path)))
+                pass
+            pass
+        except BaseException:
+            self.path.unlink(missing_ok=True)
+            raise
+        return sum([r.result for r in results if r.result is not None])
+    #f All done
+    pass
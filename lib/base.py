@@ -1,14 +1,15 @@
 #a Imports
-import os, time
+import os, time, hashlib
 from pathlib import Path
 
 from .log         import Log
+from .metrics     import Metrics
 from .verbose     import Verbose
 from .options     import Options
 from .exceptions  import *
 from typing       import Type, List, Dict, Iterable, Optional, Any, Tuple, IO
 from .git         import Repository as GitRepository
-from .tomldict    import RawTomlDict, toml_load, toml_save
+from .tomldict    import RawTomlDict, toml_load, toml_to_string
 
 #c GripBase
 class GripBase:
@@ -21,33 +22,87 @@ class GripBase:
     env_toml_filename    = "local.env.toml"
     grip_env_filename    = "local.env.sh"
     grip_log_filename    = "local.log"
+    grip_log_max_size    = 4*1024*1024
+    grip_log_backups     = 3
+    grip_metrics_filename = "local.metrics.jsonl"
     makefile_stamps_dirname = "local.makefile_stamps"
+    makefile_fingerprints_filename = "local.makefile_fingerprints.toml"
     grip_makefile_filename = "local.grip_makefile"
     grip_makefile_env_filename = "local.grip_makefile.env"
     #v Instance properties
     log         : Log
+    metrics     : Metrics
     options     : Options
     verbose     : Verbose
     git_repo    : GitRepository
     branch_name : Optional[str]
+    logfile     : Optional[IO[str]]
+    writes_skipped : int
     #f __init__
-    def __init__(self, options:Options, log:Log, git_repo:GitRepository, branch_name:Optional[str]=None):
+    def __init__(self, options:Options, log:Log, git_repo:GitRepository, branch_name:Optional[str]=None, metrics:Optional[Metrics]=None):
+        if metrics is None: metrics=Metrics()
         self.log=log
+        self.metrics=metrics
         self.options=options
         self.verbose=options.get_verbose_fn()
         self.git_repo = git_repo
         self.branch_name = branch_name
+        self.logfile = None
+        self.writes_skipped = 0
+        output_lines = options.get("log_output_lines",None)
+        if output_lines is not None:
+            self.log.set_output_limits(head_lines=output_lines, tail_lines=output_lines)
+            pass
+        pass
+    #f rotate_logfile
+    def rotate_logfile(self, path:Path) -> None:
+        """
+        If the logfile has grown beyond grip_log_max_size then move it to
+        a backup (local.log.1, with older backups shuffled up to grip_log_backups)
+        """
+        if not path.is_file(): return
+        if path.stat().st_size < self.grip_log_max_size: return
+        for i in range(self.grip_log_backups-1, 0, -1):
+            older = Path("%s.%d"%(str(path),i))
+            if older.is_file(): older.replace(Path("%s.%d"%(str(path),i+1)))
+            pass
+        path.replace(Path("%s.1"%(str(path))))
+        pass
+    #f enable_logfile
+    def enable_logfile(self) -> None:
+        """
+        Stream the log to the local logfile (rotating it if it is too large)
+
+        The log entries already held are written out first; subsequent
+        entries are written as they are added. This may be invoked more
+        than once.
+        """
+        if self.logfile is not None: return
+        if self.log.sink is not None: return
+        path = self.grip_path(self.grip_log_filename)
+        self.rotate_logfile(path)
+        self.logfile = self.open(path,"a")
+        print("",file=self.logfile)
+        print("*"*80,file=self.logfile)
+        self.log.set_sink(self.logfile, replay=True)
+        self.log.set_tidy(self.log_to_logfile)
         pass
     #f log_to_logfile
     def log_to_logfile(self) -> None:
         """
-        Invoked to append the log to the local logfile
+        Invoked when the log is tidied to complete the local logfile
         """
-        with open(self.grip_path(self.grip_log_filename),"a") as f:
-            print("",file=f)
-            print("*"*80,file=f)
-            self.log.dump(f)
-            pass
+        if self.logfile is None: return
+        self.log.set_sink(None)
+        self.logfile.close()
+        self.logfile = None
+        pass
+    #f write_metrics
+    def write_metrics(self) -> None:
+        """
+        Append the metrics of this invocation to the local metrics file
+        """
+        self.metrics.append_to_file(self.grip_path(self.grip_metrics_filename), root=self.git_repo.path())
         pass
     #f add_log_string
     def add_log_string(self, s:str) -> None:
@@ -87,11 +142,49 @@ class GripBase:
             toml_dict = toml_load(f)
             pass
         return toml_dict
+    #f file_digest - get the digest of the contents of a file, or None if it cannot be read
+    def file_digest(self, path:Path) -> Optional[bytes]:
+        try:
+            with self.open(path) as f:
+                return hashlib.sha256(f.read().encode("utf8")).digest()
+            pass
+        except (OSError, UnicodeDecodeError):
+            pass
+        return None
+    #f write_if_changed
+    def write_if_changed(self, path:Path, content:str) -> bool:
+        """
+        Write content to a file, unless the file already has exactly that
+        content (so its modification time is unchanged, and make does not
+        see it as new); a skipped write is counted in the log
+
+        The content is written to a temporary file in the same directory
+        which is then renamed over the file, so that the file is never
+        seen partly written
+
+        Return True if the file was written
+        """
+        if self.file_digest(path)==hashlib.sha256(content.encode("utf8")).digest():
+            self.writes_skipped += 1
+            self.add_log_string("File '%s' is unchanged so not written (%d writes skipped)"%(str(path), self.writes_skipped))
+            return False
+        tmp_path = path.with_name(".%s.%d.tmp"%(path.name, os.getpid()))
+        try:
+            with self.open(tmp_path,"w") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+                pass
+            os.replace(tmp_path, path)
+            pass
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self.add_log_string("Wrote file '%s'"%(str(path)))
+        return True
     #f toml_save:
     def toml_save(self, path:Path, toml_dict:RawTomlDict) -> None:
-        with self.open(path,"w") as f:
-            toml_save(f, toml_dict)
-            pass
+        self.write_if_changed(path, toml_to_string(toml_dict))
         pass
     #f All done
     pass
@@ -0,0 +1,269 @@
+#a Imports
+import io, time, hashlib, tarfile, tempfile
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from .git import Repository as GitRepo
+from .tomldict import RawTomlDict, toml_of_string, toml_save
+from .exceptions import *
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .grip import Toplevel
+
+#a Classes
+#c BundleEntry - a repository in a grip bundle archive
+class BundleEntry:
+    """
+    A repository in a grip bundle archive: where it came from, the
+    changeset it is pinned at, and the name of its git bundle in the
+    archive (None if it is unchanged since the previous archive)
+
+    If prerequisite is not None then the git bundle only contains the
+    history since that changeset, which must come from an earlier archive
+    """
+    name         : str
+    url          : str
+    branch       : str
+    changeset    : str
+    bundle       : Optional[str]
+    prerequisite : Optional[str]
+    #f __init__
+    def __init__(self, name:str, url:str, branch:str, changeset:str, bundle:Optional[str]=None, prerequisite:Optional[str]=None) -> None:
+        self.name = name
+        self.url = url
+        self.branch = branch
+        self.changeset = changeset
+        self.bundle = bundle
+        self.prerequisite = prerequisite
+        pass
+    #f toml_dict
+    def toml_dict(self) -> Dict[str,Any]:
+        toml_dict : Dict[str,Any] = {"url":self.url, "branch":self.branch, "changeset":self.changeset}
+        if self.bundle is not None:       toml_dict["bundle"] = self.bundle
+        if self.prerequisite is not None: toml_dict["prerequisite"] = self.prerequisite
+        return toml_dict
+    #f of_toml_dict - classmethod
+    @classmethod
+    def of_toml_dict(cls, name:str, d:Dict[str,Any]) -> 'BundleEntry':
+        try:
+            return cls(name=name, url=d["url"], branch=d["branch"], changeset=d["changeset"], bundle=d.get("bundle",None), prerequisite=d.get("prerequisite",None))
+        except KeyError as e:
+            raise UserError("Bundle manifest entry for '%s' is missing %s"%(name, str(e)))
+        pass
+    #f All done
+    pass
+
+#c BundleManifest - the manifest of a grip bundle archive
+class BundleManifest:
+    """
+    The manifest of a grip bundle archive: the configuration, the entry
+    for the grip repository and one per subrepository, and the id of
+    this archive and of the archive it is incremental to (if any)
+    """
+    filename = "grip_bundle.toml"
+    grip_name = "<grip>"
+    id     : str
+    since  : Optional[str]
+    config : str
+    grip   : BundleEntry
+    repos  : Dict[str,BundleEntry]
+    #f __init__
+    def __init__(self, id:str, config:str, grip:BundleEntry, since:Optional[str]=None) -> None:
+        self.id = id
+        self.since = since
+        self.config = config
+        self.grip = grip
+        self.repos = {}
+        pass
+    #f as_string
+    def as_string(self) -> str:
+        toml_dict : RawTomlDict = {"id":self.id, "config":self.config, "grip":self.grip.toml_dict(), "repos":{}}
+        if self.since is not None: toml_dict["since"] = self.since
+        for (n,r) in self.repos.items():
+            toml_dict["repos"][n] = r.toml_dict()
+            pass
+        f = io.StringIO()
+        toml_save(f, toml_dict)
+        return f.getvalue()
+    #f of_string - classmethod
+    @classmethod
+    def of_string(cls, s:str) -> 'BundleManifest':
+        d = toml_of_string(s)
+        try:
+            manifest = cls(id=d["id"], config=d["config"], since=d.get("since",None), grip=BundleEntry.of_toml_dict(cls.grip_name, d["grip"]))
+            pass
+        except KeyError as e:
+            raise UserError("Bundle manifest is missing %s"%(str(e)))
+        for (n,r) in d.get("repos",{}).items():
+            manifest.repos[n] = BundleEntry.of_toml_dict(n, r)
+            pass
+        return manifest
+    #f All done
+    pass
+
+#c GripBundle - a chain of grip bundle archives read for a checkout
+class GripBundle:
+    """
+    A grip bundle archive is a tar file containing a manifest, the
+    grip.toml of the grip repository, and a git bundle of the grip
+    repository and of each subrepository of the configuration at the
+    changesets of its state.
+
+    An archive may be incremental to a previous archive, when its git
+    bundles contain only the history since the changesets of the
+    previous one. A checkout from bundles is given the full archive and
+    then each incremental archive in turn; the git bundles are extracted
+    to a temporary directory, and each repository is fetched from them
+    in order, so no remote is contacted.
+    """
+    manifests : List[BundleManifest]
+    bundles   : Dict[str,List[Path]]
+    tmp_dir   : Optional[tempfile.TemporaryDirectory[str]]
+    #f create - classmethod to create a bundle archive of a configured grip repository
+    @classmethod
+    def create(cls, toplevel:'Toplevel', path:Path, since:Optional[Path]=None) -> BundleManifest:
+        """
+        Write a bundle archive of the grip repository and its subrepos
+
+        If since is given then it is a previous archive, and the git
+        bundles only contain the history since its changesets (where
+        those are ancestors of the current changesets)
+        """
+        previous = None
+        if since is not None:
+            with tarfile.open(since, "r") as tar:
+                previous = cls.read_manifest(tar, since)
+                pass
+            pass
+        config_name = toplevel.get_config_name()
+        id = hashlib.sha1(("%s %s %f"%(str(toplevel.path()), config_name, time.time())).encode()).hexdigest()[:16]
+        def make_entry(name:str, git_repo:GitRepo, changeset:str, tmp:Path, tar:tarfile.TarFile) -> BundleEntry:
+            prev_entry = None
+            if previous is not None:
+                prev_entry = previous.grip if name==BundleManifest.grip_name else previous.repos.get(name,None)
+                pass
+            entry = cls.add_repo(tar, tmp, name, git_repo, changeset, prev_entry)
+            if entry.bundle is None:
+                toplevel.verbose.info("Repo '%s' is unchanged since the previous bundle"%(name))
+                pass
+            return entry
+        with tempfile.TemporaryDirectory(prefix="grip_bundle") as tmp_dir:
+            tmp = Path(tmp_dir)
+            with tarfile.open(path, "w") as tar:
+                git_repo = toplevel.get_git_repo()
+                grip = make_entry(BundleManifest.grip_name, git_repo, git_repo.get_cs(), tmp, tar)
+                manifest = BundleManifest(id=id, config=config_name, grip=grip, since=None if previous is None else previous.id)
+                for sr in toplevel.repo_instance_tree.iter_subrepos():
+                    changeset = toplevel.configured_config_state.state_file_config.get_repo_cs(sr.name)
+                    if changeset is None: changeset = sr.git_repo.get_cs()
+                    manifest.repos[sr.name] = make_entry(sr.name, sr.git_repo, changeset, tmp, tar)
+                    pass
+                cls.add_string(tar, "grip.toml", toplevel.grip_path(toplevel.grip_toml_filename).read_text())
+                cls.add_string(tar, BundleManifest.filename, manifest.as_string())
+                pass
+            pass
+        return manifest
+    #f add_repo - classmethod to add the git bundle of a repository to a bundle archive
+    @classmethod
+    def add_repo(cls, tar:tarfile.TarFile, tmp:Path, name:str, git_repo:GitRepo, changeset:str, previous:Optional[BundleEntry]=None) -> BundleEntry:
+        """
+        Get the entry for a repository at changeset, adding its git bundle to the archive
+
+        If previous (the entry of the repository in the previous archive)
+        is given, and its changeset is an ancestor of changeset, then the
+        git bundle only has the history since that; if it is at changeset
+        then no git bundle is added
+        """
+        upstream = git_repo.get_upstream()
+        branch = "master" if upstream is None else upstream.get_branch()
+        entry = BundleEntry(name=name, url=git_repo.get_git_url_string(), branch=branch, changeset=changeset)
+        if (previous is not None) and git_repo.has_cs(previous.changeset) and git_repo.is_ancestor(previous.changeset, changeset):
+            entry.prerequisite = previous.changeset
+            pass
+        if entry.prerequisite == changeset: return entry
+        entry.bundle = "bundles/%s.bundle"%(name.strip("<>"))
+        bundle_path = tmp.joinpath("repo.bundle")
+        git_repo.create_bundle(bundle_path, changeset=changeset, prerequisite=entry.prerequisite)
+        tar.add(str(bundle_path), arcname=entry.bundle)
+        bundle_path.unlink()
+        return entry
+    #f add_string - classmethod to add a file to a tar file from a string
+    @classmethod
+    def add_string(cls, tar:tarfile.TarFile, name:str, s:str) -> None:
+        data = s.encode()
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+        pass
+    #f read_manifest - classmethod
+    @classmethod
+    def read_manifest(cls, tar:tarfile.TarFile, path:Path) -> BundleManifest:
+        try:
+            f = tar.extractfile(BundleManifest.filename)
+            pass
+        except KeyError:
+            f = None
+            pass
+        if f is None: raise UserError("'%s' is not a grip bundle archive"%(str(path)))
+        return BundleManifest.of_string(f.read().decode())
+    #f __init__
+    def __init__(self, paths:List[Path]) -> None:
+        """
+        Read the archives (the first full, and each later one incremental
+        to the one before it) and extract their git bundles
+        """
+        self.manifests = []
+        self.bundles = {}
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="grip_bundle")
+        tmp = Path(self.tmp_dir.name)
+        try:
+            for (i,path) in enumerate(paths):
+                with tarfile.open(path, "r") as tar:
+                    manifest = self.read_manifest(tar, path)
+                    expected = None if i==0 else self.manifests[-1].id
+                    if manifest.since != expected:
+                        if manifest.since is None:
+                            raise UserError("Bundle archive '%s' is not incremental, so must be given first"%(str(path)))
+                        raise UserError("Bundle archive '%s' is incremental to an archive that was not given before it"%(str(path)))
+                    for entry in [manifest.grip] + list(manifest.repos.values()):
+                        if entry.bundle is None: continue
+                        member = tar.getmember(entry.bundle)
+                        f = tar.extractfile(member)
+                        if f is None: raise UserError("Bundle archive '%s' has a bad entry '%s'"%(str(path), entry.bundle))
+                        bundle_path = tmp.joinpath(entry.name.strip("<>"), "%d.bundle"%(i))
+                        bundle_path.parent.mkdir(parents=True, exist_ok=True)
+                        bundle_path.write_bytes(f.read())
+                        if entry.name not in self.bundles: self.bundles[entry.name] = []
+                        self.bundles[entry.name].append(bundle_path)
+                        pass
+                    pass
+                self.manifests.append(manifest)
+                pass
+            if len(self.manifests)==0: raise UserError("No bundle archives given")
+            pass
+        except BaseException:
+            self.cleanup()
+            raise
+        pass
+    #f manifest - the manifest of the latest archive
+    def manifest(self) -> BundleManifest:
+        return self.manifests[-1]
+    #f get_entry - get the entry of a repository (or the grip repository if name is None)
+    def get_entry(self, name:Optional[str]=None) -> Optional[BundleEntry]:
+        if name is None: return self.manifest().grip
+        return self.manifest().repos.get(name, None)
+    #f get_bundles - get the git bundles of a repository to fetch from, in order
+    def get_bundles(self, name:Optional[str]=None) -> List[Path]:
+        if name is None: name = BundleManifest.grip_name
+        return self.bundles.get(name, [])
+    #f cleanup - remove the extracted bundles
+    def cleanup(self) -> None:
+        if self.tmp_dir is not None:
+            self.tmp_dir.cleanup()
+            self.tmp_dir = None
+            pass
+        pass
+    #f All done
+    pass
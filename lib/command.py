@@ -9,6 +9,7 @@ from .hookable import Hookable
 from .exceptions import *
 from .verbose import Verbose
 from .log import Log
+from .metrics import Metrics
 from .options import Options
 from typing import Type, Dict, List, Sequence, Any, Optional, Union, Tuple, IO
 from .grip import Toplevel
@@ -45,15 +46,29 @@ class GripCommandBase(Hookable):
                     ("--debug-config",)  :{"action":"store_true", "dest":"debug_config", "default":False, "help":"dump the complete configuration to the screen once it has been read"},
                     ("--grip-path",)     :{                       "dest":"grip_path",    "default":None, "help":"path to somewhere with the grip repository (default is working directory)"},
                     ("-Q", "--quiet")    :{"action":"store_true", "dest":"quiet",        "default":False},
+                    ("--no-progress",)   :{"action":"store_false", "dest":"progress",     "default":True, "help":"do not display the progress of clones and fetches"},
+                    ("--command-timeout",):{"type":float,          "dest":"command_timeout", "default":None, "help":"timeout in seconds for each git command; a command that takes longer is killed"},
+                    ("--operation-timeout",):{"type":float,        "dest":"operation_timeout", "default":None, "help":"timeout in seconds for all the git commands of the grip command"},
+                    ("--validate-all",)  :{"action":"store_true", "dest":"validate_all", "default":False, "help":"validate every configuration in the grip.toml file, not just the one in use"},
+                    ("--log-output-lines",):{"type":int,           "dest":"log_output_lines", "default":None, "help":"number of lines at the start and end of command output to record in the log"},
                     ("command",):      {"default":None, "help":'command to perform'},
     }
     command_options : ParserOptions = {}
+    #v Options for commands that may operate on a selection of subrepos
+    repo_selection_options : ParserOptions = {
+        ("--repos",):  {"dest":"repo_globs", "action":"append", "default":None, "help":"only operate on subrepos whose names or paths match this glob (may be given more than once)"},
+        ("repos",):    {"nargs":"*", "default":[], "help":"only operate on these subrepos (names, paths or globs)"},
+    }
+    records_metrics : bool = True
+    intermixed_args : bool = False # True if positional arguments may follow options, which requires no REMAINDER arguments
+    separated_args  : bool = False # True if the arguments after a '--' are not parsed but given as options.args (e.g. a command to run)
     #t Instance property types
     prog       : str
     invocation : str
     parser     : argparse.ArgumentParser
     options    : Options
     loggers    : List[Log]
+    metrics    : Metrics
     #f get_all
     @classmethod
     def get_all(cls) -> List[Type['GripCommandBase']]:
@@ -80,6 +95,7 @@ class GripCommandBase(Hookable):
             self.parser = argparse.ArgumentParser(prog=command_name, parents=[self.toplevel_parser], add_help=False) # add_help=False as we have an explicit help
             self.prog = os.path.basename(command_name)
             self.loggers = []
+            self.metrics = Metrics()
             pass
         else:
             self.options = parent.options
@@ -87,6 +103,7 @@ class GripCommandBase(Hookable):
             self.parser = argparse.ArgumentParser(prog=parser_prog, parents=[parent.toplevel_parser], add_help=False) # add_help=False as parent has -h
             self.prog = parser_prog
             self.loggers = parent.loggers
+            self.metrics = parent.metrics
             pass
         self.parser_add_options(self.base_options)
         self.parser_add_options(self.command_options)
@@ -119,12 +136,31 @@ class GripCommandBase(Hookable):
         # cmd_parser = argparse.ArgumentParser(prog=self.prog, parents=[self.parser], add_help=False)
         # self.parser_add_options(cmd_parser, self.command_options)
         # options = cmd_parser.parse_args(args, namespace=options)
-        self.parser.parse_args(args=args, namespace=self.options)
+        if self.separated_args:
+            separated : List[str] = []
+            if "--" in args:
+                separated = args[args.index("--")+1:]
+                args = args[:args.index("--")]
+                pass
+            setattr(self.options, "args", separated)
+            pass
+        if self.intermixed_args:
+            self.parser.parse_intermixed_args(args=args, namespace=self.options)
+            pass
+        else:
+            self.parser.parse_args(args=args, namespace=self.options)
+            pass
         self.options._validate()
         self.invoke_hooks("command_options", command=self)
         subcommand = self.options.command # type: ignore
         return ParsedCommand(self, subcommand=subcommand, subcommand_args=self.options.get("command_args",default=[]))
 
+    #f get_selected_repos - get the globs of the selected subrepos, or None if all are to be operated on
+    def get_selected_repos(self) -> Optional[List[str]]:
+        repos : List[str] = list(self.options.get("repos",[]) or [])
+        repos.extend(self.options.get("repo_globs",None) or [])
+        if len(repos)==0: return None
+        return repos
     #f get_grip_repo
     def get_grip_repo(self, log:Optional[Log]=None, path:Optional[Path]=None, **kwargs:Any) -> None:
         if path is None:
@@ -137,7 +173,7 @@ class GripCommandBase(Hookable):
             pass
         if log is None: log = Log()
         self.add_logger(log)
-        self.grip_repo = Toplevel(path=path, log=log, invocation=self.invocation, options=self.options, **kwargs)
+        self.grip_repo = Toplevel(path=path, log=log, invocation=self.invocation, options=self.options, metrics=self.metrics, **kwargs)
         pass
 
     #f add_logger
@@ -168,6 +204,21 @@ class GripCommandBase(Hookable):
             pass
         pass
 
+    #f record_metrics
+    def record_metrics(self, rc:int) -> None:
+        """
+        Stop collecting metrics and append them to the grip repository metrics file (if there is a grip repository)
+        """
+        self.metrics.stop(rc)
+        if not self.records_metrics: return
+        if not hasattr(self, "grip_repo"): return
+        try:
+            self.grip_repo.write_metrics()
+            pass
+        except OSError:
+            pass
+        pass
+
     #f execute
     def execute(self, cmd:ParsedCommand) -> Optional[int]:
         raise Exception("Unimplemented execution of command")
@@ -181,9 +232,11 @@ class GripCommandBase(Hookable):
             return self.parser.error("Unknown command \"%s\"" % command_name) # type:ignore
 
         command = command_cls(parent=self, command_name=command_name, args=args)
+        command.metrics.start(command=command_name, args=args)
         try:
             parsed_command = command.parse_command(args)
             result = command.execute(parsed_command)
+            command.record_metrics(result or 0)
             command.tidy_logs()
             if self.options.show_log:
                 command.show_logs(sys.stdout)
@@ -196,11 +249,13 @@ class GripCommandBase(Hookable):
                 pass
             pass
         except GripException as e:
+            command.record_metrics(4)
             self.tidy_logs()
             print("%s: %s" % (e.grip_type, str(e)), file=sys.stderr)
             if (self.options.get("show_log",False)): self.show_logs(sys.stderr)
             sys.exit(4)
         except OSCommand.Error as e:
+            command.record_metrics(127)
             self.tidy_logs()
             print("Error from shell command %s" % str(e), file=sys.stderr)
             if self.options.verbose:
@@ -209,6 +264,7 @@ class GripCommandBase(Hookable):
             sys.exit(127)
             pass
         except Exception as e:
+            command.record_metrics(1)
             command.tidy_logs()
             raise e
         pass
@@ -63,12 +63,15 @@ class GripConfigStateInitial(GripConfigStateBase):
         self.base.add_log_string("First pass reading '%s'"%str(self.grip_toml_path))
         self.initial_repo_desc = GripDescriptor(base=self.base)
         self.initial_repo_desc.read_toml_file(self.grip_toml_path, subrepo_descs=[])
+        if self.base.options.get("validate_all",False):
+            self.initial_repo_desc.build_all_configs()
+            pass
         self.initial_repo_desc.read_environment(self.env_toml_path)
         self.initial_repo_desc.validate(check_stage_dependencies=False, error_handler=error_handler) # Don't check stage dependencies as they include subrepo files
         self.initial_repo_desc.resolve(config_name=None, error_handler=error_handler)
         self.initial_repo_desc.resolve_git_urls(self.base_url)
         if self.initial_repo_desc.is_logging_enabled():
-            self.base.log.set_tidy(self.base.log_to_logfile)
+            self.base.enable_logfile()
             pass
         pass
     #f read_state - Read state.toml
@@ -188,7 +191,7 @@ class GripConfigStateConfigured(GripConfigStateBase):
         self.full_repo_desc.resolve_git_urls(self.base_url)
         self.full_repo_desc.validate(check_stage_dependencies=True, error_handler=error_handler)
         if self.full_repo_desc.is_logging_enabled():
-            self.base.log.set_tidy(self.base.log_to_logfile)
+            self.base.enable_logfile()
             pass
         pass
     #f select_configuration
@@ -218,6 +221,15 @@ class GripConfigStateConfigured(GripConfigStateBase):
             yield r
             pass
         pass
+    #f reread_state - Reread state.toml, such as after the grip repository has been updated
+    def reread_state(self) -> None:
+        self.base.add_log_string("Rereading '%s'"%str(self.state_toml_path))
+        self.state_file = GripStateFile(self.base)
+        self.state_file.read_toml_file(self.state_toml_path)
+        state_file_config = self.state_file.select_config(self.config_name, create_if_new=True)
+        assert state_file_config is not None
+        self.state_file_config = state_file_config
+        pass
     #f update_state
     def update_state(self, repo_tree:GripRepository) -> None:
         for r in repo_tree.iter_subrepos():
@@ -48,15 +48,20 @@ class GitRepoState(object):
     This changeset would normally be on the same branch as the grip repo specifies,
     but for some workflows
     """
-    changeset: Optional[str] = None
-    branch   : Optional[str] = None
-    depth    : Optional[int] = None
+    __slots__ = ("name", "changeset", "branch", "depth")
+    name     : str
+    changeset: Optional[str]
+    branch   : Optional[str]
+    depth    : Optional[int]
     #f __init__
     def __init__(self, name:str, repo_desc_config:Optional[ConfigDescriptor]=None, values:Optional[RepoStateTomlDictValues]=None):
         """
         values must be a RepoStateTomlDict._values
         """
         self.name   = name
+        self.changeset = None
+        self.branch    = None
+        self.depth     = None
         if values is not None:
             self.changeset = values.changeset
             self.branch    = values.branch
@@ -75,8 +80,9 @@ class GitRepoState(object):
         return self.changeset
 
     #f update_state
-    def update_state(self, changeset:Optional[str]=None) -> None:
+    def update_state(self, changeset:Optional[str]=None, depth:Optional[int]=None) -> None:
         if changeset is not None: self.changeset = changeset
+        if depth     is not None: self.depth = depth
         pass
     #f toml_dict
     def toml_dict(self) -> Dict[str,Any]:
@@ -1,6 +1,6 @@
 #a Imports
-import os, sys, re, copy
-from typing import Dict, Type, Mapping, Any, List, Optional, Iterable, Callable, IO, cast
+import os, io, sys, re, copy
+from typing import Dict, Type, Mapping, Any, List, Tuple, Optional, Iterable, Callable, IO, cast
 from ..exceptions import *
 from ..env import GripEnv, EnvTomlDict
 from ..tomldict import TomlDict, TomlDictValues, TomlDictParser
@@ -50,12 +50,15 @@ class ConfigTomlDict(TomlDict):
 
 #c DescriptorValues - namespace that contains values from the TomlDict
 class DescriptorValues(object):
-    repos: List[str] = []
-    env:   TomlDictValues = None # type: ignore
+    __slots__ = ("repos", "env", "doc", "stage")
+    repos: List[str]
+    env:   TomlDictValues
     doc:   Optional[str]
     stage: TomlDictValues
     #f __init__
     def __init__(self, values:Optional[TomlDictValues]):
+        self.repos = []
+        self.doc = None
         if values is None:
             self.env   = TomlDictValues(EnvTomlDict)
             self.stage = TomlDictValues(StageConfigTomlDict)
@@ -108,12 +111,12 @@ class Descriptor(object):
         """
         """
         self.repos = {}
-        repo_names = set()
+        repo_names : Dict[str,None] = {} # an ordered set, base repos first
         for rn in self.grip_repo_desc.base_repos:
-            repo_names.add(rn)
+            repo_names[rn] = None
             pass
         for rn in self.values.repos:
-            repo_names.add(rn)
+            repo_names[rn] = None
             pass
         unconfigured_repos = {}
         for rn in repo_names:
@@ -297,16 +300,29 @@ class Descriptor(object):
             pass
         return acc
     #f write_makefile_entries
-    def write_makefile_entries(self, f:IO[str], verbose:Any) -> None:
-        for stage in self.iter_stages():
-            stage.write_makefile_entries(f, verbose)
-            pass
+    def write_makefile_entries(self, f:IO[str], verbose:Any) -> Tuple[Dict[str,str],List[Tuple[str,str]]]:
+        """
+        Write the makefile rules of every stage
+
+        Return the fingerprint of each stage by makefile target name
+        (which changes if anything about the stage changes) and the
+        dependencies between the targets, as (dependent, prerequisite) pairs
+        """
+        fingerprints : Dict[str,str] = {}
+        dependencies : List[Tuple[str,str]] = []
+        stages = list(self.iter_stages())
         for r in self.iter_repos():
-            for stage in r.iter_stages():
-                stage.write_makefile_entries(f, verbose)
+            stages.extend(r.iter_stages())
+            pass
+        for stage in stages:
+            with io.StringIO() as sf:
+                dependencies.extend(stage.write_makefile_entries(sf, verbose))
+                rules = sf.getvalue()
                 pass
+            f.write(rules)
+            fingerprints[stage.dependency.target_name()] = stage.makefile_fingerprint(rules)
             pass
-        pass
+        return (fingerprints, dependencies)
     #f prettyprint
     def prettyprint(self, acc:Any, pp:PrettyPrinter) -> Any:
         acc = pp(acc, "config.%s:" % (self.name))
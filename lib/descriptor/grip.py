@@ -60,18 +60,27 @@ class GripFileTomlDictValues(TomlDictValues):
     env    :     Optional[TomlDictValues]
     pass
 class DescriptorValues(object):
-    name : Optional[str] = None
-    default_config : str      = ""
-    base_repos : List[str]    = []
-    configs : List[str]       = []
-    stages  : List[str]       = []
-    config  : Dict[str, TomlDictValues]  = {}
-    repo    : Dict[str, TomlDictValues]  = {}
-    logging : bool = False
-    workflow : Optional[str] = None
-    doc : Optional[str] = None
+    __slots__ = ("name", "default_config", "base_repos", "configs", "stages", "config", "repo", "logging", "workflow", "doc", "env")
+    name : Optional[str]
+    default_config : str
+    base_repos : List[str]
+    configs : List[str]
+    stages  : List[str]
+    config  : Dict[str, TomlDictValues]
+    repo    : Dict[str, TomlDictValues]
+    logging : bool
+    workflow : Optional[str]
+    doc : Optional[str]
     env : TomlDictValues
     def __init__(self, values:GripFileTomlDictValues):
+        self.name = None
+        self.default_config = ""
+        self.base_repos = []
+        self.configs = []
+        self.stages = []
+        self.logging = False
+        self.workflow = None
+        self.doc = None
         values.Set_obj_properties(self, ["name", "workflow", "base_repos", "default_config", "logging", "doc", "configs", "stages", "config", "repo", "env"])
         if values.base_repos is None: self.base_repos=[]
         if values.stages     is None: self.stages=[]
@@ -104,7 +113,8 @@ class Descriptor(object):
     Attributes:
     -----------
     default_config : <default config string>
-    configs    : list of ConfigDescriptor object instances
+    config_names : list of names of the configurations
+    configs    : dict { <config name> : ConfigDescriptor } of the configurations built so far
     base_repos : list <repo name> of the repos used in all configurations
     repos      : dict { <repo name> : <git repo description object> }
     stages     : list <stage names>
@@ -116,12 +126,16 @@ class Descriptor(object):
     name           : Optional[str]
     default_config : Optional[str]
     base_repos     : List[str]
+    config_names   : List[str]
     configs        : Dict[str,ConfigurationDescriptor]
     repos          : Dict[str,RepositoryDescriptor]
     stages         : Dict[str,StageDescriptor]
     re_valid_name = re.compile(r"[a-zA-Z0-9_]*$")
     workflow : Type[Workflow]
     selected_config : Optional[ConfigurationDescriptor] = None
+    validated_with : Optional[Tuple[bool, ErrorHandler]] = None
+    resolved_with  : Optional[Tuple[Optional[str], ErrorHandler]] = None
+    grip_git_url   : Optional[GitUrl] = None
     #f __init__
     def __init__(self, base:GripBase):
         self.base     = base
@@ -281,17 +295,51 @@ class Descriptor(object):
         for s in self.values.stages:
             self.stages[s] = StageDescriptor(grip_repo_desc=self, name=s, values=None)
             pass
+        # Configurations are built on demand (see get_config), as only one is used;
+        # the default is built now so that errors in it are always reported
+        self.config_names = list(self.values.configs)
         self.configs = {}
-        for config_name in self.values.configs:
-            self.base.add_log_string("Noting values for config '%s'"%config_name)
-            self.configs[config_name] = ConfigurationDescriptor(config_name, self)
+        self.get_config(self.default_config)
+        pass
+    #f get_config - get a configuration, building it if required
+    def get_config(self, config_name:str) -> Optional[ConfigurationDescriptor]:
+        """
+        Return None if the configuration is not defined
+
+        A configuration built after the descriptor has been validated,
+        resolved or had its git urls resolved is validated and resolved
+        in the same way
+        """
+        if config_name in self.configs: return self.configs[config_name]
+        if config_name not in self.config_names: return None
+        self.base.add_log_string("Build values for config '%s'"%config_name)
+        config_desc = ConfigurationDescriptor(config_name, self)
+        config_values = None
+        if config_name in self.values.config:
+            config_values = self.values.config[config_name]
+        config_desc.build_from_values(config_values)
+        self.configs[config_name] = config_desc
+        if self.validated_with is not None:
+            (check_stage_dependencies, error_handler) = self.validated_with
+            config_desc.validate(check_stage_dependencies=check_stage_dependencies, error_handler=error_handler)
+            pass
+        if self.resolved_with is not None:
+            (resolved_config_name, error_handler) = self.resolved_with
+            if resolved_config_name is None:
+                config_desc.resolve(resolve_fully=False, error_handler=error_handler)
+                pass
+            elif resolved_config_name==config_name:
+                config_desc.resolve(resolve_fully=True, error_handler=error_handler)
+                pass
+            pass
+        if self.grip_git_url is not None:
+            config_desc.resolve_git_urls(self.grip_git_url)
             pass
-        for (config_name, config_desc) in self.configs.items():
-            self.base.add_log_string("Build values for config '%s'"%config_name)
-            config_values = None
-            if config_name in self.values.config:
-                config_values = self.values.config[config_name]
-            config_desc.build_from_values(config_values)
+        return config_desc
+    #f build_all_configs - build every configuration, so that they are all validated
+    def build_all_configs(self) -> None:
+        for config_name in self.config_names:
+            self.get_config(config_name)
             pass
         pass
     #f validate
@@ -301,20 +349,21 @@ class Descriptor(object):
             raise RepoDescError("Unnamed repo descriptors are not permitted - the .grip/grip.toml file should have a toplevel 'name' field")
         if self.re_valid_name.match(self.name) is None:
             raise RepoDescError("Names of grip repos must consist only of A-Z, a-z, 0-9 and _ characters (got '%s')"%(self.name))
-        if self.default_config not in self.configs:
-            raise RepoDescError("default_config of '%s' is undefined (defined configs are %s)" % (self.default_config, str_keys(self.configs)))
+        if self.default_config not in self.config_names:
+            raise RepoDescError("default_config of '%s' is undefined (defined configs are %s)" % (self.default_config, ", ".join(self.config_names)))
         if self.values.workflow is None:
             raise RepoDescError("workflow must be defined")
         self.workflow = self.validate_workflow(self.values.workflow, "grip repo description")
+        self.validated_with = (check_stage_dependencies, error_handler)
         for c in self.iter_configs():
             c.validate(check_stage_dependencies=check_stage_dependencies, error_handler=error_handler)
             pass
         if self.logging is None: self.logging=False
         pass
-    #f iter_configs:
+    #f iter_configs - iterate over the selected configuration, or all those built so far
     def iter_configs(self) -> Iterable[ConfigurationDescriptor]:
         if self.selected_config is None:
-            for (n,c) in self.configs.items():
+            for c in list(self.configs.values()):
                 yield(c)
                 pass
         else:
@@ -327,6 +376,7 @@ class Descriptor(object):
         Resolve any values using grip environment variables to config or default values
         """
         self.env.resolve(error_handler=error_handler)
+        self.resolved_with = (config_name, error_handler)
         for c in self.iter_configs():
             if config_name is None:
                 c.resolve(resolve_fully=False, error_handler=error_handler)
@@ -364,7 +414,7 @@ class Descriptor(object):
         return self.name
     #f get_configs - get names of configs
     def get_configs(self) -> List[str]:
-        return list(self.configs.keys())
+        return list(self.config_names)
     #f get_stage - used by Config
     def get_stage(self, stage_name:str) -> Optional[StageDescriptor]:
         """
@@ -396,7 +446,9 @@ class Descriptor(object):
         r : Documentation = []
         r.append(self.get_doc_string())
         if include_configs:
-            for (n,c) in self.configs.items():
+            for n in self.config_names:
+                c = self.get_config(n)
+                assert c is not None
                 r.append(("Configuration %s"%n,[c.get_doc_string()]))
                 pass
             pass
@@ -411,14 +463,15 @@ class Descriptor(object):
         """
         self.selected_config = None
         if config_name is None: config_name=self.default_config
-        if config_name not in self.configs: return None
-        self.selected_config = self.configs[config_name]
-        return self.configs[config_name]
+        if config_name is None: return None
+        self.selected_config = self.get_config(config_name)
+        return self.selected_config
     #f resolve_git_urls
     def resolve_git_urls(self, grip_git_url:GitUrl) -> None:
         """
         Resolve all relative (and those using environment variables?) git urls
         """
+        self.grip_git_url = grip_git_url
         for c in self.iter_configs():
             c.resolve_git_urls(grip_git_url)
             pass
@@ -428,7 +481,7 @@ class Descriptor(object):
         acc = pp(acc, "default_config: %s"%(self.default_config))
         acc = pp(acc, "base_repos:     %s"%(str(self.base_repos)))
         acc = pp(acc, "repos:  %s" % (str(list(self.repos.keys()))))
-        acc = pp(acc, "configs: %s" % (str(list(self.configs.keys()))))
+        acc = pp(acc, "configs: %s" % (str(self.config_names)))
         acc = pp(acc, "stages: %s" % (str(list(self.stages.keys()))))
         for (n,r) in self.repos.items():
             def ppr(acc:Any, s:str, indent:int=0) -> Any:
@@ -1,7 +1,8 @@
 #a Imports
+import re
 from pathlib import Path
 
-from typing import Optional, Type, Dict, List, Union, Any, Tuple, Sequence, Set, Iterable, Callable
+from typing import Optional, Type, Dict, List, Union, Any, Tuple, Sequence, Set, Iterable, Callable, cast
 from ..tomldict import TomlDict, TomlDictParser, TomlDictValues
 from ..git import Url as GitUrl
 from ..exceptions import *
@@ -26,6 +27,8 @@ class RepoDescTomlDict(TomlDict):
     branch    = TomlDictParser.from_dict_attr_value(str)
     path      = TomlDictParser.from_dict_attr_value(str)
     shallow   = TomlDictParser.from_dict_attr_bool()
+    filter    = TomlDictParser.from_dict_attr_value(str)
+    sparse    = TomlDictParser.from_dict_attr_list(str)
     env       = TomlDictParser.from_dict_attr_dict(EnvTomlDict)
     doc       = TomlDictParser.from_dict_attr_value(str)
     Wildcard  = TomlDictParser.from_dict_attr_dict(StageTomlDict)
@@ -33,18 +36,23 @@ class RepoDescTomlDict(TomlDict):
 
 #c DescriptorValues - namespace that contains values from the TomlDict
 class DescriptorValues(object):
-    url      = None
-    branch   = None
-    path     = None
-    workflow = None
-    git_url  = None
-    shallow  = None
-    env      = None
-    doc      = None
-    grip_config = None
-    inherited_properties = ["url", "branch", "path", "workflow", "git_url", "shallow", "env", "doc"]
+    inherited_properties = ["url", "branch", "path", "workflow", "git_url", "shallow", "filter", "sparse", "env", "doc"]
+    __slots__ = tuple(inherited_properties)
+    url      : Optional[str]
+    branch   : Optional[str]
+    path     : Optional[str]
+    workflow : Optional[str]
+    git_url  : Optional[GitUrl]
+    shallow  : Optional[bool]
+    filter   : Optional[str]
+    sparse   : Optional[List[str]]
+    env      : Optional[TomlDictValues]
+    doc      : Optional[str]
     #f __init__
     def __init__(self, values:Optional[TomlDictValues], clone:Optional['DescriptorValues']):
+        for k in self.inherited_properties:
+            setattr(self,k,None)
+            pass
         if values is not None:
             values.Set_obj_properties(self, values.Get_fixed_attrs())
             pass
@@ -69,6 +77,8 @@ class DescriptorBase(object):
     url      : str = "<undefined_url>"
     _path    : Path
     shallow  : bool
+    filter   : Optional[str]=None
+    sparse   : Optional[List[str]]=None
     branch   : Optional[str]=None
     env      : GripEnv
     doc      : Optional[str]=None
@@ -157,6 +167,8 @@ class Descriptor(DescriptorBase):
             acc = pp(acc, "path:        %s" % (str(self._path)), indent=1)
             pass
         if self.branch  is not None: acc = pp(acc, "branch:      %s" % (self.branch), indent=1)
+        if self.filter  is not None: acc = pp(acc, "filter:      %s" % (self.filter), indent=1)
+        if self.sparse  is not None: acc = pp(acc, "sparse:      %s" % (" ".join(self.sparse)), indent=1)
         for name in self.stages:
             def ppr(acc:Any, s:str, indent:int=0) -> Any:
                 return pp(acc, s, indent=indent+1)
@@ -167,6 +179,8 @@ class Descriptor(DescriptorBase):
 class DescriptorInConfig(DescriptorBase):
     """
     """
+    filter_re = re.compile(r"blob:none|blob:limit=\d+[kmg]?|tree:\d+|object:type=(blob|tree|commit|tag)")
+    sparse_invalid_re = re.compile(r"[*?\[\]!\\]|(^|/)\.\.?(/|$)")
     git_url  : GitUrl
     grip_config : 'ConfigurationDescriptor'
     #f __init__
@@ -249,7 +263,7 @@ class DescriptorInConfig(DescriptorBase):
         self.branch  = self.env.substitute(self.values.branch, finalize=True, error_handler=error_handler)
         self._path = Path(self.git_url.repo_name)
         if self.values.path is not None:
-            self._path = Path(self.env.substitute(self.values.path, finalize=True, error_handler=error_handler))
+            self._path = Path(cast(str, self.env.substitute(self.values.path, finalize=True, error_handler=error_handler)))
             pass
 
         if self.values.shallow is None:
@@ -259,6 +273,24 @@ class DescriptorInConfig(DescriptorBase):
             self.shallow = self.values.shallow
             pass
 
+        if self.values.filter is not None:
+            self.filter = self.env.substitute(self.values.filter, finalize=True, error_handler=error_handler)
+            if (self.filter is not None) and (self.filter_re.fullmatch(self.filter) is None):
+                raise GripTomlError("for repo '%s' partial clone filter '%s' is not a supported git object filter"%(self.name, self.filter))
+            pass
+
+        if self.values.sparse is not None:
+            self.sparse = []
+            for p in self.values.sparse:
+                pattern = self.env.substitute(p, finalize=True, error_handler=error_handler)
+                if pattern is None: continue
+                pattern = pattern.strip("/")
+                if (pattern=="") or (self.sparse_invalid_re.search(pattern) is not None):
+                    raise GripTomlError("for repo '%s' sparse checkout pattern '%s' must be a directory path"%(self.name, p))
+                self.sparse.append(pattern)
+                pass
+            pass
+
         self.doc     = self.values.doc
 
         self.env.add_values({"GRIP_REPO_PATH":"@GRIP_ROOT_PATH@/"+str(self._path)})
@@ -309,6 +341,8 @@ class DescriptorInConfig(DescriptorBase):
             acc = pp(acc, "url(parsed)  %s" % (self.git_url.as_string()), indent=1)
             acc = pp(acc, "path:        %s" % (str(self._path)), indent=1)
         if self.branch  is not None: acc = pp(acc, "branch:      %s" % (self.branch), indent=1)
+        if self.filter  is not None: acc = pp(acc, "filter:      %s" % (self.filter), indent=1)
+        if self.sparse  is not None: acc = pp(acc, "sparse:      %s" % (" ".join(self.sparse)), indent=1)
         for name in self.stages:
             def ppr(acc:Any, s:str, indent:int=0) -> Any:
                 return pp(acc, s, indent=indent+1)
@@ -1,5 +1,5 @@
 #a Imports
-import os
+import os, hashlib
 from pathlib import Path
 from typing import Optional, List, Callable, Type, ClassVar, Union, Any, Tuple, IO, cast
 from ..tomldict import TomlDict, TomlDictValues, TomlDictParser
@@ -32,6 +32,7 @@ class Dependency:
     """
     This class is a stage dependency - that is '<name>', '.<name>' or '<repo>.<name>'
     """
+    __slots__ = ("repo_name", "stage_name", "stage", "repo")
     #v makefile_path_fn - function from Dependency instance to its makefile stamp path - class property
     makefile_path_fn : ClassVar[MakefilePathFn]
     #v instance properties
@@ -107,18 +108,6 @@ class Dependency:
         Get makefile stamp of a 'stage', 'requires' or 'satisfies'
         """
         return self.target_name()
-    #f new_makefile_stamp
-    def new_makefile_stamp(self) -> Tuple[str,Path]:
-        """
-        Get an absolute path to a makefile stamp filename
-        Clean the file if it exists
-
-        If repo is None then it is a global stage
-        """
-        tgt      = self.target_name()
-        tgt_path = self.makefile_path()
-        if tgt_path.exists(): tgt_path.unlink()
-        return (tgt, tgt_path)
     #f __str__
     def __str__(self)->str:
         return self.full_name()
@@ -127,15 +116,22 @@ class Dependency:
 
 #c DescriptorValues - namespace that contains values from the TomlDict
 class DescriptorValues(object):
-    wd   = None # Working directory to execute <exec> in (relative to repo desc path)
-    exec = None # Shell script to execute to perform the stage
+    __slots__ = ("wd", "exec", "env", "doc", "action", "requires", "satisfies")
+    wd   : Optional[str] # Working directory to execute <exec> in (relative to repo desc path)
+    exec : Optional[str] # Shell script to execute to perform the stage
     env  : TomlDictValues
-    doc = None
-    action = False
-    requires : List[str]= []
-    satisfies = None
+    doc  : Optional[str]
+    action : bool
+    requires : List[str]
+    satisfies : Optional[str]
     #f __init__
     def __init__(self, values:Optional[TomlDictValues]):
+        self.wd = None
+        self.exec = None
+        self.doc = None
+        self.action = False
+        self.requires = []
+        self.satisfies = None
         if values is None:
             self.env   = TomlDictValues(EnvTomlDict)
             return
@@ -164,6 +160,8 @@ class Descriptor(object):
 
     It may have a repo (which it is for); if it is for a config, though, this will be None
     """
+    __slots__ = ("grip_repo_desc", "repo", "name", "dependency", "cloned_from", "values",
+                 "grip_config", "requires", "satisfies", "env", "wd", "exec", "doc")
     values          : 'DescriptorValues'
     requires        : List[Dependency]
     satisfies       : List[Dependency]
@@ -241,9 +239,29 @@ class Descriptor(object):
         """
         if self.doc is None: return ""
         return self.doc.strip()
+    #f makefile_fingerprint
+    def makefile_fingerprint(self, rules:str) -> str:
+        """
+        Get a fingerprint of the stage given its makefile rules (which
+        include its exec, wd, requires and satisfies) and its complete
+        environment; if this is unchanged then so is the stage
+        """
+        h = hashlib.sha256(rules.encode("utf8"))
+        for (k,v) in sorted(self.env.as_makefile_strings(include_parent=True)):
+            h.update(("\0%s=%s"%(k,v)).encode("utf8"))
+            pass
+        return h.hexdigest()
     #f write_makefile_entries
-    def write_makefile_entries(self, f:IO[str], verbose:Callable[[str], None]) -> None:
-        (tgt, tgt_filename) = self.dependency.new_makefile_stamp()
+    def write_makefile_entries(self, f:IO[str], verbose:Callable[[str], None]) -> List[Tuple[str,str]]:
+        """
+        Write the makefile rules for the stage
+
+        Return the dependencies between makefile targets that the rules
+        add, as (dependent target, prerequisite target) pairs
+        """
+        tgt          = self.dependency.target_name()
+        tgt_filename = self.dependency.makefile_path()
+        dependencies = []
         sn = self.get_name()
         if self.repo is None:
             verbose("Adding global stage '%s'"%sn)
@@ -290,6 +308,7 @@ class Descriptor(object):
             verbose(".. Dependent on '%s'"%(r.target_name()))
             ostgt_filename = r.makefile_path()
             print("%s: %s"%(tgt_filename,ostgt_filename), file=f)
+            dependencies.append((tgt, r.target_name()))
             pass
 
         for s in self.satisfies:
@@ -300,6 +319,7 @@ class Descriptor(object):
             print("%s: %s"%(ostgt_filename, tgt_filename), file=f)
             print("revoke.%s: revoke.%s"%(ostgt, tgt), file=f)
             print("force.%s: force.%s"%(ostgt, tgt), file=f)
+            dependencies.append((ostgt, tgt))
             pass
 
         if self.repo is not None:
@@ -308,9 +328,10 @@ class Descriptor(object):
                 verbose("Global stage '%s' depends on repo '%s' of same name"%(config_stage.name, self.repo.name))
                 stgt_filename = config_stage.dependency.makefile_path()
                 print("%s: %s"%(stgt_filename, tgt_filename), file=f)
+                dependencies.append((config_stage.dependency.target_name(), tgt))
                 pass
             pass
-        pass
+        return dependencies
     #f prettyprint
     def prettyprint(self, acc:Any, pp:PrettyPrinter) -> Any:
         acc = pp(acc, "stage.%s:" % (self.name))
@@ -56,6 +56,13 @@ class SubrepoError(GripException):
     grip_type = "Subrepo"
     pass
 
+class OperationTimeoutError(GripException):
+    """
+    Operation on one or more subrepos timed out
+    """
+    grip_type = "Timeout"
+    pass
+
 #a Git reasons - exceptions for git
 class GitReason(Exception):
     reason = "<unknown reason>"
@@ -73,6 +80,12 @@ class HowUntrackedFiles(GitReason):
 class HowFilesModified(GitReason):
     reason = "modified files"
     pass
+class HowGitFailed(GitReason):
+    reason = "git command failed"
+    def get_reason(self) -> str:
+        if len(self.args)>0: return str(self.args[0])
+        return self.reason
+    pass
 
 #a Exceptions
 class TomlError(ConfigurationError):
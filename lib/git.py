@@ -1,11 +1,13 @@
 #a Imports
-import os, re, unittest
+import os, re, shutil, unittest
 from pathlib import Path, PurePath
 from typing import Type, Dict, Optional, Tuple, Any, List, Union, cast
 from .os_command import OSCommand
 OSCommandError = OSCommand.Error
 from .options import Options
 from .log import Log
+from .progress import ProgressFn, GitProgressParser
+from .mirror import MirrorCache
 from .exceptions import *
 
 #a Global branchnames
@@ -15,10 +17,46 @@ branch_head = "HEAD"
 
 #a Useful functions
 #f global_git_command
-def global_git_command(cmd:str="", cwd:Optional[Path]=None, **kwargs:Any) -> OSCommand:
+def global_git_command(cmd:OSCommand.Cmd="", cwd:Optional[Path]=None, **kwargs:Any) -> OSCommand:
+    """
+    Run a git command; cmd is either a list of arguments to git, or a string to be run by a shell
+    """
     if cwd is None: cmd_cwd=Path()
     else: cmd_cwd=cwd
-    return OSCommand(cmd="git %s"%(cmd), cwd=str(cmd_cwd), **kwargs).run()
+    git_cmd : OSCommand.Cmd
+    if isinstance(cmd, str): git_cmd = "git %s"%(cmd)
+    else: git_cmd = ["git"] + cmd
+    return OSCommand(cmd=git_cmd, cwd=str(cmd_cwd), **kwargs).run()
+
+#f git_dirs_of_path
+def git_dirs_of_path(path:Path) -> Optional[Tuple[Path,Path]]:
+    """
+    Find the git directory and common git directory of a working tree, without running git
+
+    In a worktree (created with 'git worktree add') '.git' is a file
+    containing 'gitdir: <path>', and that git directory has a 'commondir'
+    file giving the directory (shared by all the worktrees) that holds
+    the objects and refs. For a normal checkout both are the '.git'
+    directory.
+
+    Return None if path is not the top of a working tree
+    """
+    dot_git = path.joinpath(".git")
+    if dot_git.is_dir(): return (dot_git, dot_git)
+    if not dot_git.is_file(): return None
+    try:
+        text = dot_git.read_text().strip()
+        pass
+    except OSError:
+        return None
+    if not text.startswith("gitdir:"): return None
+    git_dir = path.joinpath(text[7:].strip())
+    common_dir = git_dir
+    commondir_file = git_dir.joinpath("commondir")
+    if commondir_file.is_file():
+        common_dir = git_dir.joinpath(commondir_file.read_text().strip())
+        pass
+    return (git_dir, common_dir)
 
 #a Classes
 #c Git url class
@@ -118,6 +156,8 @@ class Repository(object):
     """
     A Git repo object for a git repository within the local filesystem
     """
+    sha_re = re.compile(r"[0-9a-f]{40}([0-9a-f]{24})?")
+    bundle_ref = "refs/grip/bundle"
     #t instance properties
     git_url  : str
     url      : Url
@@ -125,15 +165,25 @@ class Repository(object):
     _path     : Path
     options  : Options
     log      : Log
+    progress : Optional[ProgressFn]
+    depth    : Optional[int]
     #f git_os_command
-    def git_os_command(self, cwd:Optional[Path]=None, cmd:str="", **kwargs:Any) -> OSCommand:
+    def git_os_command(self, cwd:Optional[Path]=None, cmd:OSCommand.Cmd="", **kwargs:Any) -> OSCommand:
+        """
+        Run a git command in the repository
+
+        cmd should be a list of arguments to git, so that no shell is
+        required; a string is run by a shell (for compatibility with hooks)
+        """
         if cwd is None:
             cwd = self._path
             pass
-        return OSCommand( log     = self.log,
-                          cmd     = "git %s"%(cmd),
-                          cwd     = str(cwd),
-                          **kwargs).run()
+        return global_git_command(log = self.log,
+                                  cmd = cmd,
+                                  cwd = cwd,
+                                  timeout = self.options.get_command_timeout(),
+                                  cancellation = self.options.get_cancellation(),
+                                  **kwargs)
 
     #f git_command
     def git_command(self, stderr_output_indicates_error:bool=True, exception_on_error:bool=True, **kwargs:Any) -> str:
@@ -149,22 +199,33 @@ class Repository(object):
         Should chase the path to the toplevel (or do git root)
         Should find the git_url this was cloned from too
         """
-        if log is None: log=Log()
-        if options is None: options=Options()
-        self.log = log
-        self.options = options
+        self.init_properties(log=log, options=options)
         if path.is_file(): path=path.parent
         if not path.exists():
             raise PathError("path '%s' does not exist"%str(path))
-        git_output = self.git_command(cwd=path, cmd="rev-parse --show-toplevel")
+        git_output = self.git_command(cwd=path, cmd=["rev-parse", "--show-toplevel"])
         self._path = Path(git_output.strip())
+        self.find_remote(git_url=git_url, permit_no_remote=permit_no_remote)
+        pass
+    #f init_properties - initialize the properties that do not require git
+    def init_properties(self, log:Optional[Log]=None, options:Optional[Options]=None) -> None:
+        if log is None: log=Log()
+        if options is None: options=Options()
+        self.log = log
+        self.options = options
+        self.progress = None
+        self.depth = None
+        pass
+    #f find_remote - find the git url and the upstream of the repository
+    def find_remote(self, git_url:Optional[str], permit_no_remote:bool) -> None:
         if git_url is None:
             try:
-                git_output = self.git_command(cmd="remote get-url origin")
+                git_output = self.git_command(cmd=["remote", "get-url", "origin"])
                 pass
             except Exception as e:
                 if not permit_no_remote: raise e
-                git_url = ""
+                # A repository with no remote is its own url
+                git_output = str(self._path)
                 pass
             git_url = git_output.strip()
             pass
@@ -183,53 +244,387 @@ class Repository(object):
         return True
     #f clone - clone from a Git URL (of a particular branch to a destination directory)
     @classmethod
-    def clone(cls, repo_url:str, new_branch_name:str, dest:Optional[Path]=None, branch:Optional[str]=None, bare:bool=False, depth:Optional[int]=None, changeset:Optional[str]=None, options:Optional[Options]=None, log:Optional[Log]=None) -> 'Repository':
+    def clone(cls, repo_url:str, new_branch_name:str, dest:Optional[Path]=None, branch:Optional[str]=None, bare:bool=False, depth:Optional[int]=None, changeset:Optional[str]=None, options:Optional[Options]=None, log:Optional[Log]=None, progress:Optional[ProgressFn]=None, mirrors:Optional[MirrorCache]=None, filter:Optional[str]=None, sparse:Optional[List[str]]=None) -> 'Repository':
         """
         Clone a branch of a repo_url into a checkout directory
         bare checkouts are used in testing only
 
+        If filter is given then a partial clone is made with that object
+        filter (such as 'blob:none'), and missing objects are fetched
+        when needed; if sparse is given then only those directories (and
+        the files at the top level) are checked out
+
+        If progress is given then it is invoked with progress events as the clone proceeds
+
+        If mirrors is given then the mirror of the repo_url is updated
+        (or created) and used as a reference for the clone
+
         # git clone --depth 1 --single-branch --branch <name> --no-checkout
         # git checkout --detach <changeset>
 
         """
         url = Url(repo_url)
         if dest is None: dest=Path(url.repo_name)
+        if (depth is not None) and (changeset is not None) and (not bare) and (new_branch_name!=""):
+            return cls.clone_shallow_changeset(repo_url=repo_url, new_branch_name=new_branch_name, dest=dest, branch=branch, depth=depth, changeset=changeset, options=options, log=log, progress=progress, mirrors=mirrors, filter=filter, sparse=sparse)
         git_options = []
-        if branch is not None: git_options.append( "--branch %s"%branch )
+        if branch is not None: git_options.extend( ["--branch", branch] )
         if (bare is not None) and bare: git_options.append( "--bare") # For TEST only
         if changeset is not None: git_options.append( "--no-checkout")
-        if depth is not None:   git_options.append( "--depth %s"%(depth))
+        if depth is not None:   git_options.extend( ["--depth", str(depth)] )
+        if filter is not None:  git_options.append( "--filter=%s"%filter )
+        if (sparse is not None) and not bare: git_options.append( "--sparse" )
         if log: log.add_entry_string("Attempting to clone %s branch %s in to %s"%(repo_url, branch, str(dest)))
-        git_cmd = global_git_command(log=log,
-                                     cmd="clone %s %s %s" % (" ".join(git_options), repo_url, str(dest)))
+        if options is None: options=Options()
+        progress_parser = None
+        if progress is not None:
+            git_options.append("--progress")
+            progress_parser = GitProgressParser(progress)
+            pass
+        dest_existed = dest.exists()
+        def run_clone(reference:Optional[Path]) -> OSCommand:
+            assert options is not None
+            assert dest is not None
+            reference_options = []
+            if reference is not None:
+                reference_options = ["--reference", str(reference)]
+                if mirrors is not None and mirrors.dissociate: reference_options.append("--dissociate")
+                pass
+            return global_git_command(log=log,
+                                      cmd=["clone"] + git_options + reference_options + [repo_url, str(dest)],
+                                      timeout = options.get_command_timeout(),
+                                      cancellation = options.get_cancellation(),
+                                      line_callback = progress_parser.line_callback if progress_parser else None)
+        try:
+            if mirrors is None:
+                git_cmd = run_clone(None)
+                pass
+            else:
+                with mirrors.reference(url.as_string(), repo_url) as reference:
+                    git_cmd = run_clone(reference)
+                    pass
+                pass
+            pass
+        except BaseException:
+            if progress_parser: progress_parser.done()
+            # Timed out or interrupted - do not leave a partial clone behind
+            if not dest_existed:
+                if log: log.add_entry_string("Removing partial clone '%s'"%(str(dest)))
+                shutil.rmtree(dest, ignore_errors=True)
+                pass
+            raise
+        if progress_parser: progress_parser.done()
         if git_cmd.rc()!=0:
             raise UserError("Failed to perform git clone - %s"%(git_cmd.stderr()))
         if bare: return cls(path=dest, git_url=repo_url, log=log)
-        git_cmd = global_git_command(log=log, cwd=dest, cmd="rev-parse --verify --quiet %s^{commit}"%branch_upstream)
+        if sparse is not None:
+            git_cmd = global_git_command(log=log, cwd=dest, cmd=["sparse-checkout", "set", "--cone"] + sparse)
+            if git_cmd.rc()!=0: raise UserError("Failed to set sparse checkout of '%s' - %s"%(str(dest), git_cmd.stderr()))
+            pass
+        git_cmd = global_git_command(log=log, cwd=dest, cmd=["rev-parse", "--verify", "--quiet", "%s^{commit}"%branch_upstream])
         if git_cmd.rc()==0:
             if log: log.add_entry_string("Already has branch '%s' - delete it before it causes trouble"%branch_upstream)
-            global_git_command(log=log, cwd=dest, cmd="branch --delete %s"%branch_upstream)
+            global_git_command(log=log, cwd=dest, cmd=["branch", "--delete", branch_upstream])
             pass
-        git_cmd = global_git_command(log=log, cwd=dest, cmd="branch --move %s"%branch_upstream)
+        git_cmd = global_git_command(log=log, cwd=dest, cmd=["branch", "--move", branch_upstream])
         if new_branch_name!="":
             if git_cmd.rc()==0:
                 # If the branch move failed then just create the branch at this head
-                global_git_command(log=log, cwd=dest, cmd="branch %s HEAD"%branch_upstream)
+                global_git_command(log=log, cwd=dest, cmd=["branch", branch_upstream, "HEAD"])
                 pass
             if changeset is None:
-                global_git_command(log=log, cwd=dest, cmd="branch %s HEAD"%new_branch_name)
+                global_git_command(log=log, cwd=dest, cmd=["branch", new_branch_name, "HEAD"])
                 pass
             else:
-                git_cmd = global_git_command(log=log, cwd=dest, cmd="branch %s %s"%(new_branch_name, changeset))
+                git_cmd = global_git_command(log=log, cwd=dest, cmd=["branch", new_branch_name, changeset])
                 if git_cmd.rc()!=0: raise Exception("Failed to point branch %s at required changeset %s - maybe depth is not large enough"%(new_branch_name, changeset))
                 pass
             git_cmd = global_git_command(log=log,
                                             cwd = dest,
-                                            cmd = "checkout %s" % new_branch_name)
+                                            cmd = ["checkout", new_branch_name])
             if git_cmd.rc()!=0:
                 raise Exception("Failed to checkout required changeset - maybe depth is not large enough")
             pass
         return cls(path=Path(dest), git_url=repo_url, log=log, options=options)
+    #f add_worktree - add a worktree of this repository
+    def add_worktree(self, dest:Path, new_branch_name:str, changeset:Optional[str]=None, sparse:Optional[List[str]]=None) -> 'Repository':
+        """
+        Add a git worktree of this repository at dest, sharing its object store, refs and configuration
+
+        The worktree is checked out at changeset (or the upstream branch if
+        None) on a new branch new_branch_name; if new_branch_name is ""
+        then the worktree HEAD is detached. If sparse is given then only
+        those directories are checked out in the worktree.
+
+        The upstream branch is shared by all the worktrees of the
+        repository, so a fetch in any of them updates it for all
+        """
+        start = changeset
+        if start is None:
+            start = branch_upstream if self.has_cs(branch_name=branch_upstream) else branch_head
+            pass
+        cmd = ["worktree", "add"]
+        if new_branch_name=="": cmd.append("--detach")
+        else: cmd.extend(["-b", new_branch_name])
+        self.log.add_entry_string("Adding worktree of %s at %s in to %s"%(str(self._path), start, str(dest)))
+        git_cmd = self.git_os_command(cmd=cmd + [str(dest.absolute()), start])
+        if git_cmd.rc()!=0:
+            raise UserError("Failed to add git worktree of '%s' at '%s' - %s"%(str(self._path), str(dest), git_cmd.stderr()))
+        worktree = self.__class__(path=dest, git_url=self.git_url, log=self.log, options=self.options)
+        if sparse is not None:
+            worktree.git_command(cmd=["sparse-checkout", "set", "--cone"] + sparse, stderr_output_indicates_error=False)
+            pass
+        return worktree
+    #f git_dir - get the git directory of the repository
+    def git_dir(self) -> Path:
+        dirs = git_dirs_of_path(self._path)
+        if dirs is None: raise PathError("Could not find git directory of '%s'"%(str(self._path)))
+        return dirs[0]
+    #f common_git_dir - get the git directory holding the objects and refs of the repository
+    def common_git_dir(self) -> Path:
+        dirs = git_dirs_of_path(self._path)
+        if dirs is None: raise PathError("Could not find git directory of '%s'"%(str(self._path)))
+        return dirs[1]
+    #f read_ref - read the changeset of a ref from the git directory, without running git
+    def read_ref(self, ref:str) -> Optional[str]:
+        """
+        ref is a full ref name (such as 'refs/heads/upstream'), which is
+        read from a loose ref or packed-refs, or a pseudo-ref (such as
+        'FETCH_HEAD') in the git directory
+
+        Return None if it cannot be read this way (if, for example, it
+        is a symbolic ref), in which case git should be asked
+        """
+        dirs = git_dirs_of_path(self._path)
+        if dirs is None: return None
+        (git_dir, common_dir) = dirs
+        is_ref = ref.startswith("refs/")
+        try:
+            words = (common_dir if is_ref else git_dir).joinpath(ref).read_text().split()
+            if (len(words)>0) and (self.sha_re.fullmatch(words[0]) is not None): return words[0]
+            return None
+        except OSError:
+            pass
+        if not is_ref: return None
+        try:
+            for l in common_dir.joinpath("packed-refs").read_text().split("\n"):
+                words = l.split()
+                if (len(words)==2) and (words[1]==ref) and (self.sha_re.fullmatch(words[0]) is not None): return words[0]
+                pass
+            pass
+        except OSError:
+            pass
+        return None
+    #f is_shallow - return True if the repository is shallow
+    def is_shallow(self) -> bool:
+        dirs = git_dirs_of_path(self._path)
+        if dirs is None: return False
+        return dirs[1].joinpath("shallow").is_file()
+    #f is_worktree - return True if the repository is a worktree of another
+    def is_worktree(self) -> bool:
+        return self.git_dir().resolve() != self.common_git_dir().resolve()
+    #f get_branch_worktree - get the path of the worktree that has a branch checked out
+    def get_branch_worktree(self, branch_name:str) -> Optional[Path]:
+        """
+        Of all the worktrees sharing this repository (including this one)
+        find the one that has branch_name checked out, if any
+        """
+        output = self.git_command(cmd=["worktree", "list", "--porcelain"])
+        worktree = None
+        for l in output.split("\n"):
+            if l.startswith("worktree "): worktree = Path(l[9:])
+            elif l.strip()=="branch refs/heads/%s"%(branch_name): return worktree
+            pass
+        return None
+    #f clone_shallow_changeset - classmethod to clone a changeset with limited history
+    @classmethod
+    def clone_shallow_changeset(cls, repo_url:str, new_branch_name:str, dest:Path, branch:Optional[str], depth:int, changeset:str, options:Optional[Options]=None, log:Optional[Log]=None, progress:Optional[ProgressFn]=None, mirrors:Optional[MirrorCache]=None, filter:Optional[str]=None, sparse:Optional[List[str]]=None) -> 'Repository':
+        """
+        Create a shallow clone of a repo_url with new_branch_name at the changeset, which need not be the branch tip
+
+        An empty repository is created, and the branch tip and the
+        changeset are fetched at the required depth; servers that do not
+        permit fetching a changeset by its hash get the branch history
+        deepened in growing steps until the changeset is reachable.
+
+        The depth of the resulting clone is recorded in the returned
+        repository, so that later fetches can use it
+
+        # git init
+        # git fetch --depth 1 origin +refs/heads/<branch>:refs/remotes/origin/<branch> <changeset>
+        # git fetch --deepen <n> origin +refs/heads/<branch>:refs/remotes/origin/<branch>
+        """
+        if options is None: options=Options()
+        if log: log.add_entry_string("Attempting shallow clone of %s branch %s cs %s in to %s"%(repo_url, branch, changeset, str(dest)))
+        progress_parser = None
+        if progress is not None: progress_parser = GitProgressParser(progress)
+        def git(cmd:List[str], fetch:bool=False) -> OSCommand:
+            assert options is not None
+            line_callback = None
+            if fetch and (progress_parser is not None):
+                cmd = cmd[:1] + ["--progress"] + cmd[1:]
+                line_callback = progress_parser.line_callback
+                pass
+            return global_git_command(log=log, cwd=dest, cmd=cmd,
+                                      timeout = options.get_command_timeout(),
+                                      cancellation = options.get_cancellation(),
+                                      line_callback = line_callback)
+        def has_changeset() -> bool:
+            return git(["rev-parse", "--verify", "--quiet", "%s^{commit}"%changeset]).rc()==0
+        def fetch_changeset(reference:Optional[Path]) -> int:
+            if reference is not None:
+                dest.joinpath(".git","objects","info").mkdir(parents=True, exist_ok=True)
+                dest.joinpath(".git","objects","info","alternates").write_text("%s\n"%str(reference.joinpath("objects").absolute()))
+                pass
+            git_cmd = git(["fetch", "--depth", str(depth), "origin", branch_refspec, changeset], fetch=True)
+            fetched_depth = depth
+            if (git_cmd.rc()!=0) or not has_changeset():
+                if log: log.add_entry_string("Could not fetch changeset %s directly - deepening branch %s"%(changeset, branch))
+                git_cmd = git(["fetch", "--depth", str(depth), "origin", branch_refspec], fetch=True)
+                if git_cmd.rc()!=0: raise UserError("Failed to fetch branch '%s' of '%s' - %s"%(branch, repo_url, git_cmd.stderr()))
+                step = depth
+                while not has_changeset():
+                    if git(["rev-parse", "--is-shallow-repository"]).stdout().strip()!="true":
+                        raise UserError("Changeset %s is not on branch %s of %s"%(changeset, branch, repo_url))
+                    git_cmd = git(["fetch", "--deepen", str(step), "origin", branch_refspec], fetch=True)
+                    if git_cmd.rc()!=0: raise UserError("Failed to deepen branch '%s' of '%s' - %s"%(branch, repo_url, git_cmd.stderr()))
+                    fetched_depth += step
+                    step *= 2
+                    pass
+                pass
+            if (reference is not None) and (mirrors is not None) and mirrors.dissociate:
+                # The changeset may be behind the fetched branch tip, so hold it in a ref while repacking
+                git(["update-ref", "refs/grip/dissociate", changeset])
+                git_cmd = git(["repack", "-a", "-d", "-q"])
+                if git_cmd.rc()!=0: raise UserError("Failed to dissociate clone '%s' from its mirror - %s"%(str(dest), git_cmd.stderr()))
+                git(["update-ref", "-d", "refs/grip/dissociate"])
+                dest.joinpath(".git","objects","info","alternates").unlink()
+                pass
+            return fetched_depth
+        dest_existed = dest.exists()
+        try:
+            dest.mkdir(parents=True, exist_ok=True)
+            git_cmd = git(["init", "--quiet"])
+            if git_cmd.rc()!=0: raise UserError("Failed to create repository for clone - %s"%(git_cmd.stderr()))
+            git(["remote", "add", "origin", repo_url])
+            if filter is not None:
+                git(["config", "remote.origin.promisor", "true"])
+                git(["config", "remote.origin.partialclonefilter", filter])
+                pass
+            if sparse is not None:
+                git_cmd = git(["sparse-checkout", "set", "--cone"] + sparse)
+                if git_cmd.rc()!=0: raise UserError("Failed to set sparse checkout of '%s' - %s"%(str(dest), git_cmd.stderr()))
+                pass
+            if branch is None:
+                git_cmd = git(["ls-remote", "--symref", "origin", "HEAD"])
+                m = re.match(r"ref: refs/heads/(\S+)\s+HEAD", git_cmd.stdout())
+                if m is None: raise UserError("Failed to determine the default branch of '%s' - %s"%(repo_url, git_cmd.stderr()))
+                branch = m.group(1)
+                pass
+            branch_refspec = "+refs/heads/%s:refs/remotes/origin/%s"%(branch, branch)
+            if mirrors is None:
+                fetched_depth = fetch_changeset(None)
+                pass
+            else:
+                with mirrors.reference(Url(repo_url).as_string(), repo_url) as reference:
+                    fetched_depth = fetch_changeset(reference)
+                    pass
+                pass
+            pass
+        except BaseException:
+            if progress_parser: progress_parser.done()
+            if not dest_existed:
+                if log: log.add_entry_string("Removing partial clone '%s'"%(str(dest)))
+                shutil.rmtree(dest, ignore_errors=True)
+                pass
+            raise
+        if progress_parser: progress_parser.done()
+        git(["branch", "--force", branch_upstream, "refs/remotes/origin/%s"%branch])
+        git(["branch", "--set-upstream-to=origin/%s"%branch, branch_upstream])
+        git_cmd = git(["checkout", "-b", new_branch_name, changeset])
+        if git_cmd.rc()!=0:
+            raise Exception("Failed to checkout required changeset %s - %s"%(changeset, git_cmd.stderr()))
+        repo = cls(path=Path(dest), git_url=repo_url, log=log, options=options)
+        repo.depth = fetched_depth
+        return repo
+    #f clone_from_bundles - create a clone from git bundles, without contacting the remote
+    @classmethod
+    def clone_from_bundles(cls, bundles:List[Path], repo_url:str, branch:str, changeset:str, new_branch_name:str, dest:Path, sparse:Optional[List[str]]=None, options:Optional[Options]=None, log:Optional[Log]=None) -> 'Repository':
+        """
+        Create a repository at dest with origin repo_url, fetching the
+        history from the bundles (created by create_bundle) in order
+        rather than from origin
+
+        The upstream branch tracks origin/<branch>, which is set to the
+        head of the last bundle; new_branch_name is checked out at
+        changeset, or if it is "" then the upstream branch is checked out;
+        if sparse is given then only those directories are checked out
+
+        # git init
+        # git fetch <bundle> +refs/grip/bundle:refs/remotes/origin/<branch>
+        """
+        if options is None: options=Options()
+        if log: log.add_entry_string("Attempting clone of %s branch %s cs %s in to %s from bundles"%(repo_url, branch, changeset, str(dest)))
+        def git(cmd:List[str]) -> OSCommand:
+            assert options is not None
+            return global_git_command(log=log, cwd=dest, cmd=cmd,
+                                      timeout = options.get_command_timeout(),
+                                      cancellation = options.get_cancellation())
+        if dest.exists(): raise UserError("Cannot clone to %s as it already exists"%(str(dest)))
+        try:
+            dest.mkdir(parents=True)
+            git_cmd = git(["init", "--quiet"])
+            if git_cmd.rc()!=0: raise UserError("Failed to create repository for clone - %s"%(git_cmd.stderr()))
+            git(["remote", "add", "origin", repo_url])
+            if sparse is not None:
+                git_cmd = git(["sparse-checkout", "set", "--cone"] + sparse)
+                if git_cmd.rc()!=0: raise UserError("Failed to set sparse checkout of '%s' - %s"%(str(dest), git_cmd.stderr()))
+                pass
+            for bundle in bundles:
+                git_cmd = git(["fetch", "--quiet", "--no-tags", str(bundle.absolute()), "+%s:refs/remotes/origin/%s"%(cls.bundle_ref, branch)])
+                if git_cmd.rc()!=0: raise UserError("Failed to fetch from bundle for '%s' - %s"%(repo_url, git_cmd.stderr()))
+                pass
+            git(["branch", "--force", branch_upstream, "refs/remotes/origin/%s"%branch])
+            git(["branch", "--set-upstream-to=origin/%s"%branch, branch_upstream])
+            if new_branch_name=="":
+                git_cmd = git(["checkout", branch_upstream])
+                pass
+            else:
+                git_cmd = git(["checkout", "-b", new_branch_name, changeset])
+                pass
+            if git_cmd.rc()!=0:
+                raise UserError("Failed to checkout required changeset %s - %s"%(changeset, git_cmd.stderr()))
+            pass
+        except BaseException:
+            if log: log.add_entry_string("Removing partial clone '%s'"%(str(dest)))
+            shutil.rmtree(dest, ignore_errors=True)
+            raise
+        return cls(path=Path(dest), git_url=repo_url, log=log, options=options)
+    #f create_bundle - create a git bundle of the history of a changeset
+    def create_bundle(self, path:Path, changeset:str, prerequisite:Optional[str]=None) -> None:
+        """
+        Create a git bundle at path containing the history of changeset
+        (excluding that of prerequisite, if given) as the ref 'refs/grip/bundle'
+        """
+        self.git_command(cmd=["update-ref", self.bundle_ref, changeset])
+        try:
+            cmd = ["bundle", "create", "--quiet", str(path.absolute())]
+            if prerequisite is not None: cmd.append("^%s"%prerequisite)
+            git_cmd = self.git_os_command(cmd=cmd+[self.bundle_ref])
+            if git_cmd.rc()!=0:
+                raise UserError("Failed to create bundle of '%s' - %s"%(str(self._path), git_cmd.stderr()))
+            pass
+        finally:
+            self.git_os_command(cmd=["update-ref", "-d", self.bundle_ref])
+            pass
+        pass
+    #f is_ancestor - return True if ancestor is an ancestor of (or the same as) changeset
+    def is_ancestor(self, ancestor:str, changeset:str) -> bool:
+        return self.git_os_command(cmd=["merge-base", "--is-ancestor", ancestor, changeset]).rc()==0
+    #f set_progress - set a progress function for long operations (such as fetch)
+    def set_progress(self, progress:Optional[ProgressFn]) -> None:
+        self.progress = progress
+        pass
     #f get_upstream - get Remote corresponding to the upstream
     def get_upstream(self) -> Optional[Remote]:
         return self.upstream
@@ -262,13 +657,13 @@ class Repository(object):
     #f get_config
     def get_config(self, config_path:List[str]) -> str:
         config=".".join(config_path)
-        return self.git_command(cmd="config --get %s"%config).strip()
+        return self.git_command(cmd=["config", "--get", config]).strip()
     #f set_upstream_of_branch
     def set_upstream_of_branch(self, branch_name:str, remote:Remote) -> str:
         """
         Set upstream of a branch
         """
-        output = self.git_command(cmd="branch --set-upstream-to=%s/%s '%s'"%(remote.get_origin(), remote.get_branch(), branch_name))
+        output = self.git_command(cmd=["branch", "--set-upstream-to=%s/%s"%(remote.get_origin(), remote.get_branch()), branch_name])
         output = output.strip()
         if len(output.strip()) > 0: return output
         raise Exception("Failed to set upstream branch for git repo '%s' branch '%s'"%(self.get_name(), branch_name))
@@ -279,7 +674,7 @@ class Repository(object):
 
         This is more valuable to the user if git repo is_modified() is false.
         """
-        output = self.git_command(cmd="rev-parse --abbrev-ref '%s'"%ref)
+        output = self.git_command(cmd=["rev-parse", "--abbrev-ref", ref])
         output = output.strip()
         if len(output.strip()) > 0: return output
         raise Exception("Failed to determine branch for git repo '%s' ref '%s'"%(self.get_name(), ref))
@@ -291,7 +686,7 @@ class Repository(object):
         This is more valuable to the user if git repo is_modified() is false.
         """
         if branch_name is None: branch_name="HEAD"
-        output = self.git_command(cmd="rev-parse '%s'"%branch_name)
+        output = self.git_command(cmd=["rev-parse", branch_name])
         output = output.strip()
         if len(output.strip()) > 0: return output
         raise Exception("Failed to determine changeset for git repo '%s' branch '%s'"%(self.get_name(), branch_name))
@@ -301,13 +696,13 @@ class Repository(object):
         Determine if a branch/hash is in the repo
         """
         if branch_name is None: branch_name="HEAD"
-        git_cmd = self.git_os_command(cmd="rev-parse --verify --quiet %s^{commit}"%branch_name)
+        git_cmd = self.git_os_command(cmd=["rev-parse", "--verify", "--quiet", "%s^{commit}"%branch_name])
         return git_cmd.rc()==0
     #f get_file_from_cs
     def get_file_from_cs(self, path:Path, cs:str) -> str:
         path_and_cs = str(path.relative_to(self._path))
         if cs!="": path_and_cs = cs+":"+path_and_cs
-        git_cmd = self.git_os_command(cmd="show %s"%path_and_cs)
+        git_cmd = self.git_os_command(cmd=["show", path_and_cs])
         if git_cmd.rc()!=0:
             raise Exception("Failed to get file '%s' from cs '%s'"%(str(path), cs))
         return git_cmd.stdout()
@@ -317,17 +712,17 @@ class Repository(object):
         Return None if the git repo is unmodified since last commit
         Return <how> if the git repo is modified since last commit
         """
-        self.git_command(cmd="update-index -q --refresh")
+        self.git_command(cmd=["update-index", "-q", "--refresh"])
 
-        if not self.options.get("ignore_unmodified",False):
-            output = self.git_command(cmd="diff-index --name-only HEAD")
+        if not self.options.get("ignore_modified",False):
+            output = self.git_command(cmd=["diff-index", "--name-only", "HEAD"])
             output = output.strip()
             if len(output.strip()) > 0:
                 return HowFilesModified(output)
             pass
 
         if not self.options.get("ignore_untracked",False):
-            output = self.git_command(cmd="ls-files -o --exclude-standard")
+            output = self.git_command(cmd=["ls-files", "-o", "--exclude-standard"])
             output = output.strip()
             if len(output.strip()) > 0:
                 return HowUntrackedFiles(output)
@@ -340,13 +735,13 @@ class Repository(object):
 
         Used, for example, to make upstream point to a newly fetched head
         """
-        return self.git_command(cmd="branch -f '%s' '%s'"%(branch_name, ref)).strip()
+        return self.git_command(cmd=["branch", "-f", branch_name, ref]).strip()
     #f get_common_ancestor
     def get_common_ancestor(self, cs1:str, cs2:str) -> str:
         """
         Get the most recent common ancestor of two branches
         """
-        git_cmd = self.git_os_command(cmd="merge-base '%s' '%s'"%(cs1, cs2))
+        git_cmd = self.git_os_command(cmd=["merge-base", cs1, cs2])
         if git_cmd.rc()!=0:
             raise Exception("Failed to get common ancestor of '%s' and '%s'"%(cs1, cs2))
         return git_cmd.stdout().strip()
@@ -358,8 +753,10 @@ class Repository(object):
         This is more valuable to the user if git repo is_modified() is false.
         """
         try:
-            output = self.git_command(cmd="rev-list '%s'"%branch_name)
+            output = self.git_command(cmd=["rev-list", branch_name])
             pass
+        except OSCommand.Timeout:
+            raise
         except:
             raise HowUnknownBranch("Failed to determine changeset history of '%s' branch for git repo '%s' - is this a properly configured git repo"%(branch_name, self.get_name()))
         output = output.strip()
@@ -371,66 +768,137 @@ class Repository(object):
         """
         Get status
         """
-        status_option = ""
+        cmd = ["status", "--porcelain"]
         if self.options.get("ignore_untracked",False):
-            status_option = "--untracked-files=no"
+            cmd.append("--untracked-files=no")
             pass
-        output = self.git_command(cmd="status --porcelain %s"%status_option,
+        output = self.git_command(cmd=cmd,
                                   stderr_output_indicates_error=False )
         output = output.strip()
         return(output)
     #f fetch
-    def fetch(self) -> str:
+    def fetch(self) -> Tuple[str, Optional[str]]:
         """
-        Fetch changes from remote
-        """
-        output = self.git_command(cmd="fetch",
-                                  stderr_output_indicates_error=False
-        )
-        output = output.strip()
-        return output
+        Fetch changes from remote, returning the output and the fetched changeset of the upstream branch
+
+        Only the remote branch that the upstream branch tracks is fetched,
+        and tags are not fetched unless the 'fetch_tags' option is set; a
+        shallow repository is fetched to the depth recorded for it. If
+        the upstream branch tracks no remote branch then the remote is
+        fetched as configured.
+
+        The fetched changeset is read from FETCH_HEAD, and is None if
+        that cannot be read (when git should be asked for it)
+
+        If a progress function has been set then it is invoked with progress events as the fetch proceeds
+        """
+        cmd = ["fetch"]
+        if not self.options.get("fetch_tags",False): cmd.append("--no-tags")
+        if (self.depth is not None) and self.is_shallow(): cmd.extend(["--depth", str(self.depth)])
+        upstream = self.upstream
+        if (upstream is not None) and (upstream.get_origin()!="."):
+            cmd.extend([upstream.get_origin(), "+refs/heads/%s:refs/remotes/%s/%s"%(upstream.get_branch(), upstream.get_origin(), upstream.get_branch())])
+            pass
+        if self.progress is None:
+            output = self.git_command(cmd=cmd,
+                                      stderr_output_indicates_error=False
+            )
+            pass
+        else:
+            progress_parser = GitProgressParser(self.progress)
+            try:
+                output = self.git_command(cmd=cmd[:1] + ["--progress"] + cmd[1:],
+                                          stderr_output_indicates_error=False,
+                                          line_callback = progress_parser.line_callback
+                )
+                pass
+            finally:
+                progress_parser.done()
+                pass
+            pass
+        fetched_cs = None
+        if (upstream is not None) and (upstream.get_origin()!="."): fetched_cs = self.read_ref("FETCH_HEAD")
+        return (output.strip(), fetched_cs)
     #f rebase
     def rebase(self, other_branch:str) -> Optional[GitReason]:
         """
         Rebase branch with other_branch
         """
-        cmd_options = ""
-        if self.options.get("interactive",False): cmd_options+=" --interactive"
+        cmd = ["rebase"]
+        if self.options.get("interactive",False): cmd.append("--interactive")
+        cmd.append(other_branch)
         try:
-            output = self.git_command(cmd="rebase %s %s"%(cmd_options,other_branch),
+            output = self.git_command(cmd=cmd,
                                       stderr_output_indicates_error=False)
             output = output.strip()
             pass
+        except OSCommand.Timeout:
+            raise
         except Exception as e:
-            return GitReason("rebase failed : %s"%(str(e)))
+            return HowGitFailed("rebase failed : %s"%(str(e)))
+        return None
+    #f fast_forward
+    def fast_forward(self, changeset:str) -> Optional[GitReason]:
+        """
+        Move HEAD (and the branch it is on, if any) forward to changeset,
+        which must be a descendant of HEAD
+
+        Only the files that differ between HEAD and changeset are checked
+        out (a two-tree read-tree merge), which fails without changing
+        anything if a modified file would be overwritten; the ref is then
+        updated only if HEAD has not moved in the meantime. The index is
+        refreshed first, as read-tree treats a file whose stat information
+        is stale (such as one rewritten with the same content) as modified
+        """
+        try:
+            head_cs = self.get_cs()
+            self.git_command(cmd=["update-index", "-q", "--refresh"])
+            self.git_command(cmd=["read-tree", "-m", "-u", head_cs, changeset])
+            self.git_command(cmd=["update-ref", "-m", "grip: fast-forward to %s"%changeset, "HEAD", changeset, head_cs])
+            pass
+        except OSCommand.Timeout:
+            raise
+        except Exception as e:
+            return HowGitFailed("fast-forward failed : %s"%(str(e)))
         return None
     #f commit
     def commit(self) -> str:
         """
         Commit
         """
-        cmd_options = "-a "
-        if self.options.has("message"):
-            cmd_options+=" -m '%s'"%(self.options.get("message"))
+        cmd = ["commit", "-a"]
+        if self.options.get("message",None) is not None:
+            cmd.extend(["-m", self.options.get("message")])
+            pass
         try:
-            output = self.git_command(cmd="commit %s"%(cmd_options))
+            output = self.git_command(cmd=cmd)
             output = output.strip()
             pass
+        except OSCommand.Timeout:
+            raise
         except Exception as e:
             raise GitReason("commit failed : %s"%(str(e)))
         return output
     #f push
-    def push(self, repo:str, ref:str, dry_run:bool=True ) -> None:
+    def push(self, repo:str, ref:Union[str,List[str]], dry_run:bool=True ) -> None:
         """
         Push to 'repo ref', with optional dry_run
-        """
-        cmd_options = ""
-        if dry_run: cmd_options+=" --dry-run"
+
+        ref may be a list of refs, which are then pushed atomically
+        """
+        refs = [ref] if isinstance(ref,str) else ref
+        cmd = ["push"]
+        if dry_run: cmd.append("--dry-run")
+        if len(refs)>1: cmd.append("--atomic")
+        cmd.append(repo)
+        cmd.extend(refs)
         try:
-            output = self.git_command(cmd="push %s '%s' '%s'"%(cmd_options,repo,ref),
+            output = self.git_command(cmd=cmd,
                                       stderr_output_indicates_error=False)
             output = output.strip()
             pass
+        except OSCommand.Timeout:
+            raise
         except Exception as e:
             raise GitReason("push failed : %s"%(str(e)))
         return None
@@ -439,7 +907,7 @@ class Repository(object):
         """
         Checkout changeset
         """
-        self.git_command(cmd="checkout %s"%(changeset), stderr_output_indicates_error=False)
+        self.git_command(cmd=["checkout", changeset], stderr_output_indicates_error=False)
         pass
     #f path - get a path relative to the repository
     def path(self, path:Optional[Path]=None) -> Path:
@@ -448,3 +916,46 @@ class Repository(object):
     #f All done
     pass
 
+
+#c LazyRepository class
+class LazyRepository(Repository):
+    """
+    A Git repo object for a checked-out repository whose remote and
+    upstream are only found (by running git) when first required
+
+    If the path is the top of a git working tree (which is checked
+    without running git) then no git command is run until the remote or
+    upstream is needed; otherwise the repository is found as for
+    Repository, so a missing checkout raises the same exception at the
+    same point.
+    """
+    lazy_properties = ["git_url", "url", "upstream"]
+    _pending : Optional[Tuple[Optional[str], bool]]
+    #f __init__
+    def __init__(self, path:Path, git_url:Optional[str]=None, permit_no_remote:bool=False, log:Optional[Log]=None, options:Optional[Options]=None):
+        self._pending = None
+        if git_dirs_of_path(path) is None:
+            Repository.__init__(self, path=path, git_url=git_url, permit_no_remote=permit_no_remote, log=log, options=options)
+            return
+        self.init_properties(log=log, options=options)
+        self._path = path.resolve()
+        self._pending = (git_url, permit_no_remote)
+        pass
+    #f __getattr__ - invoked only for properties that are not set, so find the remote if it is pending
+    def __getattr__(self, name:str) -> Any:
+        pending = self.__dict__.get("_pending", None)
+        if (pending is None) or (name not in self.lazy_properties):
+            raise AttributeError("'%s' object has no attribute '%s'"%(self.__class__.__name__, name))
+        self._pending = None
+        try:
+            self.find_remote(git_url=pending[0], permit_no_remote=pending[1])
+            pass
+        except BaseException:
+            self._pending = pending
+            raise
+        return getattr(self, name)
+    #f is_resolved - return True if the remote and upstream have been found
+    def is_resolved(self) -> bool:
+        return self._pending is None
+    #f All done
+    pass
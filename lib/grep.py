@@ -0,0 +1,162 @@
+#a Imports
+import re, sys, threading
+from pathlib import Path
+from typing import Optional, List, Tuple, IO
+
+from .log import Log
+from .os_command import OSCommand, Cancellation
+from .parallel import ParallelJobs
+from .git import global_git_command
+from .exceptions import *
+
+#a Classes
+#c GrepSource - a repository to search
+class GrepSource:
+    """
+    A repository to search: the working tree path of the git repository,
+    the prefix of its paths in the results, and the changeset to search
+    (or None to search the working tree)
+    """
+    name      : str
+    path      : Path
+    prefix    : str
+    changeset : Optional[str]
+    #f __init__
+    def __init__(self, name:str, path:Path, prefix:str, changeset:Optional[str]=None) -> None:
+        self.name = name
+        self.path = path
+        self.prefix = prefix
+        self.changeset = changeset
+        pass
+    #f All done
+    pass
+
+#c GripGrep - a search of many repositories with git grep
+class GripGrep:
+    """
+    A 'git grep' of many repositories at once, with the results printed
+    as they arrive with the prefix of their repository
+
+    With context lines (-A, -B or -C), the groups of lines are separated
+    by '--' lines, and only the matching lines are counted as results. A
+    line is taken to be a match if its path is followed by ':N:' rather
+    than '-N-' (the earlier, if both appear).
+
+    Once limit results have been printed the remaining searches are
+    stopped, and any further output is discarded.
+    """
+    context_options = ["-A", "-B", "-C", "--after-context", "--before-context", "--context"]
+    match_re   = re.compile(r":\d+:")
+    context_re = re.compile(r"-\d+-")
+    patterns     : List[str]
+    grep_options : List[str]
+    pathspecs    : List[str]
+    limit        : Optional[int]
+    sources      : List[GrepSource]
+    log          : Optional[Log]
+    output       : IO[str]
+    errors       : IO[str]
+    num_results  : int
+    lock         : threading.Lock
+    #f __init__
+    def __init__(self, patterns:List[str], grep_options:List[str]=[], pathspecs:List[str]=[], limit:Optional[int]=None, log:Optional[Log]=None, output:Optional[IO[str]]=None, errors:Optional[IO[str]]=None) -> None:
+        """
+        The results are printed to output (default stdout) and any errors from git to errors (default stderr)
+        """
+        if len(patterns)==0: raise UserError("No pattern given to search for")
+        self.patterns = patterns
+        self.grep_options = grep_options
+        self.pathspecs = pathspecs
+        self.limit = limit
+        self.sources = []
+        self.log = log
+        self.output = sys.stdout if output is None else output
+        self.errors = sys.stderr if errors is None else errors
+        self.num_results = 0
+        self.lock = threading.Lock()
+        pass
+    #f add_source - add a repository to be searched
+    def add_source(self, source:GrepSource) -> None:
+        self.sources.append(source)
+        pass
+    #f files_only
+    def files_only(self) -> bool:
+        return ("-l" in self.grep_options) or ("--files-with-matches" in self.grep_options)
+    #f has_context
+    def has_context(self) -> bool:
+        for o in self.grep_options:
+            for c in self.context_options:
+                if o.startswith(c): return True
+                pass
+            pass
+        return False
+    #f result_line - convert a line of git grep output to the line to print
+    def result_line(self, source:GrepSource, line:str) -> Tuple[str, bool]:
+        """
+        Return the line with the changeset removed and the path prefixed,
+        and whether it is a result (rather than a separator or context)
+        """
+        if line=="--": return (line, False)
+        if source.changeset is not None:
+            for sep in [":", "-"]:
+                if line.startswith(source.changeset+sep):
+                    line = line[len(source.changeset)+1:]
+                    break
+                pass
+            pass
+        is_result = True
+        if self.has_context():
+            match = self.match_re.search(line)
+            context = self.context_re.search(line)
+            is_result = (match is not None) and ((context is None) or (match.start()<context.start()))
+            pass
+        return ("%s%s"%(source.prefix, line), is_result)
+    #f search_source - run git grep on a source, printing its results
+    def search_source(self, source:GrepSource, cancellation:Cancellation, timeout:Optional[float]=None) -> int:
+        """
+        Return the exit code of the git grep (0 if there were matches, 1 if not)
+        """
+        cmd = ["grep", "--no-color"] + self.grep_options
+        if not self.files_only(): cmd.append("-n")
+        for p in self.patterns: cmd.extend(["-e", p])
+        if source.changeset is not None: cmd.append(source.changeset)
+        cmd.append("--")
+        cmd.extend(self.pathspecs)
+        def result(stream:str, line:str) -> None:
+            with self.lock:
+                if cancellation.is_cancelled(): return
+                if stream=="stderr":
+                    print("%s: %s"%(source.name, line), file=self.errors)
+                    return
+                (line, is_result) = self.result_line(source, line)
+                print(line, file=self.output)
+                if not is_result: return
+                self.num_results += 1
+                if (self.limit is not None) and (self.num_results>=self.limit): cancellation.cancel()
+                pass
+            pass
+        git_cmd = global_git_command(log=self.log, cmd=cmd, cwd=source.path,
+                                     timeout = timeout,
+                                     cancellation = cancellation,
+                                     line_callback = result)
+        if git_cmd.rc()>1: raise UserError("Failed to search '%s'"%(source.name))
+        return git_cmd.rc()
+    #f search - search all the sources
+    def search(self, jobs:Optional[int]=None, cancellation:Optional[Cancellation]=None, timeout:Optional[float]=None) -> List[str]:
+        """
+        Search the sources, up to 'jobs' at once, each with the command timeout (if given)
+
+        Return the errors of searches that failed (not including those stopped by the limit)
+        """
+        parallel : ParallelJobs[GrepSource,int] = ParallelJobs(jobs=jobs, cancellation=cancellation, cancellable=(self.limit is not None))
+        results = parallel.run(lambda s:self.search_source(s, parallel.cancellation, timeout=timeout), self.sources)
+        self.output.flush()
+        errors = []
+        for r in results:
+            if r.exception is None: continue
+            if isinstance(r.exception, OSCommand.Timeout) and (r.exception.reason=="cancelled"): continue
+            errors.append(str(r.exception))
+            pass
+        return errors
+    #f All done
+    pass
@@ -1,24 +1,36 @@
 #a Imports
-import os, time
+import os, io, sys, time, fnmatch, threading
 from pathlib import Path
 
 from .verbose import Verbose
 from .options import Options
 from .log import Log
+from .metrics import Metrics
+from .os_command import OSCommand
+from .progress import ProgressDisplay, ProgressFn
+from .mirror import MirrorCache
+from .bundle import GripBundle
+from .archive import GripArchive, ArchiveSource
+from .grep import GripGrep, GrepSource
+from .parallel import ParallelJobs
 from .exceptions import *
 from .base       import GripBase
-from typing import Type, List, Dict, Iterable, Optional, Any, Tuple, cast
+from typing import Type, List, Dict, Set, Iterable, Optional, Any, Tuple, cast
 from .git import branch_upstream, branch_head
 from .git import Repository as GitRepo
+from .git import LazyRepository as LazyGitRepo
 from .git import Url as GitUrl
 from .descriptor import StageDependency as StageDependency
 from .descriptor import RepositoryDescriptor
+from .descriptor import RepositoryDescriptorInConfig
 from .descriptor import ConfigurationDescriptor
 from .descriptor import GripDescriptor as GripDescriptor
 from .configstate import GripConfigStateInitial, GripConfigStateConfigured
 from .repo import Repository, GripRepository
+from .workflow import Workflow
 
 from .types import PrettyPrinter, Documentation, MakefileStrings, EnvDict
+from .tomldict import RawTomlDict
 
 #a Classes
 #a Toplevel grip repository class - this describes/contains the whole thing
@@ -33,6 +45,14 @@ class Toplevel(GripBase):
     intial_config_state     : GripConfigStateInitial
     configured_config_state : GripConfigStateConfigured
     repo_instance_tree      : GripRepository
+    timed_out_repos         : List[str]
+    update_actions          : Dict[str,List[str]]
+    update_actions_lock     : threading.Lock
+    editor_lock             : threading.Lock
+    progress_display        : Optional[ProgressDisplay]
+    mirror_cache            : Optional[MirrorCache]
+    worktree_of             : Optional[Path]
+    bundle                  : Optional[GripBundle]
     _is_configured : bool
     #f find_git_repo_of_grip_root
     @classmethod
@@ -43,18 +63,77 @@ class Toplevel(GripBase):
             path = path.parent
             return cls.find_git_repo_of_grip_root(path, options=options, log=log)
         return git_repo
+    #f make_progress_display - classmethod to create a progress display if it is required
+    @classmethod
+    def make_progress_display(cls, options:Options) -> Optional[ProgressDisplay]:
+        """
+        Progress is displayed on stderr if it is a terminal, unless disabled or quiet
+        """
+        if not options.get("progress",True): return None
+        if options.get("quiet",False): return None
+        if not sys.stderr.isatty(): return None
+        return ProgressDisplay(file=sys.stderr)
     #f clone - classmethod to perform a git clone and then create an instance
     @classmethod
-    def clone(cls, repo_url:str, dest:Optional[Path], branch:Optional[str], options:Optional[Options]=None, log:Optional[Log]=None, invocation:str="")-> 'Toplevel':
+    def clone(cls, repo_url:str, dest:Optional[Path], branch:Optional[str], options:Optional[Options]=None, log:Optional[Log]=None, invocation:str="", metrics:Optional[Metrics]=None)-> 'Toplevel':
+        if options is None: options=Options()
+        if log is None: log = Log()
+        if metrics is None: metrics = Metrics()
+        progress_display = cls.make_progress_display(options)
+        progress = None
+        if progress_display is not None: progress = progress_display.reporter(repo_url)
+        with metrics.phase("clone"):
+            try:
+                git_repo = GitRepo.clone(repo_url, new_branch_name="", branch=branch, dest=dest, options=options, log=log, progress=progress, mirrors=MirrorCache.from_options(options, log=log))
+                pass
+            finally:
+                if progress_display is not None: progress_display.finish()
+                pass
+            pass
+        return cls(path=git_repo.path(), git_repo=git_repo, options=options, log=log, invocation=invocation, ensure_configured=False, metrics=metrics)
+    #f worktree - classmethod to create a git worktree of an existing grip repository and then create an instance
+    @classmethod
+    def worktree(cls, worktree_of:Path, dest:Path, branch:Optional[str], options:Optional[Options]=None, log:Optional[Log]=None, invocation:str="", metrics:Optional[Metrics]=None)-> 'Toplevel':
+        """
+        Create a new grip repository as a git worktree of the grip repository at (or containing) worktree_of
+
+        The new grip repository HEAD is detached at branch (or the upstream
+        branch of the existing grip repository); when it is configured its
+        subrepos are also created as worktrees of the existing subrepos,
+        where those exist
+        """
         if options is None: options=Options()
         if log is None: log = Log()
-        git_repo = GitRepo.clone(repo_url, new_branch_name="", branch=branch, dest=dest, options=options, log=log)
-        return cls(path=git_repo.path(), git_repo=git_repo, options=options, log=log, invocation=invocation, ensure_configured=False)
+        if metrics is None: metrics = Metrics()
+        existing_git_repo = cls.find_git_repo_of_grip_root(worktree_of, options=options, log=log)
+        if dest.exists(): raise UserError("Cannot create worktree at %s as it already exists"%(str(dest)))
+        with metrics.phase("clone"):
+            git_repo = existing_git_repo.add_worktree(dest=dest, new_branch_name="", changeset=branch)
+            pass
+        return cls(path=git_repo.path(), git_repo=git_repo, options=options, log=log, invocation=invocation, ensure_configured=False, metrics=metrics, worktree_of=existing_git_repo.path())
+    #f from_bundle - classmethod to clone the grip repository from a grip bundle and then create an instance
+    @classmethod
+    def from_bundle(cls, bundle:GripBundle, dest:Optional[Path], options:Optional[Options]=None, log:Optional[Log]=None, invocation:str="", metrics:Optional[Metrics]=None)-> 'Toplevel':
+        """
+        Create the grip repository from the git bundles of a grip bundle,
+        without contacting its remote; when it is configured its subrepos
+        are also created from the bundle
+        """
+        if options is None: options=Options()
+        if log is None: log = Log()
+        if metrics is None: metrics = Metrics()
+        entry = bundle.get_entry()
+        assert entry is not None
+        if dest is None: dest = Path(GitUrl(entry.url).repo_name)
+        with metrics.phase("clone"):
+            git_repo = GitRepo.clone_from_bundles(bundles=bundle.get_bundles(), repo_url=entry.url, branch=entry.branch, changeset=entry.changeset, new_branch_name="", dest=dest, options=options, log=log)
+            pass
+        return cls(path=git_repo.path(), git_repo=git_repo, options=options, log=log, invocation=invocation, ensure_configured=False, metrics=metrics, bundle=bundle)
     #f path - get a path relative to the repository
     def path(self, path:Optional[Path]=None) -> Path:
         return self.git_repo.path(path)
     #f __init__
-    def __init__(self, options:Options, log:Log, path:Path, git_repo:Optional[GitRepo]=None, ensure_configured:bool=True, invocation:str="", error_handler:ErrorHandler=None):
+    def __init__(self, options:Options, log:Log, path:Path, git_repo:Optional[GitRepo]=None, ensure_configured:bool=True, invocation:str="", error_handler:ErrorHandler=None, metrics:Optional[Metrics]=None, worktree_of:Optional[Path]=None, bundle:Optional[GripBundle]=None):
         if git_repo is None:
             try:
                 git_repo = Toplevel.find_git_repo_of_grip_root(path, options=options, log=log)
@@ -66,25 +145,88 @@ class Toplevel(GripBase):
             pass
         if git_repo is None:
             raise NotGripError("Not within a git repository, so not within a grip repository either")
-        GripBase.__init__(self, options=options, log=log, git_repo=git_repo, branch_name=None)
+        GripBase.__init__(self, options=options, log=log, git_repo=git_repo, branch_name=None, metrics=metrics)
+        self.timed_out_repos = []
+        self.update_actions = {}
+        self.update_actions_lock = threading.Lock()
+        self.editor_lock = threading.Lock()
+        self.progress_display = self.make_progress_display(options)
+        self.mirror_cache = MirrorCache.from_options(options, log=log)
+        self.worktree_of = worktree_of
+        self.bundle = bundle
         self.invocation = time.strftime("%Y_%m_%d_%H_%M_%S") + ": " + invocation
         self.log.add_entry_string(self.invocation)
-        self.initial_config_state = GripConfigStateInitial(self)
-        self.initial_config_state.read_desc_state(error_handler=error_handler)
-        self._is_configured = False
-        if self.initial_config_state.has_config_file():
-            self.initial_config_state.select_current_configuration()
-            self.configured_config_state = GripConfigStateConfigured(self.initial_config_state)
-            self.configured_config_state.read_desc(error_handler=error_handler)
-            if options.get("debug_config",False):
-                import sys
-                self.configured_config_state.dump_to_file(sys.stdout)
-            self._is_configured = True
+        with self.metrics.phase("read_config"):
+            self.initial_config_state = GripConfigStateInitial(self)
+            self.initial_config_state.read_desc_state(error_handler=error_handler)
+            self._is_configured = False
+            if self.initial_config_state.has_config_file():
+                self.initial_config_state.select_current_configuration()
+                self.configured_config_state = GripConfigStateConfigured(self.initial_config_state)
+                self.configured_config_state.read_desc(error_handler=error_handler)
+                if options.get("debug_config",False):
+                    import sys
+                    self.configured_config_state.dump_to_file(sys.stdout)
+                self._is_configured = True
+                pass
             pass
         if ensure_configured and not self._is_configured:
             raise Exception("Die:ensure_configured and not self._is_configured:")
         self.make_branch_name()
         pass
+    #f progress_reporter - get a progress function for a repository, if progress is displayed
+    def progress_reporter(self, name:str) -> Optional[ProgressFn]:
+        if self.progress_display is None: return None
+        return self.progress_display.reporter(name)
+    #f finish_progress - clear the progress status line, if progress is displayed
+    def finish_progress(self) -> None:
+        if self.progress_display is not None: self.progress_display.finish()
+        pass
+    #f add_timed_out_repo
+    def add_timed_out_repo(self, name:str, reason:str) -> None:
+        """
+        Record that an operation on a repository timed out (or was cancelled)
+        """
+        self.add_log_string("Repo '%s' timed out: %s"%(name, reason))
+        self.verbose.error("Repo '%s' timed out: %s"%(name, reason))
+        self.timed_out_repos.append(name)
+        pass
+    #f check_timed_out_repos
+    def check_timed_out_repos(self, operation:str) -> None:
+        if len(self.timed_out_repos)>0:
+            raise OperationTimeoutError("%s timed out for repos: %s"%(operation, ", ".join(self.timed_out_repos)))
+        pass
+    #f add_update_action
+    def add_update_action(self, name:str, action:str) -> None:
+        """
+        Record how a repository was brought up to date by an update or merge
+
+        Repositories are updated concurrently, so this may be invoked from many threads
+        """
+        self.add_log_string("Repo '%s' %s"%(name, action))
+        with self.update_actions_lock:
+            self.update_actions.setdefault(action, []).append(name)
+            pass
+        pass
+    #f report_update_actions
+    def report_update_actions(self, operation:str) -> None:
+        """
+        Report how many repositories were skipped (already up to date), fast-forwarded or rebased
+        """
+        counts = [(len(self.update_actions.get(a,[])), a) for a in [Workflow.update_up_to_date, Workflow.update_fast_forward, Workflow.update_rebase]]
+        self.verbose.message("%s: %s"%(operation, ", ".join(["%d %s"%c for c in counts])))
+        self.update_actions = {}
+        pass
+    #f report_repo_failures
+    def report_repo_failures(self, operation:str, failures:List[Tuple[Repository,str]]) -> None:
+        """
+        Log and report the repositories for which an operation failed (or was not attempted), with the reasons
+        """
+        for (r, reason) in failures:
+            self.add_log_string("%s of repo '%s' failed: %s"%(operation, r.name, reason))
+            self.verbose.error("%s of repo '%s' failed: %s"%(operation, r.name, reason))
+            pass
+        pass
     #f make_branch_name
     def make_branch_name(self) -> None:
         """
@@ -111,6 +253,10 @@ class Toplevel(GripBase):
     def update_state(self) -> None:
         self.configured_config_state.update_state(self.repo_instance_tree)
         pass
+    #f reread_state
+    def reread_state(self) -> None:
+        self.configured_config_state.reread_state()
+        pass
     #f write_state
     def write_state(self) -> None:
         self.configured_config_state.write_state()
@@ -177,7 +323,14 @@ class Toplevel(GripBase):
             self.check_clone_permitted()
             pass
         self.add_log_string("...cloning subrepos for repo %s"%(str(self.git_repo.path)))
-        errors = self.clone_subrepos()
+        with self.metrics.phase("clone"):
+            try:
+                errors = self.clone_subrepos()
+                pass
+            finally:
+                self.finish_progress()
+                pass
+            pass
         if len(errors)>0:
             if not force_configure:
                 for e in errors:
@@ -231,6 +384,18 @@ class Toplevel(GripBase):
             pass
         if remote is None:
             raise ConfigurationError("Git repo branch does not have a remote to merge with and so cannot be configured")
+        if has_wip_branch:
+            # Branches are shared by worktrees, and one checked out in a sibling worktree cannot be used here
+            worktree = self.git_repo.get_branch_worktree(self.branch_name)
+            if (worktree is not None) and (worktree.resolve()!=self.git_repo.path().resolve()):
+                branch_name = self.branch_name
+                n = 2
+                while self.git_repo.has_cs(branch_name="%s_%d"%(branch_name,n)): n+=1
+                self.set_branch_name("%s_%d"%(branch_name,n))
+                self.verbose.message("Branch '%s' is checked out in worktree '%s'; using new branch name '%s'"%(branch_name, str(worktree), self.branch_name))
+                has_wip_branch = False
+                pass
+            pass
         if has_upstream and has_wip_branch: return
         cs = self.git_repo.get_cs(branch_head)
         if not has_upstream:
@@ -267,6 +432,29 @@ class Toplevel(GripBase):
                 raise UserError("Not permitted to clone '%s' to  '%s"%(r.url, dest))
             pass
         pass
+    #f worktree_source - get the subrepo of the grip repository this is a worktree of, to add a worktree of
+    def worktree_source(self, rd:RepositoryDescriptorInConfig, branch:Optional[str], changeset:Optional[str]) -> Optional[GitRepo]:
+        """
+        If this grip repository is a worktree of another, and that has a
+        checkout of the same repository at the same path (with the
+        required branch and changeset), return it
+        """
+        if self.worktree_of is None: return None
+        path = self.worktree_of.joinpath(rd.path())
+        if not path.joinpath(".git").exists(): return None
+        try:
+            git_repo = GitRepo(path=path, options=self.options, log=self.log)
+            pass
+        except Exception:
+            return None
+        if git_repo.path().resolve()!=path.resolve(): return None
+        if git_repo.get_git_url_string()!=rd.get_git_url_string(): return None
+        if branch is not None:
+            upstream = git_repo.get_upstream()
+            if (upstream is None) or (upstream.get_branch() not in [branch, "refs/heads/%s"%branch]): return None
+            pass
+        if (changeset is not None) and not git_repo.has_cs(branch_name=changeset): return None
+        return git_repo
     #f clone_subrepos - git clone the subrepos to the correct changesets
     def clone_subrepos(self, force_shallow:bool=False) -> List[str]:
         assert self.branch_name is not None
@@ -280,16 +468,44 @@ class Toplevel(GripBase):
             dest = self.git_repo.path(r.path())
             self.verbose.info("Cloning '%s' branch '%s' cs '%s' in to path '%s'"%(r.get_git_url_string(), r_state.branch, r_state.changeset, str(dest)))
             depth = None
-            if r.is_shallow(): depth=1
+            if r.is_shallow(): depth = r_state.depth or 1
             try:
-                GitRepo.clone(repo_url=r.get_git_url_string(),
-                              new_branch_name=self.branch_name,
-                              branch=r_state.branch,
-                              dest=dest,
-                              depth = depth,
-                              changeset = r_state.changeset,
-                              options = self.options,
-                              log = self.log )
+                source = self.worktree_source(r, branch=r_state.branch, changeset=r_state.changeset)
+                if self.bundle is not None:
+                    entry = self.bundle.get_entry(r.name)
+                    if entry is None: raise UserError("Subrepo '%s' is not in the grip bundle"%(r.name))
+                    GitRepo.clone_from_bundles(bundles=self.bundle.get_bundles(r.name),
+                                               repo_url=entry.url,
+                                               branch=entry.branch,
+                                               changeset=entry.changeset,
+                                               new_branch_name=self.branch_name,
+                                               dest=dest,
+                                               sparse = r.sparse,
+                                               options = self.options,
+                                               log = self.log )
+                    pass
+                elif source is not None:
+                    self.verbose.info("Adding worktree of '%s' in to path '%s'"%(str(source.path()), str(dest)))
+                    source.add_worktree(dest=dest, new_branch_name=self.branch_name, changeset=r_state.changeset, sparse=r.sparse)
+                    pass
+                else:
+                    git_repo = GitRepo.clone(repo_url=r.get_git_url_string(),
+                                             new_branch_name=self.branch_name,
+                                             branch=r_state.branch,
+                                             dest=dest,
+                                             depth = depth,
+                                             changeset = r_state.changeset,
+                                             options = self.options,
+                                             log = self.log,
+                                             progress = self.progress_reporter(r.name),
+                                             mirrors = self.mirror_cache,
+                                             filter = r.filter,
+                                             sparse = r.sparse )
+                    if git_repo.depth is not None: r_state.update_state(depth=git_repo.depth)
+                    pass
+                pass
+            except OSCommand.Timeout as e:
+                errors.append("Clone of '%s' timed out: %s"%(r.name, e.reason))
                 pass
             except Exception as e:
                 errors.append(str(e))
@@ -297,20 +513,34 @@ class Toplevel(GripBase):
             pass
         return errors
     #f create_subrepos - create python objects that correspond to the checked-out subrepos
-    def create_subrepos(self) -> None:
-        self.repo_instance_tree = GripRepository(name="<toplevel>", grip_repo=self, git_repo=self.git_repo, parent=None, workflow=self.configured_config_state.full_repo_desc.workflow )
-        for rd in self.configured_config_state.config_desc.iter_repos():
-            # rd : RepositoryDescriptor
-            try:
-                repo_path = self.git_repo.path(rd.path())
-                gr = GitRepo(path=repo_path, options=self.options, log=self.log)
-                sr = Repository(name=rd.name, grip_repo=self, parent=self.repo_instance_tree, git_repo=gr, workflow=rd.workflow)
-                pass
-            except SubrepoError as e:
-                self.verbose.warning("Subrepo '%s' could not be found - is this grip repo a full checkout?"%(rd.name))
+    def create_subrepos(self, repos:Optional[List[str]]=None) -> None:
+        """
+        If repos is given then only the subrepos whose names or paths match
+        one of its globs are created, so only those are operated on (and
+        only their state is updated)
+        """
+        rds = self.select_repo_descs(repos)
+        if (repos is not None) and (len(rds)==0):
+            raise UserError("No subrepos match '%s'"%("', '".join(repos)))
+        with self.metrics.phase("create_subrepos"):
+            self.git_repo.set_progress(self.progress_reporter(self.get_name()))
+            self.repo_instance_tree = GripRepository(name="<toplevel>", grip_repo=self, git_repo=self.git_repo, parent=None, workflow=self.configured_config_state.full_repo_desc.workflow )
+            for rd in rds:
+                # rd : RepositoryDescriptor
+                try:
+                    repo_path = self.git_repo.path(rd.path())
+                    gr = LazyGitRepo(path=repo_path, options=self.options, log=self.log)
+                    gr.set_progress(self.progress_reporter(rd.name))
+                    r_state = self.configured_config_state.state_file_config.get_repo_state(self.configured_config_state.config_desc, rd.name, create_if_new=False)
+                    if r_state is not None: gr.depth = r_state.depth
+                    sr = Repository(name=rd.name, grip_repo=self, parent=self.repo_instance_tree, git_repo=gr, workflow=rd.workflow)
+                    pass
+                except SubrepoError as e:
+                    self.verbose.warning("Subrepo '%s' could not be found - is this grip repo a full checkout?"%(rd.name))
+                    pass
                 pass
+            self.repo_instance_tree.install_hooks()
             pass
-        self.repo_instance_tree.install_hooks()
         pass
     #f get_makefile_stamp_path
     def get_makefile_stamp_path(self, rd:StageDependency) -> Path:
@@ -326,41 +556,90 @@ class Toplevel(GripBase):
         Repositories are all ready.
         Create makefile stamp directory
         Create makefile.env and makefile
-        Delete makefile stamps
+        Delete makefile stamps of stages that have changed (and their dependents)
         """
-        StageDependency.set_makefile_path_fn(self.get_makefile_stamp_path)
-        self.add_log_string("Cleaning makefile stamps directory '%s'"%self.grip_path(self.makefile_stamps_dirname))
-        makefile_stamps = self.grip_path(self.makefile_stamps_dirname)
-        try:
-            os.mkdir(makefile_stamps)
-            pass
-        except FileExistsError:
-            pass
-        self.add_log_string("Creating makefile environment file '%s'"%self.grip_path(self.grip_makefile_env_filename))
-        with open(self.grip_path(self.grip_makefile_env_filename),"w") as f:
-            print("GQ=@",file=f)
-            print("GQE=@echo",file=f)
-            for (n,v) in self.configured_config_state.config_desc.get_env_as_makefile_strings():
-                print("%s=%s"%(n,v),file=f)
+        with self.metrics.phase("makefiles"):
+            StageDependency.set_makefile_path_fn(self.get_makefile_stamp_path)
+            self.add_log_string("Creating makefile stamps directory '%s'"%self.grip_path(self.makefile_stamps_dirname))
+            makefile_stamps = self.grip_path(self.makefile_stamps_dirname)
+            try:
+                os.mkdir(makefile_stamps)
+                pass
+            except FileExistsError:
                 pass
-            for r in self.configured_config_state.config_desc.iter_repos():
-                for (n,v) in r.get_env_as_makefile_strings():
-                    print("# REPO %s wants %s=%s"%(r.name, n,v),file=f)
+            self.add_log_string("Creating makefile environment file '%s'"%self.grip_path(self.grip_makefile_env_filename))
+            with io.StringIO() as f:
+                print("GQ=@",file=f)
+                print("GQE=@echo",file=f)
+                for (n,v) in self.configured_config_state.config_desc.get_env_as_makefile_strings():
+                    print("%s=%s"%(n,v),file=f)
                     pass
+                for r in self.configured_config_state.config_desc.iter_repos():
+                    for (n,v) in r.get_env_as_makefile_strings():
+                        print("# REPO %s wants %s=%s"%(r.name, n,v),file=f)
+                        pass
+                    pass
+                self.write_if_changed(self.grip_path(self.grip_makefile_env_filename), f.getvalue())
                 pass
+            # create makefiles
+            self.add_log_string("Creating makefile '%s'"%self.grip_path(self.grip_makefile_filename))
+            with io.StringIO() as f:
+                print("THIS_MAKEFILE = %s\n"%(self.grip_path(self.grip_makefile_filename)), file=f)
+                print("-include %s"%(self.grip_path(self.grip_makefile_env_filename)), file=f)
+                def log_and_verbose(s:str) -> None:
+                    self.add_log_string(s)
+                    self.verbose.info(s)
+                    pass
+                (fingerprints, dependencies) = self.configured_config_state.config_desc.write_makefile_entries(f, verbose=log_and_verbose)
+                self.write_if_changed(self.grip_makefile_path(), f.getvalue())
+                pass
+            self.revoke_changed_makefile_stamps(fingerprints, dependencies)
             pass
-        # create makefiles
-        self.add_log_string("Creating makefile '%s'"%self.grip_path(self.grip_makefile_filename))
-        with open(self.grip_path(self.grip_makefile_filename),"w") as f:
-            print("THIS_MAKEFILE = %s\n"%(self.grip_path(self.grip_makefile_filename)), file=f)
-            print("-include %s"%(self.grip_path(self.grip_makefile_env_filename)), file=f)
-            def log_and_verbose(s:str) -> None:
-                self.add_log_string(s)
-                self.verbose.info(s)
+        pass
+    #f revoke_changed_makefile_stamps
+    def revoke_changed_makefile_stamps(self, fingerprints:Dict[str,str], dependencies:List[Tuple[str,str]]) -> None:
+        """
+        Delete the makefile stamps of the stages whose fingerprints differ
+        from when the makefile was last created (or that no longer
+        exist), and of every stage that depends on them directly or
+        indirectly; the stamps of other stages remain valid
+
+        The fingerprints are then recorded for next time
+        """
+        fingerprints_path = self.grip_path(self.makefile_fingerprints_filename)
+        old_fingerprints : RawTomlDict = {}
+        if self.is_file(fingerprints_path):
+            try:
+                old_fingerprints = self.toml_load(fingerprints_path)
+                pass
+            except Exception:
+                self.add_log_string("Failed to read makefile fingerprints '%s' - revoking all stamps"%str(fingerprints_path))
                 pass
-            self.configured_config_state.config_desc.write_makefile_entries(f, verbose=log_and_verbose)
             pass
-        # clean out make stamps
+        dependents : Dict[str,List[str]] = {}
+        for (dependent, prerequisite) in dependencies:
+            if prerequisite not in dependents: dependents[prerequisite] = []
+            dependents[prerequisite].append(dependent)
+            pass
+        to_revoke = [t for (t,fp) in fingerprints.items() if old_fingerprints.get(t,None)!=fp]
+        to_revoke.extend([t for t in old_fingerprints if t not in fingerprints])
+        revoked : Set[str] = set()
+        while len(to_revoke)>0:
+            t = to_revoke.pop()
+            if t in revoked: continue
+            revoked.add(t)
+            to_revoke.extend(dependents.get(t,[]))
+            pass
+        stamps_path = self.grip_path(self.makefile_stamps_dirname)
+        for t in sorted(revoked):
+            stamp_path = stamps_path.joinpath(t)
+            if stamp_path.exists():
+                self.add_log_string("Revoking makefile stamp '%s'"%str(stamp_path))
+                stamp_path.unlink()
+                pass
+            pass
+        self.add_log_string("Makefile stages changed or dependent on a change: %d of %d"%(len([t for t in revoked if t in fingerprints]), len(fingerprints)))
+        self.toml_save(fingerprints_path, fingerprints)
         pass
     #f get_root
     def get_root(self) -> Path:
@@ -392,10 +671,11 @@ class Toplevel(GripBase):
         Write shell environment file
         """
         self.configured_config_state.write_environment()
-        with open(self.grip_path(self.grip_env_filename), "w") as f:
+        with io.StringIO() as f:
             for (k,v) in self.grip_env_iter():
                 print('%s="%s" ; export %s'%(k,v,k), file=f)
                 pass
+            self.write_if_changed(self.grip_path(self.grip_env_filename), f.getvalue())
             pass
         pass
     #f invoke_shell - use created environment file to invoke a shell
@@ -409,14 +689,27 @@ class Toplevel(GripBase):
         cmd_line += ["-c", "source %s; %s %s"%(self.grip_path(self.grip_env_filename), shell, " ".join(args))]
         os.execvpe("bash", cmd_line, env)
     #f status
-    def status(self) -> None:
-        self.create_subrepos()
-        self.repo_instance_tree.status()
+    def status(self, repos:Optional[List[str]]=None) -> None:
+        self.create_subrepos(repos=repos)
+        with self.metrics.phase("status"):
+            self.repo_instance_tree.status()
+            pass
         pass
     #f commit
-    def commit(self) -> None:
-        self.create_subrepos()
-        self.repo_instance_tree.commit()
+    def commit(self, repos:Optional[List[str]]=None, jobs:Optional[int]=None) -> None:
+        """
+        Commit the subrepos, up to 'jobs' at once, and then the grip repository
+
+        Every subrepo is attempted; those that fail are reported together,
+        and the state is then not updated
+        """
+        self.create_subrepos(repos=repos)
+        with self.metrics.phase("commit"):
+            failures = self.repo_instance_tree.commit(jobs=jobs, cancellation=self.options.get_cancellation())
+            pass
+        if len(failures)>0:
+            self.report_repo_failures("Commit", failures)
+            raise SubrepoError("Commit failed for repos: %s"%(", ".join([r.name for (r,_) in failures])))
         self.verbose.message("All repos commited")
         self.update_state()
         self.write_state()
@@ -424,36 +717,226 @@ class Toplevel(GripBase):
         self.verbose.message("**** Now run 'git commit' and 'git push origin HEAD:master' if you wish to commit the GRIP repo itself and push in a 'single' workflow ****")
         pass
     #f fetch
-    def fetch(self) -> None:
+    def fetch(self, repos:Optional[List[str]]=None) -> None:
+        self.create_subrepos(repos=repos)
+        with self.metrics.phase("fetch"):
+            try:
+                self.repo_instance_tree.fetch()
+                pass
+            finally:
+                self.finish_progress()
+                pass
+            pass
+        self.check_timed_out_repos("Fetch")
+        pass
+    #f create_bundle
+    def create_bundle(self, path:Path, since:Optional[Path]=None) -> None:
         self.create_subrepos()
-        self.repo_instance_tree.fetch()
+        with self.metrics.phase("bundle"):
+            manifest = GripBundle.create(self, path=path, since=since)
+            pass
+        bundled = [e.name for e in [manifest.grip]+list(manifest.repos.values()) if e.bundle is not None]
+        self.verbose.message("Created grip bundle '%s' with %d of %d repos"%(str(path), len(bundled), len(manifest.repos)+1))
         pass
+    #f archive
+    def archive(self, path:Path, format:Optional[str]=None, prefix:Optional[str]=None, jobs:Optional[int]=None) -> None:
+        """
+        Write an archive of the grip repository at its head, and of each
+        subrepo at the changeset of the state, with the files of the
+        subrepos at their paths within the grip repository
+        """
+        if prefix is None: prefix = GripArchive.split_suffix(path)[0]
+        prefix = prefix.strip("/")
+        if prefix!="": prefix = prefix + "/"
+        archive = GripArchive(path=path, format=format, log=self.log)
+        archive.add_source(ArchiveSource(name=self.get_name(), path=self.git_repo.path(), changeset=self.git_repo.get_cs(), prefix=prefix))
+        for rd in self.configured_config_state.config_desc.iter_repos():
+            changeset = self.configured_config_state.state_file_config.get_repo_cs(rd.name)
+            if changeset is None: raise UserError("Subrepo '%s' has no changeset in the state, so cannot be archived"%(rd.name))
+            archive.add_source(ArchiveSource(name=rd.name, path=self.git_repo.path(rd.path()), changeset=changeset, prefix="%s%s/"%(prefix, str(rd.path()))))
+            pass
+        with self.metrics.phase("archive"):
+            num_members = archive.write(jobs=jobs, cancellation=self.options.get_cancellation(), timeout=self.options.get_command_timeout())
+            pass
+        self.verbose.message("Created archive '%s' of %d repos with %d entries"%(str(path), len(archive.sources), num_members))
+        pass
+    #f select_repo_descs - get the descriptors of the subrepos whose names or paths match any of a list of globs
+    def select_repo_descs(self, repos:Optional[List[str]]=None) -> List[RepositoryDescriptorInConfig]:
+        """
+        If repos is None then all the subrepos of the configuration are selected
+
+        A glob matches a subrepo if it matches its name or its path
+        relative to the grip repository root (ignoring any trailing '/')
+        """
+        rds = []
+        globs = None
+        if repos is not None: globs = [g.rstrip("/") for g in repos]
+        for rd in self.configured_config_state.config_desc.iter_repos():
+            if globs is None:
+                rds.append(rd)
+                pass
+            elif any([fnmatch.fnmatchcase(rd.name, g) or fnmatch.fnmatchcase(str(rd.path()), g) for g in globs]):
+                rds.append(rd)
+                pass
+            pass
+        return rds
+    #f foreach
+    def foreach(self, cmd:List[str], repos:Optional[List[str]]=None, jobs:Optional[int]=None, fail_fast:bool=False) -> int:
+        """
+        Run a command in each subrepo (those whose names or paths match one of the
+        repos globs, if given), with the environment of the subrepo, up to
+        'jobs' at once
+
+        The output of each is buffered, and printed with the subrepo name
+        as a prefix when it completes. With fail_fast the first failure
+        kills the commands that are running and no more are started.
+
+        Return 0 if the command succeeded in every subrepo, else 1
+        """
+        if len(cmd)==0: raise UserError("No command given to run in each subrepo")
+        rds = self.select_repo_descs(repos)
+        if len(rds)==0:
+            self.verbose.warning("No subrepos match %s"%(" ".join(repos or [])))
+            return 0
+        config_env = self.configured_config_state.config_desc.get_env()
+        output_lock = threading.Lock()
+        parallel : ParallelJobs[RepositoryDescriptorInConfig,int] = ParallelJobs(jobs=jobs, fail_fast=fail_fast, cancellation=self.options.get_cancellation())
+        def run(rd:RepositoryDescriptorInConfig) -> int:
+            env = dict(config_env)
+            env.update(rd.env.as_dict())
+            lines : List[str] = []
+            try:
+                os_cmd = OSCommand(cmd=cmd, cwd=str(self.git_repo.path(rd.path())), env=env, log=self.log,
+                                   timeout = self.options.get_command_timeout(),
+                                   cancellation = parallel.cancellation,
+                                   line_callback = lambda stream,line:lines.append(line)).run()
+                rc = os_cmd.rc()
+                pass
+            finally:
+                with output_lock:
+                    for l in lines: print("%s: %s"%(rd.name, l))
+                    sys.stdout.flush()
+                    pass
+                pass
+            if rc!=0:
+                if fail_fast: parallel.cancellation.cancel()
+                raise UserError("Command failed in '%s' with exit code %d"%(rd.name, rc))
+            return rc
+        with self.metrics.phase("foreach"):
+            results = parallel.run(run, rds)
+            pass
+        failed    = []
+        cancelled = [r.item.name for r in results if r.cancelled]
+        for r in results:
+            if r.exception is None: continue
+            if isinstance(r.exception, OSCommand.Timeout) and (r.exception.reason=="cancelled"):
+                cancelled.append(r.item.name)
+                continue
+            self.verbose.error(str(r.exception))
+            failed.append(r.item.name)
+            pass
+        if len(cancelled)>0: self.verbose.warning("Command not run (or killed) in %s"%(", ".join(cancelled)))
+        if len(failed)+len(cancelled)>0: return 1
+        return 0
+    #f grep
+    def grep(self, patterns:List[str], grep_options:List[str]=[], pathspecs:List[str]=[], state:bool=False, limit:Optional[int]=None, repos:Optional[List[str]]=None, jobs:Optional[int]=None) -> int:
+        """
+        Run 'git grep' in each subrepo at once (those whose names or paths
+        match one of the repos globs, if given), printing the results as
+        they arrive with paths relative to the grip repository root
+
+        The working tree of each subrepo is searched, or if state is True
+        the changeset of the subrepo in the state. Once limit results
+        have been printed the remaining searches are stopped.
+
+        Return 0 if there are any results, 1 if there are none, and 2 if any search failed
+        """
+        grep = GripGrep(patterns=patterns, grep_options=grep_options, pathspecs=pathspecs, limit=limit, log=self.log)
+        for rd in self.select_repo_descs(repos):
+            changeset = None
+            if state:
+                changeset = self.configured_config_state.state_file_config.get_repo_cs(rd.name)
+                if changeset is None: raise UserError("Subrepo '%s' has no changeset in the state"%(rd.name))
+                pass
+            grep.add_source(GrepSource(name=rd.name, path=self.git_repo.path(rd.path()), prefix="%s/"%(str(rd.path())), changeset=changeset))
+            pass
+        with self.metrics.phase("grep"):
+            errors = grep.search(jobs=jobs, cancellation=self.options.get_cancellation(), timeout=self.options.get_command_timeout())
+            pass
+        for e in errors: self.verbose.error(e)
+        if len(errors)>0: return 2
+        if grep.num_results>0: return 0
+        return 1
     #f update
-    def update(self) -> None:
-        self.create_subrepos()
-        self.repo_instance_tree.update()
+    def update(self, repos:Optional[List[str]]=None, jobs:Optional[int]=None) -> None:
+        """
+        Update the grip repository and then its subrepos, up to 'jobs' at once
+
+        Every subrepo is attempted; those that fail (such as with a rebase
+        conflict) are reported together, and the state is then not updated
+
+        The state is reread from the updated grip repository before the
+        changesets of the subrepos are recorded, so subrepos that are not
+        selected keep the state from upstream
+        """
+        self.create_subrepos(repos=repos)
+        if self.options.get("interactive",False): jobs = 1
+        with self.metrics.phase("update"):
+            failures = self.repo_instance_tree.update(jobs=jobs, cancellation=self.options.get_cancellation())
+            pass
+        self.report_update_actions("Update")
+        if len(failures)>0:
+            self.report_repo_failures("Update", failures)
+            raise SubrepoError("Update failed for repos: %s"%(", ".join([r.name for (r,_) in failures])))
         self.verbose.message("All subrepos updated")
+        self.reread_state()
         self.update_state()
         self.write_state()
         self.verbose.message("Updated state")
         pass
     #f merge
-    def merge(self) -> None:
-        self.create_subrepos()
-        self.repo_instance_tree.merge()
+    def merge(self, repos:Optional[List[str]]=None) -> None:
+        self.create_subrepos(repos=repos)
+        with self.metrics.phase("merge"):
+            self.repo_instance_tree.merge()
+            pass
         self.verbose.message("All subrepos merged")
+        self.report_update_actions("Merge")
+        self.reread_state()
         self.update_state()
         self.write_state()
         self.verbose.message("Updated state")
         self.verbose.message("**** Now run 'git commit' and 'git push origin HEAD:master' if you wish to commit the GRIP repo itself and push in a 'single' workflow ****")
         pass
     #f publish
-    def publish(self, prepush_only:bool=False) -> None:
-        self.create_subrepos()
-        self.repo_instance_tree.prepush()
+    def publish(self, prepush_only:bool=False, repos:Optional[List[str]]=None, jobs:Optional[int]=None) -> None:
+        """
+        Prepush (a dry-run push) every repository, up to 'jobs' at once,
+        and then if every one succeeded push them all, up to 'jobs' at once
+
+        A repository is pushed after its subrepos, and not at all if
+        any of them fails to push; the repositories that were and were
+        not pushed are reported, and the state is only updated if all were
+        """
+        self.create_subrepos(repos=repos)
+        cancellation = self.options.get_cancellation()
+        with self.metrics.phase("prepush"):
+            failures = self.repo_instance_tree.prepush(jobs=jobs, cancellation=cancellation)
+            pass
+        if len(failures)>0:
+            self.report_repo_failures("Prepush", failures)
+            raise SubrepoError("Prepush failed for repos: %s - nothing has been pushed"%(", ".join([r.name for (r,_) in failures])))
         self.verbose.message("All subrepos prepushed")
         if prepush_only: return
-        self.repo_instance_tree.push()
+        with self.metrics.phase("push"):
+            failures = self.repo_instance_tree.push(jobs=jobs, cancellation=cancellation)
+            pass
+        if len(failures)>0:
+            self.report_repo_failures("Push", failures)
+            not_pushed = [r.name for (r,_) in failures]
+            pushed = [r.name for r in [self.repo_instance_tree]+list(self.repo_instance_tree.iter_tree_subrepos()) if r.name not in not_pushed]
+            self.verbose.message("Pushed repos: %s"%(", ".join(pushed) if len(pushed)>0 else "none"))
+            raise SubrepoError("Push failed for repos: %s - the state has not been updated"%(", ".join(not_pushed)))
         self.verbose.message("All subrepos pushed")
         self.update_state()
         self.write_state()
@@ -1,27 +1,92 @@
 #a Imports
-import sys
-from typing import Optional, List, Callable, Tuple, Iterable, Any, TypeVar, IO
+import sys, threading
+from collections import deque
+from typing import Optional, List, Callable, Tuple, Iterable, Any, TypeVar, IO, Deque
 
 #a Classes
 #c Class log
 class Log:
+    """
+    A log of entries, each of which is a log function and its keyword arguments
+
+    Entries are rendered to strings when they are added; this drops any
+    references the log function may hold (such as to an OSCommand and
+    its complete output).
+
+    Only the most recent max_entries rendered entries are held in memory (for
+    --show-log); if a sink is set then every entry is also written to the
+    sink as it is added, so a logfile receives the complete log.
+
+    Output of commands that is logged should be limited to output_head_lines
+    at the start and output_tail_lines at the end.
+
+    Entries may be added from many threads; each is rendered, held and
+    written to the sink under a lock, so the lines of entries do not interleave.
+    """
     T = Callable[..., Any]
     Entry = Tuple[T, Any]
     Writer = Callable[[str], Any]
-    entries : List[Entry]
+    default_max_entries : int = 10000
+    entries : Deque[Entry]
     tidy_fn : Optional[T]
+    sink    : Optional[IO[str]]
+    lock    : threading.RLock
+    max_entries : int
+    dropped_entries : int
+    output_head_lines : int = 50
+    output_tail_lines : int = 50
     #f __init__
-    def __init__(self) -> None:
-        self.entries = []
+    def __init__(self, max_entries:Optional[int]=None) -> None:
+        if max_entries is None: max_entries = self.default_max_entries
+        self.max_entries = max_entries
+        self.entries = deque(maxlen=self.max_entries)
+        self.dropped_entries = 0
         self.tidy_fn = None
+        self.sink = None
+        self.lock = threading.RLock()
         pass
     #f reset
     def reset(self) -> None:
-        self.entries = []
+        with self.lock:
+            self.entries = deque(maxlen=self.max_entries)
+            self.dropped_entries = 0
+            pass
+        pass
+    #f set_output_limits
+    def set_output_limits(self, head_lines:int, tail_lines:int) -> None:
+        """
+        Set the number of lines of command output (at the start and the end) that should be logged
+        """
+        self.output_head_lines = head_lines
+        self.output_tail_lines = tail_lines
+        pass
+    #f set_sink
+    def set_sink(self, sink:Optional[IO[str]], replay:bool=True) -> None:
+        """
+        Set a file to which entries are written as they are added
+
+        If replay is True then the entries already held are written to the sink first
+        """
+        with self.lock:
+            self.sink = sink
+            if (sink is not None) and replay:
+                self.dump(sink)
+                pass
+            pass
         pass
     #f add_entry
     def add_entry(self, log_fn:T, **kwargs:Any) -> None:
-        self.entries.append((log_fn,kwargs))
+        lines : List[str] = []
+        with self.lock:
+            log_fn(writer=lines.append, **kwargs)
+            if self.sink is not None:
+                for l in lines:
+                    self.sink.write(l+"\n")
+                    pass
+                pass
+            if len(self.entries)==self.max_entries: self.dropped_entries += 1
+            self.entries.append((self.write_lines,{"lines":lines}))
+            pass
         pass
     #f set_tidy
     def set_tidy(self, tidy_fn:T) -> None:
@@ -35,6 +100,7 @@ class Log:
     #f tidy
     def tidy(self, reset:bool=True) -> None:
         if self.tidy_fn: self.tidy_fn()
+        if self.sink is not None: self.sink.flush()
         if reset: self.reset()
         pass
     #f iter - iterate over entries
@@ -55,11 +121,18 @@ class Log:
             r.append(s)
             return r
         if writer is None:
-            return "\n".join(log_fn(writer=build_result, **kw_args))
+            log_fn(writer=build_result, **kw_args)
+            return "\n".join(r)
         return log_fn(writer=writer, **kw_args)
     #f write_string - writer callable to just write the string
     def write_string(self, writer:Writer, s:str) -> Any:
         return writer(s)
+    #f write_lines - writer callable to write a list of already-rendered lines
+    def write_lines(self, writer:Writer, lines:List[str]) -> None:
+        for l in lines:
+            writer(l)
+            pass
+        pass
     #f write_multiline - writer callable to multiple lines with different indents
     def write_multiline(self, writer:Writer, s:str, initial_indent:str="", extra_indent:str="> ") -> None:
         sl = s.split("\n")
@@ -75,8 +148,13 @@ class Log:
         def writer(s:str)->None:
             file.write(s+suffix)
             pass
-        for e in self.iter():
-            self.write_entry(e,writer)
+        with self.lock:
+            if self.dropped_entries>0:
+                writer("... %d earlier log entries dropped from memory"%(self.dropped_entries))
+                pass
+            for e in self.iter():
+                self.write_entry(e,writer)
+                pass
             pass
         pass
     pass
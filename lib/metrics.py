@@ -0,0 +1,343 @@
+#a Imports
+import os, time, json, math, threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Type, List, Dict, Iterable, Iterator, Optional, Any, Tuple, IO
+
+from .os_command import OSCommand
+from .git import git_dirs_of_path
+
+#a Useful functions
+#f percentile
+def percentile(values:List[float], fraction:float) -> float:
+    """
+    Nearest-rank percentile of a list of values (0.0 if there are none)
+    """
+    if len(values)==0: return 0.0
+    s = sorted(values)
+    i = int(math.ceil(fraction*len(s)))-1
+    if i<0: i=0
+    return s[i]
+
+#a Classes
+#c Metrics
+class Metrics(OSCommand.Observer):
+    """
+    Machine-readable metrics for a single grip invocation
+
+    When started this observes every OS command that is run, counting
+    the invocations and time per git verb (or per program for non-git
+    commands), the time spent in each repository (by working
+    directory), and the growth of the pack directory for fetches.
+
+    Phases of the invocation are timed using the 'phase' context manager.
+
+    OS commands may be run (and hence observed) from many threads at
+    once, so the accumulated values are only updated under a lock.
+
+    The metrics are appended as a single JSON line to a metrics file
+    """
+    #t Property types
+    record_version = 1
+    command      : str
+    args         : List[str]
+    start_time   : float
+    duration     : Optional[float]
+    rc           : Optional[int]
+    phases       : Dict[str,float]
+    subprocesses : Dict[str,List[float]]
+    repos        : Dict[str,float]
+    bytes_fetched : int
+    _pack_sizes  : Dict[int,int]
+    _start_clock : float
+    _started     : bool
+    _lock        : threading.Lock
+    #f __init__
+    def __init__(self) -> None:
+        self.command = ""
+        self.args = []
+        self.start_time = time.time()
+        self._start_clock = time.monotonic()
+        self.duration = None
+        self.rc = None
+        self.phases = {}
+        self.subprocesses = {}
+        self.repos = {}
+        self.bytes_fetched = 0
+        self._pack_sizes = {}
+        self._started = False
+        self._lock = threading.Lock()
+        pass
+    #f start
+    def start(self, command:str, args:List[str]=[]) -> None:
+        """
+        Start collecting metrics for a command
+        """
+        self.command = command
+        self.args = list(args)
+        self.start_time = time.time()
+        self._start_clock = time.monotonic()
+        if not self._started:
+            OSCommand.add_observer(self)
+            self._started = True
+            pass
+        pass
+    #f stop
+    def stop(self, rc:int) -> None:
+        """
+        Stop collecting metrics, recording the result of the command
+        """
+        if self._started:
+            OSCommand.remove_observer(self)
+            self._started = False
+            pass
+        self.rc = rc
+        self.duration = time.monotonic() - self._start_clock
+        pass
+    #f is_started
+    def is_started(self) -> bool:
+        return self._started
+    #f phase - context manager to time a phase
+    @contextmanager
+    def phase(self, name:str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield None
+            pass
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name,0.0) + elapsed
+                pass
+            pass
+        pass
+    #f subprocess_name - classmethod to get the name to record for an OS command
+    @classmethod
+    def subprocess_name(cls, cmd:OSCommand.Cmd) -> str:
+        """
+        For git commands this is 'git <verb>', for others it is the program name
+        """
+        if isinstance(cmd, str): words = cmd.split()
+        else: words = cmd
+        if len(words)==0: return "<none>"
+        program = os.path.basename(words[0])
+        if program!="git": return program
+        i = 1
+        while i<len(words):
+            w = words[i]
+            if w in ["-C", "-c", "--git-dir", "--work-tree"]:
+                i += 2
+                continue
+            if (w=="") or (w[0]!="-"): return "git %s"%w
+            i += 1
+            pass
+        return "git"
+    #f pack_size - classmethod to get the size of the pack directory of a repository
+    @classmethod
+    def pack_size(cls, cwd:Optional[str]) -> Optional[int]:
+        if cwd is None: return None
+        dirs = git_dirs_of_path(Path(cwd))
+        if dirs is None: return None
+        pack_dir = dirs[1].joinpath("objects","pack")
+        if not pack_dir.is_dir(): return None
+        size = 0
+        with os.scandir(pack_dir) as it:
+            for e in it:
+                if e.is_file(): size += e.stat().st_size
+                pass
+            pass
+        return size
+    #f command_started - OSCommand.Observer method
+    def command_started(self, cmd:OSCommand) -> None:
+        if self.subprocess_name(cmd.cmd) in ["git fetch", "git pull"]:
+            size = self.pack_size(cmd.cwd)
+            if size is not None:
+                with self._lock:
+                    self._pack_sizes[id(cmd)] = size
+                    pass
+                pass
+            pass
+        pass
+    #f command_completed - OSCommand.Observer method
+    def command_completed(self, cmd:OSCommand, elapsed:float) -> None:
+        name = self.subprocess_name(cmd.cmd)
+        with self._lock:
+            if name not in self.subprocesses: self.subprocesses[name] = [0, 0.0]
+            self.subprocesses[name][0] += 1
+            self.subprocesses[name][1] += elapsed
+            if cmd.cwd is not None:
+                self.repos[cmd.cwd] = self.repos.get(cmd.cwd,0.0) + elapsed
+                pass
+            before = self._pack_sizes.pop(id(cmd), None)
+            pass
+        if before is not None:
+            after = self.pack_size(cmd.cwd)
+            if (after is not None) and (after>before):
+                with self._lock:
+                    self.bytes_fetched += after-before
+                    pass
+                pass
+            pass
+        pass
+    #f as_dict
+    def as_dict(self, root:Optional[Path]=None) -> Dict[str,Any]:
+        """
+        Get the metrics as a dictionary suitable for JSON
+
+        Repository paths are made relative to root if they are within it
+        """
+        with self._lock:
+            repo_times = list(self.repos.items())
+            subprocess_times = [(n,(c,t)) for (n,(c,t)) in self.subprocesses.items()]
+            phase_times = list(self.phases.items())
+            pass
+        repos : Dict[str,float] = {}
+        for (cwd,t) in repo_times:
+            name = cwd
+            if root is not None:
+                rel = os.path.relpath(cwd, str(root))
+                if not rel.startswith(".."): name = rel
+                pass
+            repos[name] = round(repos.get(name,0.0)+t, 6)
+            pass
+        subprocesses : Dict[str,Dict[str,Any]] = {}
+        for (n,(count,t)) in subprocess_times:
+            subprocesses[n] = {"count":int(count), "time":round(t,6)}
+            pass
+        phases = {}
+        for (n,t) in phase_times:
+            phases[n] = round(t,6)
+            pass
+        duration = self.duration
+        if duration is None: duration = time.monotonic() - self._start_clock
+        return {"version":      self.record_version,
+                "time":         round(self.start_time,3),
+                "command":      self.command,
+                "args":         self.args,
+                "rc":           self.rc,
+                "duration":     round(duration,6),
+                "phases":       phases,
+                "subprocesses": subprocesses,
+                "repos":        repos,
+                "bytes_fetched":self.bytes_fetched,
+                }
+    #f append_to_file
+    def append_to_file(self, path:Path, root:Optional[Path]=None) -> None:
+        """
+        Append the metrics as a single JSON line to the file
+        """
+        with path.open("a") as f:
+            f.write(json.dumps(self.as_dict(root), sort_keys=True)+"\n")
+            pass
+        pass
+    #f All done
+    pass
+
+#c MetricsHistory
+class MetricsHistory:
+    """
+    A history of metrics records, read from a metrics file, with methods to analyze it
+    """
+    #t Property types
+    records : List[Dict[str,Any]]
+    #f __init__
+    def __init__(self, records:Optional[List[Dict[str,Any]]]=None) -> None:
+        if records is None: records = []
+        self.records = records
+        pass
+    #f read_file
+    def read_file(self, path:Path) -> None:
+        """
+        Read the records from a metrics file; lines that are not valid records are ignored
+        """
+        with path.open() as f:
+            for l in f:
+                try:
+                    r = json.loads(l)
+                    pass
+                except ValueError:
+                    continue
+                if type(r)==dict and ("command" in r) and ("duration" in r):
+                    self.records.append(r)
+                    pass
+                pass
+            pass
+        pass
+    #f select
+    def select(self, command:Optional[str]=None, last:Optional[int]=None) -> 'MetricsHistory':
+        """
+        Get the history of a single command and/or only the most recent records
+        """
+        records = self.records
+        if command is not None:
+            records = [r for r in records if r["command"]==command]
+            pass
+        if last is not None:
+            records = records[-last:]
+            pass
+        return MetricsHistory(records)
+    #f command_summary
+    def command_summary(self) -> List[Tuple[str,int,float,float]]:
+        """
+        Get (command, count, p50, p95) of durations for each command, sorted by command
+        """
+        durations : Dict[str,List[float]] = {}
+        for r in self.records:
+            if r["command"] not in durations: durations[r["command"]] = []
+            durations[r["command"]].append(r["duration"])
+            pass
+        result = []
+        for c in sorted(durations.keys()):
+            d = durations[c]
+            result.append( (c, len(d), percentile(d,0.5), percentile(d,0.95)) )
+            pass
+        return result
+    #f subprocess_summary
+    def subprocess_summary(self) -> List[Tuple[str,int,float]]:
+        """
+        Get (subprocess name, total count, total time) sorted by decreasing time
+        """
+        totals : Dict[str,List[float]] = {}
+        for r in self.records:
+            for (n,s) in r.get("subprocesses",{}).items():
+                if n not in totals: totals[n] = [0, 0.0]
+                totals[n][0] += s["count"]
+                totals[n][1] += s["time"]
+                pass
+            pass
+        result = [(n, int(c), t) for (n,(c,t)) in totals.items()]
+        result.sort(key=lambda x:-x[2])
+        return result
+    #f slowest_repos
+    def slowest_repos(self, n:int=10) -> List[Tuple[str,int,float,float]]:
+        """
+        Get (repo, invocations, total time, p95 time) for the n repos with largest total time
+        """
+        times : Dict[str,List[float]] = {}
+        for r in self.records:
+            for (repo,t) in r.get("repos",{}).items():
+                if repo not in times: times[repo] = []
+                times[repo].append(t)
+                pass
+            pass
+        result = [(repo, len(t), sum(t), percentile(t,0.95)) for (repo,t) in times.items()]
+        result.sort(key=lambda x:-x[2])
+        return result[:n]
+    #f trend
+    def trend(self, period:str="%Y-%m-%d") -> List[Tuple[str,str,int,float]]:
+        """
+        Get (period, command, count, p50) with periods given by a strftime format of the record time
+        """
+        durations : Dict[Tuple[str,str],List[float]] = {}
+        for r in self.records:
+            p = time.strftime(period, time.localtime(r.get("time",0)))
+            k = (p, r["command"])
+            if k not in durations: durations[k] = []
+            durations[k].append(r["duration"])
+            pass
+        return [(p,c,len(d),percentile(d,0.5)) for ((p,c),d) in sorted(durations.items())]
+    #f bytes_fetched
+    def bytes_fetched(self) -> int:
+        return sum([r.get("bytes_fetched",0) for r in self.records])
+    #f All done
+    pass
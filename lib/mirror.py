@@ -0,0 +1,148 @@
+#a Imports
+import os, re, fcntl, hashlib, shutil
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional, Iterator, IO, List, Any
+
+from .os_command import OSCommand, Cancellation
+from .log import Log
+from .options import Options
+
+#a Classes
+#c MirrorCache
+class MirrorCache:
+    """
+    A local cache of bare mirrors of git repositories
+
+    Clones of a repository can use its mirror as a reference (with
+    '--reference'), so that objects are shared with the mirror (using
+    git alternates) rather than fetched and stored again; with
+    '--dissociate' the objects are copied from the mirror, and the
+    clone does not depend on it.
+
+    Mirrors are keyed by the canonical URL of the repository (the
+    Url.as_string()). Each mirror has a lock file: updating a mirror
+    requires an exclusive lock, and cloning with a mirror as a
+    reference holds a shared lock, so concurrent checkouts are safe.
+
+    Clones that are not dissociated need the objects of the mirror to
+    remain, including those that a fetch of the mirror has made
+    unreachable; so garbage collection of the mirrors is disabled and
+    unreachable objects are never pruned.
+    """
+    #t Property types
+    default_root = Path("~/.cache/grip/mirrors")
+    mirror_config = ["gc.auto=0", "gc.pruneExpire=never"]
+    root         : Path
+    dissociate   : bool
+    log          : Optional[Log]
+    timeout      : Optional[float]
+    cancellation : Optional[Cancellation]
+    #f __init__
+    def __init__(self, root:Optional[Path]=None, dissociate:bool=False, log:Optional[Log]=None, timeout:Optional[float]=None, cancellation:Optional[Cancellation]=None) -> None:
+        if root is None: root = self.default_root
+        self.root = root.expanduser()
+        self.dissociate = dissociate
+        self.log = log
+        self.timeout = timeout
+        self.cancellation = cancellation
+        pass
+    #f from_options - classmethod to create a mirror cache if the options require one
+    @classmethod
+    def from_options(cls, options:Options, log:Optional[Log]=None) -> Optional['MirrorCache']:
+        """
+        A mirror cache is used if '--mirror' or '--mirror-dir' is given, or the environment has GRIP_MIRROR_DIR
+        """
+        root = options.get("mirror_dir",None)
+        if root is None: root = os.environ.get("GRIP_MIRROR_DIR",None)
+        if (root is None) and not options.get("mirror",False): return None
+        if root is not None: root = Path(root)
+        return cls(root=root,
+                   dissociate=options.get("dissociate",False),
+                   log=log,
+                   timeout=options.get_command_timeout(),
+                   cancellation=options.get_cancellation())
+    #f add_log_string
+    def add_log_string(self, s:str) -> None:
+        if self.log: self.log.add_entry_string(s)
+        pass
+    #f mirror_path - get the path of the mirror for a canonical URL
+    def mirror_path(self, key:str) -> Path:
+        """
+        The directory name is a readable form of the key with a hash of the key (so that distinct URLs never collide)
+        """
+        readable = re.sub(r"[^A-Za-z0-9._-]+", "_", key).strip("_")[-80:]
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        return self.root.joinpath("%s-%s.git"%(readable, digest))
+    #f lock - context manager to hold a lock on a mirror
+    @contextmanager
+    def lock(self, mirror:Path, exclusive:bool) -> Iterator[None]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(str(mirror)+".lock", "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield None
+                pass
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                pass
+            pass
+        pass
+    #f git_command
+    def git_command(self, cmd:List[str]) -> OSCommand:
+        return OSCommand(cmd=["git"]+cmd, log=self.log, timeout=self.timeout, cancellation=self.cancellation).run()
+    #f update - create or update the mirror of a repository
+    def update(self, key:str, repo_url:str) -> Optional[Path]:
+        """
+        Create the mirror of a repository (cloning to a temporary directory
+        that is renamed once complete), or fetch into it if it exists
+
+        Return the path to the mirror, or None if it could not be created
+        """
+        mirror = self.mirror_path(key)
+        with self.lock(mirror, exclusive=True):
+            if mirror.is_dir():
+                self.add_log_string("Updating mirror '%s' of '%s'"%(str(mirror), repo_url))
+                config : List[str] = []
+                for c in self.mirror_config: config += ["-c", c]
+                cmd = self.git_command(config+["--git-dir", str(mirror), "fetch", "--prune", "--quiet", "origin"])
+                if cmd.rc()!=0:
+                    self.add_log_string("Failed to update mirror '%s' - using it as it is"%(str(mirror)))
+                    pass
+                return mirror
+            partial = Path(str(mirror)+".partial")
+            shutil.rmtree(partial, ignore_errors=True)
+            self.add_log_string("Creating mirror '%s' of '%s'"%(str(mirror), repo_url))
+            try:
+                config = []
+                for c in self.mirror_config: config += ["--config", c]
+                cmd = self.git_command(["clone", "--mirror", "--quiet"]+config+[repo_url, str(partial)])
+                pass
+            except BaseException:
+                shutil.rmtree(partial, ignore_errors=True)
+                raise
+            if cmd.rc()!=0:
+                shutil.rmtree(partial, ignore_errors=True)
+                self.add_log_string("Failed to create mirror of '%s'"%(repo_url))
+                return None
+            partial.rename(mirror)
+            pass
+        return mirror
+    #f reference - context manager to provide an up-to-date mirror to clone with
+    @contextmanager
+    def reference(self, key:str, repo_url:str) -> Iterator[Optional[Path]]:
+        """
+        Update the mirror, and hold a shared lock on it while the caller clones with it as a reference
+
+        Yields None if there is no mirror (and the caller should clone without one)
+        """
+        mirror = self.update(key, repo_url)
+        if mirror is None:
+            yield None
+            return
+        with self.lock(mirror, exclusive=False):
+            yield mirror
+            pass
+        pass
+    #f All done
+    pass
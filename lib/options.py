@@ -1,7 +1,8 @@
 #a Imports
-from typing import Type, Dict, List, Sequence, Any
+from typing import Type, Dict, List, Sequence, Optional, Any
 from .exceptions import *
 from .verbose import Verbose
+from .os_command import Cancellation
 
 #c Options
 class UnknownOption(Exception):pass
@@ -16,6 +17,7 @@ class Options(object):
     show_log = False
     quiet    = False
     _verbose_fn : Verbose
+    _cancellation : Cancellation
     #f __init__
     def __init__(self) -> None:
         pass
@@ -29,6 +31,7 @@ class Options(object):
         return default
     #f _validate - validate the options
     def _validate(self) -> None:
+        self._cancellation = Cancellation(timeout=self.get("operation_timeout",None))
         self._verbose_fn = Verbose(level=Verbose.level_info)
         if (type(self.verbose)==bool) or (type(self.quiet)==bool):
             if (type(self.quiet)==bool) and self.quiet:
@@ -45,6 +48,14 @@ class Options(object):
     #f get_verbose_fn
     def get_verbose_fn(self) -> Verbose:
         return self._verbose_fn
+    #f get_cancellation - get the cancellation (and operation deadline) for OS commands
+    def get_cancellation(self) -> Cancellation:
+        if not hasattr(self, "_cancellation"): self._cancellation = Cancellation()
+        return self._cancellation
+    #f get_command_timeout - get the timeout for individual OS commands
+    def get_command_timeout(self) -> Optional[float]:
+        timeout : Optional[float] = self.get("command_timeout",None)
+        return timeout
     #f dump - print to screen
     def dump(self) -> None:
         print("*"*80)
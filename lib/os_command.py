@@ -1,11 +1,56 @@
 #a Imports
-import sys, os, re
+import sys, os, re, time, shlex, shutil, signal
 import subprocess
-from typing import Type, Optional, Union, Dict, Any, Tuple
+import threading
+import selectors, select
+import codecs
+from collections import deque
+from typing import Type, Optional, Union, Dict, Any, Tuple, ClassVar, Callable, Deque, IO
 from lib.log import Log
 
 from typing import List, Optional, Any
 
+#a Cancellation
+class Cancellation:
+    """
+    A deadline and cancellation flag shared by the OS commands of an operation
+
+    OS commands that are run with an armed cancellation (one that has
+    a deadline, or that may be cancelled from another thread) are run
+    in their own process group, which is killed if the deadline
+    passes or the operation is cancelled.
+    """
+    deadline    : Optional[float]
+    cancellable : bool
+    event       : threading.Event
+    #f __init__
+    def __init__(self, timeout:Optional[float]=None, cancellable:bool=False) -> None:
+        self.deadline = None
+        if timeout is not None: self.deadline = time.monotonic() + timeout
+        self.cancellable = cancellable
+        self.event = threading.Event()
+        pass
+    #f cancel
+    def cancel(self) -> None:
+        self.event.set()
+        pass
+    #f is_cancelled
+    def is_cancelled(self) -> bool:
+        return self.event.is_set()
+    #f is_armed
+    def is_armed(self) -> bool:
+        return self.cancellable or (self.deadline is not None)
+    #f remaining - time remaining before the deadline, or None if there is no deadline
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None: return None
+        return self.deadline - time.monotonic()
+    #f has_expired
+    def has_expired(self) -> bool:
+        r = self.remaining()
+        return (r is not None) and (r<=0)
+    #f All done
+    pass
+
 #a OSCommand
 class OSCommand:
     #c Error
@@ -21,12 +66,54 @@ class OSCommand:
         def __str__(self) -> str:
             return "Error in " + self.cmd.string_command_result()
         pass
+    #c Timeout
+    class Timeout(Error):
+        """
+        Exception raised when an OS command is killed as it timed out or was cancelled
+        """
+        def __init__(self, cmd:'OSCommand', reason:str) -> None:
+            self.cmd = cmd
+            self.reason = reason
+            pass
+        #f __str__
+        def __str__(self) -> str:
+            return "Timeout (%s) in %s"%(self.reason, self.cmd.string_command_result())
+        pass
+    #c Observer
+    class Observer:
+        """
+        Base class for observers of every OS command that is run (e.g. for metrics)
+        """
+        #f command_started
+        def command_started(self, cmd:'OSCommand') -> None:
+            pass
+        #f command_completed
+        def command_completed(self, cmd:'OSCommand', elapsed:float) -> None:
+            pass
+        pass
+    #t Class properties
+    Cmd = Union[str, List[str]]
+    LineCallback = Callable[[str,str],Any]
+    StdoutFn = Callable[[IO[bytes]],Any]
+    line_split_re = re.compile(r"\r\n|\r|\n")
+    default_tail_lines : ClassVar[int] = 200
+    observers : ClassVar[List[Observer]] = []
+    base_env  : ClassVar[Optional[Dict[str,str]]] = None
+    executables : ClassVar[Dict[str,str]] = {}
+    poll_interval : ClassVar[float] = 0.1
+    kill_grace_period : ClassVar[float] = 2.0
     #t Types of properties
     log : Log
-    cmd : str
+    cmd : Cmd
     cwd : Optional[str]
     env : Optional[Dict[str,str]]
     input_data : Optional[str]
+    timeout : Optional[float]
+    cancellation : Optional[Cancellation]
+    timed_out : Optional[str]
+    line_callback : Optional[LineCallback]
+    stdout_fn : Optional[StdoutFn]
+    tail_lines : int
     completed : bool
     # process: Any
     _stderr: str
@@ -34,13 +121,41 @@ class OSCommand:
     _rc : int
     #f __init__
     def __init__(self,
-                 cmd:str,
+                 cmd:Cmd,
                  cwd : Optional[str] = None,
                  env : Optional[Dict[str,str]] = None,
                  input_data : Optional[str] =None,
+                 timeout : Optional[float] = None,
+                 cancellation : Optional[Cancellation] = None,
+                 line_callback : Optional[LineCallback] = None,
+                 stdout_fn : Optional[StdoutFn] = None,
+                 tail_lines : Optional[int] = None,
                  log : Optional[Log] = None):
         """
-        Run an OS command in a subprocess shell
+        Run an OS command
+
+        If cmd is a string it is run in a subprocess shell; if it is a
+        list then it is the argv of a program that is run directly (with
+        no shell), using posix_spawn where possible.
+
+        env provides overrides of the environment the command is run with
+
+        If a timeout (in seconds) or an armed cancellation is given then
+        the command is run in a new process group, and the whole group is
+        killed (and OSCommand.Timeout raised) if the timeout expires or the
+        cancellation is cancelled or reaches its deadline
+
+        If a line_callback is given then the output is streamed: each line
+        of stdout and stderr is passed to line_callback(stream, line) as it
+        arrives (with stream being 'stdout' or 'stderr'), where lines are
+        terminated by a newline or carriage return (as used for git
+        progress). Only the last tail_lines lines of each are kept for
+        stdout() and stderr() (and hence for error messages).
+
+        If a stdout_fn is given then it is invoked with the stdout of the
+        process (as a binary file) to consume as the command runs, and
+        stdout() is empty; a managed command is then watched by another
+        thread, which kills it if it must stop.
 
         log can be None or a logger with an 'add_entry' method
         """
@@ -48,48 +163,370 @@ class OSCommand:
         self.cwd = cwd
         self.env = env
         self.input_data = input_data
+        self.timeout = timeout
+        self.cancellation = cancellation
+        self.timed_out = None
+        self.line_callback = line_callback
+        self.stdout_fn = stdout_fn
+        if tail_lines is None: tail_lines=self.default_tail_lines
+        self.tail_lines = tail_lines
         if log is None: log=Log()
         self.log = log
         self.completed = False
         pass
+    #f add_observer
+    @classmethod
+    def add_observer(cls, observer:Observer) -> None:
+        cls.observers.append(observer)
+        pass
+    #f remove_observer
+    @classmethod
+    def remove_observer(cls, observer:Observer) -> None:
+        if observer in cls.observers: cls.observers.remove(observer)
+        pass
+    #f get_base_env
+    @classmethod
+    def get_base_env(cls) -> Dict[str,str]:
+        """
+        Get the environment for commands, which is taken from os.environ once and then shared
+        """
+        if cls.base_env is None: cls.base_env = dict(os.environ)
+        return cls.base_env
+    #f find_executable
+    @classmethod
+    def find_executable(cls, program:str) -> str:
+        """
+        Find the absolute path of a program from the PATH (caching the result)
+
+        Returns the program unchanged if it cannot be found
+        """
+        if program not in cls.executables:
+            path = shutil.which(program)
+            if path is None: return program
+            cls.executables[program] = path
+            pass
+        return cls.executables[program]
+    #f cmd_string
+    def cmd_string(self) -> str:
+        if isinstance(self.cmd, str): return self.cmd
+        return shlex.join(self.cmd)
+    #f get_env
+    def get_env(self) -> Dict[str,str]:
+        env = self.get_base_env()
+        if self.env is not None:
+            env = dict(env)
+            for (n,e) in self.env.items(): env[n]=e
+            pass
+        return env
+    #f spawn_args
+    def spawn_args(self, argv:List[str]) -> Tuple[List[str], Optional[str]]:
+        """
+        Get the argv and cwd with which to spawn a program
+
+        posix_spawn cannot be used if a working directory is required,
+        so for git that is provided with '-C' instead
+        """
+        cwd = self.cwd
+        argv = list(argv)
+        if (cwd is not None) and (len(argv)>0) and (os.path.basename(argv[0])=="git"):
+            argv = [argv[0], "-C", cwd] + argv[1:]
+            cwd = None
+            pass
+        return (argv, cwd)
+    #f is_managed - return True if the command must be run so that it can be killed
+    def is_managed(self) -> bool:
+        if self.timeout is not None: return True
+        return (self.cancellation is not None) and self.cancellation.is_armed()
+    #f timeout_reason - return None if the command may continue, else the reason it must stop
+    def timeout_reason(self, start_time:float) -> Optional[str]:
+        if self.cancellation is not None:
+            if self.cancellation.is_cancelled(): return "cancelled"
+            if self.cancellation.has_expired(): return "operation deadline passed"
+            pass
+        if (self.timeout is not None) and (time.monotonic()-start_time >= self.timeout):
+            return "command timeout of %gs"%self.timeout
+        return None
+    #f kill_process_group
+    def kill_process_group(self) -> None:
+        """
+        Terminate the process group of the command, killing it if it does not terminate promptly
+        """
+        for sig in [signal.SIGTERM, signal.SIGKILL]:
+            try:
+                os.killpg(self.process.pid, sig)
+                pass
+            except (ProcessLookupError, PermissionError):
+                return
+            try:
+                self.process.wait(timeout=self.kill_grace_period)
+                return
+            except subprocess.TimeoutExpired:
+                pass
+            pass
+        pass
+    #f kill
+    def kill(self) -> None:
+        if self.is_managed():
+            self.kill_process_group()
+            pass
+        elif self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+            pass
+        pass
+    #f communicate_streaming
+    def communicate_streaming(self, input_data_bytes:Optional[bytes], start_time:float) -> Tuple[str, str]:
+        """
+        Communicate with the process, passing lines to the line callback as
+        they arrive and keeping the tail of each output stream
+
+        If the command is managed, then poll for the timeout or
+        cancellation; if it must stop then its process group is killed,
+        with timed_out set to the reason
+        """
+        assert self.line_callback is not None
+        managed = self.is_managed()
+        selector = selectors.DefaultSelector()
+        tails   : Dict[str,Deque[str]] = {}
+        partial : Dict[str,str] = {}
+        decoders : Dict[str,codecs.IncrementalDecoder] = {}
+        for (name,f) in [("stdout",self.process.stdout), ("stderr",self.process.stderr)]:
+            assert f is not None
+            selector.register(f, selectors.EVENT_READ, name)
+            tails[name] = deque(maxlen=self.tail_lines)
+            partial[name] = ""
+            decoders[name] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            pass
+        input_offset = 0
+        if self.process.stdin is not None:
+            if input_data_bytes: selector.register(self.process.stdin, selectors.EVENT_WRITE, "stdin")
+            else: self.process.stdin.close()
+            pass
+        def deliver(name:str, text:str, final:bool) -> None:
+            lines = self.line_split_re.split(partial[name] + text)
+            partial[name] = lines.pop()
+            if final and partial[name]!="":
+                lines.append(partial[name])
+                partial[name] = ""
+                pass
+            for l in lines:
+                tails[name].append(l)
+                assert self.line_callback is not None
+                self.line_callback(name, l)
+                pass
+            pass
+        while len(selector.get_map())>0:
+            wait : Optional[float] = None
+            if managed:
+                reason = self.timeout_reason(start_time)
+                if reason is not None:
+                    self.timed_out = reason
+                    self.kill_process_group()
+                    break
+                wait = self.poll_interval
+                pass
+            for (key, events) in selector.select(wait):
+                if key.data=="stdin":
+                    assert input_data_bytes is not None
+                    assert self.process.stdin is not None
+                    try:
+                        input_offset += os.write(key.fd, input_data_bytes[input_offset:input_offset+select.PIPE_BUF])
+                        pass
+                    except BrokenPipeError:
+                        input_offset = len(input_data_bytes)
+                        pass
+                    if input_offset>=len(input_data_bytes):
+                        selector.unregister(key.fileobj)
+                        self.process.stdin.close()
+                        pass
+                    continue
+                data = os.read(key.fd, 32768)
+                if len(data)==0:
+                    selector.unregister(key.fileobj)
+                    deliver(key.data, decoders[key.data].decode(b"", final=True), final=True)
+                    pass
+                else:
+                    deliver(key.data, decoders[key.data].decode(data), final=False)
+                    pass
+                pass
+            pass
+        selector.close()
+        for f in [self.process.stdin, self.process.stdout, self.process.stderr]:
+            if (f is not None) and not f.closed: f.close()
+            pass
+        self.process.wait()
+        def tail_string(name:str) -> str:
+            if len(tails[name])==0: return ""
+            return "\n".join(tails[name])+"\n"
+        return (tail_string("stdout"), tail_string("stderr"))
+    #f communicate_managed
+    def communicate_managed(self, input_data_bytes:Optional[bytes], start_time:float) -> Tuple[bytes, bytes]:
+        """
+        Communicate with the process, polling for the timeout or cancellation
+
+        If the command must stop then its process group is killed and the
+        output so far is returned, with timed_out set to the reason
+        """
+        while True:
+            reason = self.timeout_reason(start_time)
+            if reason is not None:
+                self.timed_out = reason
+                self.kill_process_group()
+                return self.process.communicate()
+            wait = self.poll_interval
+            if self.timeout is not None:
+                wait = min(wait, max(0.0, start_time+self.timeout-time.monotonic()))
+                pass
+            if self.cancellation is not None:
+                remaining = self.cancellation.remaining()
+                if remaining is not None: wait = min(wait, max(0.0, remaining))
+                pass
+            try:
+                return self.process.communicate(input_data_bytes, timeout=wait)
+            except subprocess.TimeoutExpired:
+                input_data_bytes = None # Input is only sent on the first call
+                pass
+            pass
+        pass
+    #f communicate_stdout_fn
+    def communicate_stdout_fn(self, start_time:float) -> str:
+        """
+        Pass the stdout of the process to the stdout_fn (and then drain
+        it), reading stderr on another thread; return the stderr
+
+        If the command is managed then a watchdog thread polls for the
+        timeout or cancellation; if it must stop then its process group
+        is killed, with timed_out set to the reason, and any exception
+        from the stdout_fn (which will see its output cut short) is
+        ignored
+        """
+        assert self.stdout_fn is not None
+        assert self.process.stdout is not None
+        assert self.process.stderr is not None
+        if self.process.stdin is not None: self.process.stdin.close()
+        stderr_stream = self.process.stderr
+        stderr_chunks : List[bytes] = []
+        stderr_thread = threading.Thread(target=lambda:stderr_chunks.append(stderr_stream.read()), daemon=True)
+        stderr_thread.start()
+        finished = threading.Event()
+        def watchdog() -> None:
+            while not finished.wait(self.poll_interval):
+                reason = self.timeout_reason(start_time)
+                if reason is not None:
+                    self.timed_out = reason
+                    self.kill_process_group()
+                    return
+                pass
+            pass
+        watchdog_thread = None
+        if self.is_managed():
+            watchdog_thread = threading.Thread(target=watchdog, daemon=True)
+            watchdog_thread.start()
+            pass
+        try:
+            self.stdout_fn(self.process.stdout)
+            while len(self.process.stdout.read(64*1024))>0: pass
+            pass
+        except Exception:
+            if self.timed_out is None: raise
+            pass
+        finally:
+            finished.set()
+            if watchdog_thread is not None: watchdog_thread.join()
+            pass
+        stderr_thread.join()
+        return b"".join(stderr_chunks).decode("utf8", errors="replace")
     #f log_start
     def log_start(self, writer:Log.Writer) -> None:
-        writer("OS command '%s' started in wd '%s' with env '%s'"%(self.cmd, self.cwd, self.env))
+        writer("OS command '%s' started in wd '%s' with env '%s'"%(self.cmd_string(), self.cwd, self.env))
         pass
     #f log_result
     def log_result(self, writer:Log.Writer) -> None:
-        self.log.write_multiline( writer=writer, s=self.string_command_result())
+        s = self.string_command_result(head_lines=self.log.output_head_lines, tail_lines=self.log.output_tail_lines)
+        self.log.write_multiline( writer=writer, s=s)
         pass
     #f run
     def run(self, input_data:Optional[str]=None) -> 'OSCommand':
-        cmd = "echo $PATH"
-        env = dict(os.environ)
-        if self.env is not None:
-            for (n,e) in self.env.items(): env[n]=e
-            pass
-
+        env = self.get_env()
         if input_data is None: input_data=self.input_data
+        managed = self.is_managed()
         if self.log: self.log.add_entry(self.log_start)
-        self.process = subprocess.Popen(args=self.cmd,
-                                        shell=True, # So that args is a string not a list
-                                        cwd=self.cwd,
-                                        env=env,
-                                        stdin =subprocess.PIPE, # Create new stdin; we can
-                                        stdout=subprocess.PIPE, # Create stdout to be captured
-                                        stderr=subprocess.PIPE, # Create stderr to be captured
-                                        bufsize=16*1024,  # Large buffer for input and output
-                                        close_fds=True,   # Don't inherit other file handles
-                                        )
+        start_time = time.monotonic()
+        if managed:
+            reason = self.timeout_reason(start_time)
+            if reason is not None:
+                self._stdout = ""
+                self._stderr = ""
+                self._rc = -1
+                self.timed_out = reason
+                self.completed = True
+                if self.log: self.log.add_entry_string("OS command '%s' not started: %s"%(self.cmd_string(), reason))
+                raise self.Timeout(self, reason)
+            pass
+        for o in self.observers: o.command_started(self)
+        if isinstance(self.cmd, str):
+            self.process = subprocess.Popen(args=self.cmd,
+                                            shell=True, # So that args is a string not a list
+                                            cwd=self.cwd,
+                                            env=env,
+                                            stdin =subprocess.PIPE, # Create new stdin; we can
+                                            stdout=subprocess.PIPE, # Create stdout to be captured
+                                            stderr=subprocess.PIPE, # Create stderr to be captured
+                                            bufsize=16*1024,  # Large buffer for input and output
+                                            close_fds=True,   # Don't inherit other file handles
+                                            start_new_session=managed, # So that the process group can be killed
+                                            )
+            pass
+        else:
+            (argv, cwd) = self.spawn_args(self.cmd)
+            stdin = subprocess.DEVNULL
+            if input_data is not None: stdin = subprocess.PIPE
+            # subprocess uses posix_spawn if the executable is an absolute path, there is no cwd, and close_fds is False
+            # close_fds is not required as Python creates file handles as non-inheritable
+            self.process = subprocess.Popen(args=argv,
+                                            executable=self.find_executable(argv[0]),
+                                            cwd=cwd,
+                                            env=env,
+                                            stdin =stdin,
+                                            stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE,
+                                            close_fds=False,
+                                            start_new_session=managed, # So that the process group can be killed
+                                            )
+            pass
         input_data_bytes = None
-        if self.input_data is not None:
-            input_data_bytes = self.input_data.encode()
+        if input_data is not None:
+            input_data_bytes = input_data.encode()
+            pass
+        try:
+            if self.line_callback is not None:
+                (self._stdout, self._stderr) = self.communicate_streaming(input_data_bytes, start_time)
+                pass
+            elif self.stdout_fn is not None:
+                self._stdout = ""
+                self._stderr = self.communicate_stdout_fn(start_time)
+                pass
+            else:
+                if managed:
+                    (stdout, stderr) = self.communicate_managed(input_data_bytes, start_time)
+                    pass
+                else:
+                    (stdout, stderr) = self.process.communicate(input_data_bytes)
+                    pass
+                self._stdout = stdout.decode()
+                self._stderr = stderr.decode()
+                pass
             pass
-        (stdout, stderr) = self.process.communicate(input_data_bytes)
-        self._stdout = stdout.decode()
-        self._stderr = stderr.decode()
+        except BaseException:
+            # e.g. KeyboardInterrupt - a managed process group does not get the signal, so kill it
+            self.kill()
+            raise
         self._rc     = self.process.wait()
         self.completed = True
+        elapsed = time.monotonic() - start_time
+        for o in self.observers: o.command_completed(self, elapsed)
         if self.log: self.log.add_entry(self.log_result)
+        if self.timed_out is not None: raise self.Timeout(self, self.timed_out)
         return self
     #f stdout
     def stdout(self) -> str:
@@ -101,30 +538,34 @@ class OSCommand:
     def rc(self) -> int:
         return self._rc
     #f output_string
-    def output_string(self, s:str, max_lines:int=100) -> str:
+    def output_string(self, s:str, head_lines:int=100, tail_lines:int=0) -> str:
+        """
+        Convert output to a single line, keeping only the first head_lines and last tail_lines lines
+        """
         sl = s.rstrip("\n").split("\n")
         if len(sl)==1: return sl[0]
-        append = ""
-        if len(sl)>max_lines:
-            append = "\\n..."
-            sl = sl[:max_lines]
+        if len(sl)>head_lines+tail_lines:
+            omitted = len(sl) - head_lines - tail_lines
+            tail = sl[len(sl)-tail_lines:] if tail_lines>0 else []
+            sl = sl[:head_lines] + ["...<%d lines omitted>..."%omitted] + tail
             pass
         return "\\n".join(sl)
     #f __str__
     def __str__(self) -> str:
         r = ""
-        r += "[%s]:%s:"%(self.cwd, self.cmd)
+        r += "[%s]:%s:"%(self.cwd, self.cmd_string())
         if self.completed:
             r += " -> %d [o:%d, e:%d]"%(self._rc, len(self._stdout), len(self._stderr))
         return r
     #f string_command_result
-    def string_command_result(self) -> str:
+    def string_command_result(self, head_lines:int=100, tail_lines:int=0) -> str:
         r = ""
-        r += "OS Command '%s' completed\n" % (self.cmd)
+        r += "OS Command '%s' completed\n" % (self.cmd_string())
         r += "  WD %s\n" % (self.cwd)
         r += "  Return code %d\n" % (self._rc)
-        r += "  Stdout: %s\n"     % (self.output_string(self._stdout))
-        r += "  Stderr: %s\n"     % (self.output_string(self._stderr))
+        if self.timed_out is not None: r += "  Timed out: %s\n" % (self.timed_out)
+        r += "  Stdout: %s\n"     % (self.output_string(self._stdout, head_lines=head_lines, tail_lines=tail_lines))
+        r += "  Stderr: %s\n"     % (self.output_string(self._stderr, head_lines=head_lines, tail_lines=tail_lines))
         return r
     #f check_results
     def check_results(self, stderr_output_indicates_error:bool=True, exception_on_error:bool=True) -> str:
@@ -0,0 +1,94 @@
+#a Imports
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, List, Generic, TypeVar
+
+from .os_command import Cancellation
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+#a Classes
+#c ParallelResult - the result of a job run by ParallelJobs
+class ParallelResult(Generic[T,R]):
+    """
+    The result of running a job on an item: the value returned, or the
+    exception raised; if the job was not run (because an earlier one
+    failed with fail_fast) then cancelled is True
+    """
+    item      : T
+    result    : Optional[R]
+    exception : Optional[BaseException]
+    cancelled : bool
+    #f __init__
+    def __init__(self, item:T, result:Optional[R]=None, exception:Optional[BaseException]=None, cancelled:bool=False) -> None:
+        self.item = item
+        self.result = result
+        self.exception = exception
+        self.cancelled = cancelled
+        pass
+    #f is_ok
+    def is_ok(self) -> bool:
+        return (self.exception is None) and not self.cancelled
+    #f All done
+    pass
+
+#c ParallelJobs - run a function on many items on a pool of threads
+class ParallelJobs(Generic[T,R]):
+    """
+    Run a job (a function) on each of a list of items, with up to 'jobs'
+    running at once on a pool of threads; the jobs are expected to
+    spend most of their time waiting on OS commands (such as git)
+
+    The jobs share a cancellation, which OS commands run by them should
+    use; it has the deadline of the parent cancellation (if any), and
+    with fail_fast it is cancelled when any job fails, killing the OS
+    commands that are running and preventing any more jobs starting.
+    If the jobs cancel it themselves (for example, once enough results
+    are found) then cancellable should be given.
+
+    The cancellation is only armed if it has a deadline or may be
+    cancelled, since OS commands run with an armed cancellation are run
+    in their own session (so that they can be killed) and hence do not
+    see a Ctrl-C; if the run is interrupted then the cancellation is
+    cancelled, so the jobs that are running are stopped.
+    """
+    jobs         : int
+    fail_fast    : bool
+    cancellation : Cancellation
+    #f default_jobs - classmethod
+    @classmethod
+    def default_jobs(cls) -> int:
+        return min(8, os.cpu_count() or 1)
+    #f __init__
+    def __init__(self, jobs:Optional[int]=None, fail_fast:bool=False, cancellation:Optional[Cancellation]=None, cancellable:bool=False) -> None:
+        if jobs is None: jobs = self.default_jobs()
+        self.jobs = max(1, jobs)
+        self.fail_fast = fail_fast
+        self.cancellation = Cancellation(cancellable=fail_fast or cancellable)
+        if cancellation is not None: self.cancellation.deadline = cancellation.deadline
+        pass
+    #f run - run the job on every item and return the results in the order of the items
+    def run(self, job:Callable[[T],R], items:List[T]) -> List[ParallelResult[T,R]]:
+        def run_job(item:T) -> ParallelResult[T,R]:
+            if self.cancellation.is_cancelled(): return ParallelResult(item, cancelled=True)
+            try:
+                return ParallelResult(item, result=job(item))
+            except Exception as e:
+                if self.fail_fast: self.cancellation.cancel()
+                return ParallelResult(item, exception=e)
+            pass
+        executor = None
+        if self.jobs>1: executor = ThreadPoolExecutor(max_workers=self.jobs)
+        try:
+            if executor is None: return [run_job(item) for item in items]
+            return list(executor.map(run_job, items))
+        except BaseException:
+            self.cancellation.cancel()
+            raise
+        finally:
+            if executor is not None: executor.shutdown()
+            pass
+        pass
+    #f All done
+    pass
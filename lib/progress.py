@@ -0,0 +1,152 @@
+#a Imports
+import sys, re, time
+import threading
+from typing import Optional, Dict, List, Callable, Any, IO
+
+#a Classes
+#c ProgressEvent
+class ProgressEvent:
+    """
+    A structured progress event from an operation (such as a git clone or fetch) on a repository
+
+    phase is, for example, 'Receiving objects'; percent, current and
+    total are given if the phase has a known size; transferred and rate
+    are given (as strings such as '1.20 MiB') when data is being
+    received. The last event of an operation has done set.
+    """
+    repo        : str
+    phase       : str
+    percent     : Optional[int]
+    current     : Optional[int]
+    total       : Optional[int]
+    transferred : Optional[str]
+    rate        : Optional[str]
+    done        : bool
+    #f __init__
+    def __init__(self, repo:str="", phase:str="", percent:Optional[int]=None, current:Optional[int]=None, total:Optional[int]=None, transferred:Optional[str]=None, rate:Optional[str]=None, done:bool=False) -> None:
+        self.repo = repo
+        self.phase = phase
+        self.percent = percent
+        self.current = current
+        self.total = total
+        self.transferred = transferred
+        self.rate = rate
+        self.done = done
+        pass
+    #f __str__
+    def __str__(self) -> str:
+        r = self.phase
+        if self.percent is not None: r += " %d%%"%self.percent
+        if self.total is not None: r += " (%d/%d)"%(self.current or 0, self.total)
+        elif self.current is not None: r += " %d"%(self.current)
+        if self.transferred is not None: r += ", %s"%self.transferred
+        if self.rate is not None: r += " | %s"%self.rate
+        return r
+    #f All done
+    pass
+
+ProgressFn = Callable[[ProgressEvent],Any]
+
+#c GitProgressParser
+class GitProgressParser:
+    """
+    Parses the stderr lines of a git command run with '--progress' into progress events
+    """
+    progress_re = re.compile(r"^(remote: *)?(?P<phase>[A-Za-z][A-Za-z ]*):\s+"
+                             r"((?P<percent>\d+)% \((?P<current>\d+)/(?P<total>\d+)\)|(?P<count>\d+))"
+                             r"(, (?P<transferred>[\d.]+ [KMGT]?i?B)( \| (?P<rate>[\d.]+ [KMGT]?i?B/s))?)?")
+    progress : ProgressFn
+    repo     : str
+    #f __init__
+    def __init__(self, progress:ProgressFn, repo:str="") -> None:
+        self.progress = progress
+        self.repo = repo
+        pass
+    #f parse - parse a line, returning None if it is not a progress line
+    def parse(self, line:str) -> Optional[ProgressEvent]:
+        m = self.progress_re.match(line.strip())
+        if m is None: return None
+        def opt_int(s:Optional[str]) -> Optional[int]:
+            if s is None: return None
+            return int(s)
+        current = opt_int(m.group("current"))
+        if current is None: current = opt_int(m.group("count"))
+        return ProgressEvent(repo        = self.repo,
+                             phase       = m.group("phase").strip(),
+                             percent     = opt_int(m.group("percent")),
+                             current     = current,
+                             total       = opt_int(m.group("total")),
+                             transferred = m.group("transferred"),
+                             rate        = m.group("rate"))
+    #f line_callback - OSCommand line callback
+    def line_callback(self, stream:str, line:str) -> None:
+        if stream!="stderr": return
+        e = self.parse(line)
+        if e is not None: self.progress(e)
+        pass
+    #f done - indicate the operation has completed
+    def done(self) -> None:
+        self.progress(ProgressEvent(repo=self.repo, phase="done", done=True))
+        pass
+    #f All done
+    pass
+
+#c ProgressDisplay
+class ProgressDisplay:
+    """
+    Renders the latest progress of every active repository on a single
+    status line of a terminal, which is cleared when no repository is active
+
+    Updates may come from many threads; the line is redrawn at most every
+    min_interval seconds
+    """
+    file         : IO[str]
+    width        : int
+    min_interval : float
+    active       : Dict[str,ProgressEvent]
+    last_render  : float
+    lock         : threading.Lock
+    #f __init__
+    def __init__(self, file:IO[str]=sys.stderr, width:int=120, min_interval:float=0.1) -> None:
+        self.file = file
+        self.width = width
+        self.min_interval = min_interval
+        self.active = {}
+        self.last_render = 0.0
+        self.lock = threading.Lock()
+        pass
+    #f reporter - get a progress function for a repository
+    def reporter(self, repo:str) -> ProgressFn:
+        def report(e:ProgressEvent) -> None:
+            e.repo = repo
+            self.update(e)
+            pass
+        return report
+    #f update
+    def update(self, e:ProgressEvent) -> None:
+        with self.lock:
+            if e.done:
+                if e.repo in self.active: self.active.pop(e.repo)
+                self.render()
+                return
+            self.active[e.repo] = e
+            if time.monotonic() - self.last_render >= self.min_interval: self.render()
+            pass
+        pass
+    #f render - must be called with the lock held
+    def render(self) -> None:
+        self.last_render = time.monotonic()
+        line = " | ".join(["%s: %s"%(r, str(e)) for (r,e) in self.active.items()])
+        if len(line)>self.width: line = line[:self.width-3]+"..."
+        self.file.write("\r%s\033[K"%line)
+        self.file.flush()
+        pass
+    #f finish - clear the status line
+    def finish(self) -> None:
+        with self.lock:
+            self.active = {}
+            self.render()
+            pass
+        pass
+    #f All done
+    pass
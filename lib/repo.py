@@ -1,7 +1,10 @@
 #a Imports
 import os, time
-from typing import Type, List, Dict, Iterable, Optional, Any
+from pathlib import Path
+from typing import Type, List, Dict, Tuple, Set, Iterable, Optional, Callable, Any
 from .git import Repository as GitRepository, branch_upstream
+from .os_command import OSCommand, Cancellation
+from .parallel import ParallelJobs
 
 from .descriptor import StageDependency as StageDependency
 from .descriptor import RepositoryDescriptor
@@ -54,10 +57,15 @@ class Repository(object):
     parent     : Optional['Repository']
     workflow   : Workflow
     subrepos   : List['Repository']
+    subrepos_sorted : bool
+    repos_by_name : Dict[str,'Repository']
+    repos_by_path : Dict[Path,'Repository']
     is_grip_repo = False
     #f __init__
     def __init__(self, name:str, grip_repo:'Toplevel', parent:Optional['Repository'], git_repo:GitRepository, workflow:Type[Workflow]):
         """
+        The root of a tree of repositories keeps maps from name and from
+        path to every repository in the tree below it
         """
         self.name = name
         self.toplevel = grip_repo
@@ -65,22 +73,138 @@ class Repository(object):
         self.git_repo = git_repo
         self.workflow = workflow(grip_repo, git_repo, self)
         self.subrepos = []
+        self.subrepos_sorted = True
+        self.repos_by_name = {}
+        self.repos_by_path = {}
         if parent: parent.add_child(self)
         pass
     #f get_name
     def get_name(self) -> str:
         return self.name
+    #f get_root - get the root of the tree of repositories
+    def get_root(self) -> 'Repository':
+        r = self
+        while r.parent is not None: r = r.parent
+        return r
     #f add_child
     def add_child(self, child : 'Repository') -> None:
+        """
+        Children are appended, and sorted by name when next iterated if
+        they were not added in order; the child is added to the maps of the root
+        """
+        if len(self.subrepos)>0 and (child.get_name() < self.subrepos[-1].get_name()):
+            self.subrepos_sorted = False
+            pass
         self.subrepos.append(child)
-        self.subrepos.sort(key=lambda r:r.get_name())
+        root = self.get_root()
+        root.repos_by_name[child.get_name()] = child
+        root.repos_by_path[child.git_repo.path()] = child
         pass
     #f iter_subrepos
     def iter_subrepos(self) -> Iterable['Repository']:
+        if not self.subrepos_sorted:
+            self.subrepos.sort(key=lambda r:r.get_name())
+            self.subrepos_sorted = True
+            pass
         for s in self.subrepos:
             yield(s)
             pass
         pass
+    #f iter_tree_subrepos - iterate over every repository in the tree below this (which must be the root)
+    def iter_tree_subrepos(self) -> Iterable['Repository']:
+        return self.repos_by_name.values()
+    #f get_subrepo - get a repository in the tree by name (this must be the root)
+    def get_subrepo(self, name:str) -> Optional['Repository']:
+        return self.repos_by_name.get(name, None)
+    #f get_subrepo_of_path - get a repository in the tree by the path of its git repository (this must be the root)
+    def get_subrepo_of_path(self, path:Path) -> Optional['Repository']:
+        return self.repos_by_path.get(path, None)
+    #f walk - invoke a function on every repository in the tree, without recursion
+    def walk(self, fn:Callable[['Repository'],bool], post_order:bool=True, stop_on_failure:bool=True) -> bool:
+        """
+        Invoke fn on each repository in the tree, in the order a recursive
+        traversal would: after its subrepos (post_order) or before them;
+        set_subrepo_cs_set is invoked on each repository before its subrepos
+
+        If stop_on_failure then once fn returns False no more
+        repositories are visited. Return False if fn ever returned False.
+        """
+        okay = True
+        stack : List[Tuple['Repository',bool]] = [(self, False)]
+        while len(stack)>0:
+            (r, subrepos_done) = stack.pop()
+            if subrepos_done:
+                okay = fn(r) and okay
+                if stop_on_failure and not okay: break
+                continue
+            r.set_subrepo_cs_set()
+            if post_order:
+                stack.append((r, True))
+                pass
+            else:
+                okay = fn(r) and okay
+                if stop_on_failure and not okay: break
+                pass
+            subrepos = list(r.iter_subrepos())
+            subrepos.reverse()
+            for sr in subrepos:
+                stack.append((sr, False))
+                pass
+            pass
+        return okay
+    #f walk_parallel - invoke a function on every repository in the tree, concurrently at each depth
+    def walk_parallel(self, fn:Callable[['Repository'],bool], jobs:Optional[int]=None, post_order:bool=True, cancellation:Optional[Cancellation]=None) -> List[Tuple['Repository',str]]:
+        """
+        Invoke fn on each repository in the tree, running the repositories
+        at each depth of the tree concurrently (up to jobs at once); the
+        depths are visited deepest first (post_order) or from the root;
+        set_subrepo_cs_set is invoked on each repository before its subrepos
+
+        A repository for which fn fails (returns False or raises an
+        exception) does not stop the others at its depth, but its parent
+        (post_order) or its subrepos are then not visited. Return a list of
+        the repositories that failed or were not visited, with the reason.
+        """
+        levels : List[List['Repository']] = []
+        level = [self]
+        while len(level)>0:
+            if post_order:
+                for r in level: r.set_subrepo_cs_set()
+                pass
+            levels.append(level)
+            level = [sr for r in level for sr in r.iter_subrepos()]
+            pass
+        if post_order: levels.reverse()
+        failures : List[Tuple['Repository',str]] = []
+        not_done : Set['Repository'] = set()
+        for level in levels:
+            to_run = []
+            for r in level:
+                if post_order:
+                    blocked = [sr for sr in r.iter_subrepos() if sr in not_done]
+                    pass
+                else:
+                    blocked = [r.parent] if (r.parent is not None) and (r.parent in not_done) else []
+                    pass
+                if len(blocked)>0:
+                    not_done.add(r)
+                    failures.append((r, "not attempted as repo '%s' failed"%(blocked[0].name)))
+                    pass
+                else:
+                    to_run.append(r)
+                    pass
+                pass
+            if not post_order:
+                for r in to_run: r.set_subrepo_cs_set()
+                pass
+            parallel : ParallelJobs['Repository',bool] = ParallelJobs(jobs=jobs, cancellation=cancellation)
+            for result in parallel.run(fn, to_run):
+                if result.is_ok() and result.result: continue
+                not_done.add(result.item)
+                failures.append((result.item, "failed" if result.exception is None else str(result.exception)))
+                pass
+            pass
+        return failures
     #f install_hooks
     def install_hooks(self) -> None:
         for sr in self.iter_subrepos():
@@ -96,132 +220,121 @@ class Repository(object):
         pass
     #f status
     def status(self) -> bool:
-        self.set_subrepo_cs_set()
-        okay = True
-        for sr in self.iter_subrepos():
-            okay = okay and sr.status()
-            pass
-        try:
-            s = "Getting status of repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
-            self.toplevel.add_log_string(s)
-            if self.is_grip_repo:
-                okay = okay and self.workflow.status_as_grip()
-                pass
-            else:
-                okay = okay and self.workflow.status()
-                pass
-            pass
-        except Exception as e:
-            raise(e)
-        return okay
+        return self.walk(lambda r:r.status_repo())
+    #f status_repo - status of just this repository
+    def status_repo(self) -> bool:
+        s = "Getting status of repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
+        self.toplevel.add_log_string(s)
+        if self.is_grip_repo:
+            return self.workflow.status_as_grip()
+        return self.workflow.status()
     #f commit
-    def commit(self) -> bool:
-        self.set_subrepo_cs_set()
-        okay = True
-        for sr in self.iter_subrepos():
-            okay = okay and sr.commit()
-            pass
-        try:
-            s = "Commiting repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
-            self.toplevel.add_log_string(s)
-            self.toplevel.verbose.message(s)
-            okay = okay and self.workflow.commit()
-            if not okay: raise(Exception("Commit for repo '%s' not permitted"%self.name))
-            cs = self.get_cs()
-            self.toplevel.add_log_string("Repo '%s' at commit hash '%s'"%(self.name, cs))
-            pass
-        except Exception as e:
-            raise(e)
+    def commit(self, jobs:Optional[int]=None, cancellation:Optional[Cancellation]=None) -> List[Tuple['Repository',str]]:
+        """
+        Commit this repository after its subrepos, up to jobs at once
+
+        Return the repositories that failed to commit (or whose commit was
+        refused by the workflow) or were not committed, with the reason
+        """
+        return self.walk_parallel(lambda r:r.commit_repo(), jobs=jobs, cancellation=cancellation)
+    #f commit_repo - commit just this repository
+    def commit_repo(self) -> bool:
+        s = "Commiting repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
+        self.toplevel.add_log_string(s)
+        self.toplevel.verbose.message(s)
+        okay = self.workflow.commit()
+        if not okay: raise(Exception("Commit for repo '%s' not permitted"%self.name))
+        cs = self.get_cs()
+        self.toplevel.add_log_string("Repo '%s' at commit hash '%s'"%(self.name, cs))
         return okay
     #f fetch
     def fetch(self) -> bool:
-        self.set_subrepo_cs_set()
-        okay = True
-        for sr in self.iter_subrepos():
-            okay = okay and sr.fetch()
-            pass
+        """
+        Fetch this repository and its subrepos
+
+        A subrepo whose fetch times out is reported to the toplevel and
+        the remaining repositories are still fetched; False is returned
+        if any fetch timed out
+        """
+        return self.walk(lambda r:r.fetch_repo(), stop_on_failure=False)
+    #f fetch_repo - fetch just this repository
+    def fetch_repo(self) -> bool:
         try:
             s = "Fetching repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
             self.toplevel.add_log_string(s)
             self.toplevel.verbose.info(s)
-            okay = okay and self.workflow.fetch()
-            if not okay: raise(Exception("Fetch for repo '%s' not permitted"%self.name))
+            if not self.workflow.fetch(): raise(Exception("Fetch for repo '%s' not permitted"%self.name))
             pass
-        except Exception as e:
-            raise(e)
-        return okay
+        except OSCommand.Timeout as e:
+            self.toplevel.add_timed_out_repo(self.name, e.reason)
+            return False
+        return True
     #f update
-    def update(self) -> bool:
-        self.set_subrepo_cs_set()
-        okay = True
-        try:
-            s = "Updating repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
-            self.toplevel.add_log_string(s)
-            self.toplevel.verbose.info(s)
-            if self.is_grip_repo:
-                okay = okay and self.workflow.update_as_grip()
-                pass
-            else:
-                okay = okay and self.workflow.update()
-                pass
-            if not okay: raise(Exception("Update for repo '%s' failed"%self.name))
+    def update(self, jobs:Optional[int]=None, cancellation:Optional[Cancellation]=None) -> List[Tuple['Repository',str]]:
+        """
+        Update this repository and then its subrepos, which (as they are
+        independent once the grip repository has moved) are updated
+        concurrently, up to jobs at once
+
+        Return the repositories that failed to update (for example with a
+        rebase conflict) or were not updated, with the reason
+        """
+        return self.walk_parallel(lambda r:r.update_repo(), jobs=jobs, post_order=False, cancellation=cancellation)
+    #f update_repo - update just this repository
+    def update_repo(self) -> bool:
+        s = "Updating repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
+        self.toplevel.add_log_string(s)
+        self.toplevel.verbose.info(s)
+        if self.is_grip_repo:
+            okay = self.workflow.update_as_grip()
             pass
-        except Exception as e:
-            raise(e)
-        for sr in self.iter_subrepos():
-            okay = okay and sr.update()
+        else:
+            okay = self.workflow.update()
             pass
+        if not okay: raise(Exception("Update for repo '%s' failed"%self.name))
         return okay
     #f merge
     def merge(self, force:bool=False) -> bool:
-        self.set_subrepo_cs_set()
-        okay = True
-        for sr in self.iter_subrepos():
-            okay = okay and sr.merge(force=force)
-            pass
-        try:
-            s = "Merging repo '%s' with workflow '%s' (force %s)"%(self.name, self.workflow.name, str(force))
-            self.toplevel.add_log_string(s)
-            self.toplevel.verbose.info(s)
-            okay = okay and self.workflow.merge(force=force)
-            if not okay: raise(Exception("Merge for repo '%s' failed"%self.name))
-            pass
-        except Exception as e:
-            raise(e)
+        return self.walk(lambda r:r.merge_repo(force=force))
+    #f merge_repo - merge just this repository
+    def merge_repo(self, force:bool=False) -> bool:
+        s = "Merging repo '%s' with workflow '%s' (force %s)"%(self.name, self.workflow.name, str(force))
+        self.toplevel.add_log_string(s)
+        self.toplevel.verbose.info(s)
+        okay = self.workflow.merge(force=force)
+        if not okay: raise(Exception("Merge for repo '%s' failed"%self.name))
         return okay
     #f prepush
-    def prepush(self) -> bool:
-        self.set_subrepo_cs_set()
-        okay = True
-        for sr in self.iter_subrepos():
-            okay = okay and sr.prepush()
-            pass
-        try:
-            s = "Prepushing repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
-            self.toplevel.add_log_string(s)
-            self.toplevel.verbose.info(s)
-            okay = okay and self.workflow.prepush()
-            if not okay: raise(Exception("Prepush for repo '%s' failed"%self.name))
-            pass
-        except Exception as e:
-            raise(e)
+    def prepush(self, jobs:Optional[int]=None, cancellation:Optional[Cancellation]=None) -> List[Tuple['Repository',str]]:
+        """
+        Prepush this repository after its subrepos, up to jobs at once
+
+        Return the repositories that failed to prepush or were not prepushed, with the reason
+        """
+        return self.walk_parallel(lambda r:r.prepush_repo(), jobs=jobs, cancellation=cancellation)
+    #f prepush_repo - prepush just this repository
+    def prepush_repo(self) -> bool:
+        s = "Prepushing repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
+        self.toplevel.add_log_string(s)
+        self.toplevel.verbose.info(s)
+        okay = self.workflow.prepush()
+        if not okay: raise(Exception("Prepush for repo '%s' failed"%self.name))
         return okay
     #f push
-    def push(self) -> bool:
-        self.set_subrepo_cs_set()
-        okay = True
-        for sr in self.iter_subrepos():
-            okay = okay and sr.push()
-            pass
-        try:
-            s = "Pushing repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
-            self.toplevel.add_log_string(s)
-            self.toplevel.verbose.info(s)
-            okay = okay and self.workflow.push()
-            if not okay: raise(Exception("Push for repo '%s' failed"%self.name))
-            pass
-        except Exception as e:
-            raise(e)
+    def push(self, jobs:Optional[int]=None, cancellation:Optional[Cancellation]=None) -> List[Tuple['Repository',str]]:
+        """
+        Push this repository after its subrepos, up to jobs at once
+
+        Return the repositories that failed to push or were not pushed, with the reason
+        """
+        return self.walk_parallel(lambda r:r.push_repo(), jobs=jobs, cancellation=cancellation)
+    #f push_repo - push just this repository
+    def push_repo(self) -> bool:
+        s = "Pushing repo '%s' with workflow '%s'"%(self.name, self.workflow.name)
+        self.toplevel.add_log_string(s)
+        self.toplevel.verbose.info(s)
+        okay = self.workflow.push()
+        if not okay: raise(Exception("Push for repo '%s' failed"%self.name))
         return okay
     #f get_cs
     def get_cs(self) -> str:
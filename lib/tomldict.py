@@ -1,10 +1,10 @@
 #a Imports
-import sys, copy
+import sys
 import toml
 from pathlib import Path
 
 from .exceptions import *
-from typing import Type, List, Callable, Mapping, Any, Dict, IO, Optional, MutableMapping
+from typing import Type, List, Tuple, Callable, Mapping, Any, Dict, IO, Optional, MutableMapping, ClassVar
 RawTomlDict   = MutableMapping[str, Any]
 TDFN = Callable[['TomlDictValues', Any, str, Any],Any]
 
@@ -33,31 +33,53 @@ class TomlDictValues(object):
     based on a description in the TomlDict class.
 
     It provides mehods to access and extract the data in to an object (or namespace)
+
+    An instance is actually of a subclass specific to the TomlDict class
+    (see TomlDict._toml_values_class), which has a slot for each of the
+    fixed attributes of the TomlDict class; the values of other (wildcard)
+    attributes are kept in a dictionary
     """
-    _other_attrs : List[str]
+    __slots__ = ("_dict_class", "_parent", "_other_attrs")
+    _other_attrs : Dict[str,Any]
     _dict_class  : Type['TomlDict']
     _parent      : Optional['TomlDictValues']
     #f is_value_instance - class method - determine if an object is a TomlDictValues
     @classmethod
     def is_value_instance(cls:Any, obj:Any) -> bool:
         return isinstance(obj,cls)
+    #f __new__ - create an instance of the values class of the TomlDict
+    def __new__(cls, dict_class:Type['TomlDict'], parent:Optional['TomlDictValues']=None) -> 'TomlDictValues':
+        if cls is TomlDictValues: cls = dict_class._toml_values_class()
+        return object.__new__(cls)
     #f __init__ - create TomlDictValues corresponding to a TomlDict
     def __init__(self, dict_class:Type['TomlDict'], parent:Optional['TomlDictValues']=None) -> None:
         self._dict_class = dict_class
         self._parent = parent
-        self._other_attrs = []
+        self._other_attrs = {}
+        for a in dict_class._toml_fixed_attrs():
+            setattr(self, a, None)
+            pass
         pass
+    #f __getattr__ - get an other attribute as if it were an attribute of the object
+    def __getattr__(self, a:str) -> Any:
+        if a[0]!='_':
+            others = self._other_attrs
+            if a in others: return others[a]
+            pass
+        raise AttributeError("'%s' has no attribute '%s'"%(self.__class__.__name__, a))
+    #f __getnewargs__ - support copy and pickle, which create the instance with __new__
+    def __getnewargs__(self) -> Tuple[Type['TomlDict'], Optional['TomlDictValues']]:
+        return (self._dict_class, self._parent)
     #f Add_other_attr
     def Add_other_attr(self, a:str, v:Any) -> None:
-        self._other_attrs.append(a)
-        setattr(self, a, v)
+        self._other_attrs[a] = v
         pass
     #f Get_fixed_attrs
     def Get_fixed_attrs(self) -> List[str]:
-        return self._dict_class._toml_fixed_attrs()
+        return list(self._dict_class._toml_fixed_attrs())
     #f Get_other_attrs
     def Get_other_attrs(self) -> List[str]:
-        return self._other_attrs
+        return list(self._other_attrs.keys())
     #f Has - determine if we have an attribute
     def Has(self, a:str) -> bool:
         return hasattr(self, a)
@@ -71,7 +93,12 @@ class TomlDictValues(object):
         return getattr(self, a)
     #f Set - set a value from its string name and any value type
     def Set(self, a:str, v:Any) -> None:
-        setattr(self, a, v)
+        if a in self._dict_class._toml_fixed_attrs():
+            setattr(self, a, v)
+            pass
+        else:
+            self._other_attrs[a] = v
+            pass
         pass
     #f Set_obj_properties - set object propertied according to the string keys
     def Set_obj_properties(self, o:Any, ks:List[str]) -> None:
@@ -100,12 +127,13 @@ class TomlDictValues(object):
         pass
     #f Get_attr_dict - get dictionary of <str name> : <value>
     def Get_attr_dict(self) -> Dict[str,Any]:
-        attrs = self.Get_fixed_attrs()
-        attrs += self._other_attrs
         r = {}
-        for a in attrs:
+        for a in self._dict_class._toml_fixed_attrs():
             r[a] = getattr(self,a)
             pass
+        for (a,v) in self._other_attrs.items():
+            r[a] = v
+            pass
         return r
     #f Prettyprint - print to stdout
     def Prettyprint(self, prefix:str="", file:IO[str]=sys.stdout) -> None:
@@ -132,14 +160,29 @@ class TomlDict(object):
     The values of those properties should be fn(s, p, msg, v) -> value for TomlDictValues attribute
 
     If the value function needs to return an error (because v cannot be handled) then it should use msg in the TomlError
+
+    The schema (the fixed attributes) of each subclass, and the
+    TomlDictValues subclass with slots for them, are determined once
+    and cached in the subclass
     """
     Wildcard : Optional[TDFN] = None
+    _toml_fixed_attrs_cache  : ClassVar[Tuple[str, ...]]
+    _toml_values_class_cache : ClassVar[Type[TomlDictValues]]
     #f _toml_fixed_attrs - classmethod - get attributes
     @classmethod
-    def _toml_fixed_attrs(cls) -> List[str]:
-        attrs = dir(cls)
-        v = [x for x in attrs if ((x[0]>='a') and (x[0]<='z'))]
-        return v
+    def _toml_fixed_attrs(cls) -> Tuple[str, ...]:
+        if "_toml_fixed_attrs_cache" not in cls.__dict__:
+            attrs = dir(cls)
+            cls._toml_fixed_attrs_cache = tuple([x for x in attrs if ((x[0]>='a') and (x[0]<='z'))])
+            pass
+        return cls._toml_fixed_attrs_cache
+    #f _toml_values_class - classmethod - get the TomlDictValues subclass with slots for the fixed attributes
+    @classmethod
+    def _toml_values_class(cls) -> Type[TomlDictValues]:
+        if "_toml_values_class_cache" not in cls.__dict__:
+            cls._toml_values_class_cache = type("%sRecord"%cls.__name__, (TomlDictValues,), {"__slots__":cls._toml_fixed_attrs()})
+            pass
+        return cls._toml_values_class_cache
     #f __init__
     __client : Any
     def __init__(self, client:Any) -> None:
@@ -210,15 +253,13 @@ class TomlDictParser(object):
     def from_dict(cls:Type[TomlDict], msg:str, d:RawTomlDict, parent:Optional[TomlDictValues]=None) -> TomlDictValues:
         values = TomlDictValues(dict_class=cls, parent=parent)
         attrs = cls._toml_fixed_attrs()
-        rtd = copy.deepcopy(d)
+        rtd = dict(d) # only the keys of this level are removed; nested dictionaries are copied by their own from_dict
         for x in attrs:
             if x in rtd:
                 values_fn = getattr(cls,x)
                 setattr(values, x, values_fn(values, parent, "%s.%s"%(msg,x), rtd[x]))
                 del(rtd[x])
                 pass
-            else:
-                setattr(values, x, None)
             pass
         if cls.Wildcard is not None:
             for x in rtd:
@@ -241,7 +282,9 @@ def toml_of_string(s:str) -> RawTomlDict:
 def toml_load(f:IO[str]) -> RawTomlDict:
     return toml.load(f)
 
+def toml_to_string(toml_dict:RawTomlDict) -> str:
+    return toml.dumps(toml_dict)
+
 def toml_save(f:IO[str], toml_dict:RawTomlDict) -> None:
-    s = toml.dumps(toml_dict)
-    f.write(s)
+    f.write(toml_to_string(toml_dict))
     pass
@@ -28,6 +28,10 @@ class Workflow(object):
     grip_config_upstream_cs : Optional[str] # If None, does not exist in upstream
     grip_config_common_cs   : Optional[str] # If None, does not exist in common
 
+    update_up_to_date   = "up to date"
+    update_fast_forward = "fast-forwarded"
+    update_rebase       = "rebased"
+
     #f __init__
     def __init__(self, toplevel:'Toplevel', git_repo: GitRepository, repo:'Repository'):
         self.toplevel = toplevel
@@ -36,6 +40,8 @@ class Workflow(object):
         self.options = toplevel.options
         self.log     = toplevel.log
         self.verbose = toplevel.verbose
+        self.grip_config_upstream_cs = None # Only set for subrepos, as the grip repository is not in the state
+        self.grip_config_common_cs   = None
         pass
 
     #f set_grip_config_cs
@@ -85,11 +91,14 @@ class Workflow(object):
     #f fetch
     def fetch(self, **kwargs:Any) -> bool:
         self.verbose.info("Fetching %s"%(self.get_repo_workflow_string()))
-        output = self.git_repo.fetch()
+        (output, fetched_cs) = self.git_repo.fetch()
         if len(output)>0:print(output)
-        current_cs = self.git_repo.get_cs(branch_name=branch_upstream)
-        fetched_cs = self.git_repo.get_cs(branch_name=branch_remote_of_upstream)
-        self.git_repo.change_branch_ref(branch_name=branch_upstream, ref=fetched_cs)
+        current_cs = self.git_repo.read_ref("refs/heads/%s"%branch_upstream)
+        if current_cs is None: current_cs = self.git_repo.get_cs(branch_name=branch_upstream)
+        if fetched_cs is None: fetched_cs = self.git_repo.get_cs(branch_name=branch_remote_of_upstream)
+        if fetched_cs!=current_cs:
+            self.git_repo.change_branch_ref(branch_name=branch_upstream, ref=fetched_cs)
+            pass
         self.verbose.message("Repo '%s' %s stream branch now at %s (was at %s)"%(self.git_repo.get_name(), branch_upstream, fetched_cs, current_cs))
         return True
     #f update
@@ -122,6 +131,21 @@ class Workflow(object):
         If True is returned then git_repo.get_cs() will return a CS that can be used for the grip state.
         """
         raise Exception("commit not implemented for workflow %s"%self.name)
+    #f commit_git_repo
+    def commit_git_repo(self) -> None:
+        """
+        Commit all the changes in the git repo
+
+        Without a commit message git runs an editor, so (as repos may be
+        committed concurrently) only one such commit is run at a time
+        """
+        if self.options.get("message",None) is not None:
+            self.git_repo.commit()
+            return
+        with self.toplevel.editor_lock:
+            self.git_repo.commit()
+            pass
+        pass
     #f merge
     def merge(self, **kwargs:Any) -> bool:
         """
@@ -153,6 +177,51 @@ class Workflow(object):
         If True is returned then git_repo.get_cs() will return a CS that can be used for the grip state.
         """
         raise Exception("push not implemented for workflow %s"%self.name)
+    #f classify_update
+    def classify_update(self, target_cs:str, common_cs:Optional[str]=None) -> str:
+        """
+        Classify how the git repo (at git_repo_cs) is brought up to target_cs
+
+        Return update_up_to_date if target_cs is already contained in the repo,
+        update_fast_forward if the repo is an ancestor of target_cs,
+        and update_rebase otherwise
+
+        If the common ancestor of the two is already known it may be supplied
+        """
+        if self.git_repo_cs==target_cs: return self.update_up_to_date
+        if common_cs is None:
+            if self.git_repo.is_ancestor(target_cs, self.git_repo_cs): return self.update_up_to_date
+            if self.git_repo.is_ancestor(self.git_repo_cs, target_cs): return self.update_fast_forward
+            return self.update_rebase
+        if common_cs==target_cs: return self.update_up_to_date
+        if common_cs==self.git_repo_cs: return self.update_fast_forward
+        return self.update_rebase
+    #f update_to_cs
+    def update_to_cs(self, target_cs:str, operation:str="update", common_cs:Optional[str]=None) -> str:
+        """
+        Bring the git repo up to target_cs, doing nothing if it is
+        already up to date, fast-forwarding if possible, and rebasing
+        only if required; the action taken is recorded with the toplevel
+        and returned
+        """
+        repo_string = self.get_repo_workflow_string()
+        action = self.classify_update(target_cs, common_cs=common_cs)
+        reason = None
+        if action==self.update_up_to_date:
+            self.verbose.info("%s already contains cs %s"%(repo_string, target_cs))
+            pass
+        elif action==self.update_fast_forward:
+            self.verbose.info("%s fast-forwarding to cs %s for %s"%(repo_string, target_cs, operation))
+            reason = self.git_repo.fast_forward(target_cs)
+            pass
+        else:
+            self.verbose.info("%s rebasing with cs %s for %s"%(repo_string, target_cs, operation))
+            reason = self.git_repo.rebase(other_branch=target_cs)
+            pass
+        if reason is not None:
+            raise WorkflowError("%s failed to %s (%s)"%(repo_string, operation, reason.get_reason()))
+        self.toplevel.add_update_action(self.git_repo.get_name(), action)
+        return action
     #f how_git_repo_upstreamed
     def how_git_repo_upstreamed(self) -> int:
         """
@@ -88,13 +88,7 @@ class ReadOnly(Workflow):
         if self.grip_config_upstream_cs is None:
             self.verbose.info("%s has no upstream, so not updating"%(repo_string))
             return True
-        if self.grip_config_upstream_cs==self.git_repo_cs:
-            self.verbose.info("%s upstream is at grip config cs %s"%(repo_string, self.grip_config_upstream_cs))
-            return True
-        reason = self.git_repo.rebase(other_branch=self.grip_config_upstream_cs)
-        self.verbose.info("%s rebase with cs %s to update to grip config"%(repo_string, self.grip_config_upstream_cs))
-        if reason is not None:
-            raise WorkflowError("%s failed to update (%s)"%(self.get_repo_workflow_string(), reason.get_reason()))
+        self.update_to_cs(self.grip_config_upstream_cs)
         return True
     #f update_as_grip
     def update_as_grip(self, **kwargs:Any) -> bool:
@@ -108,12 +102,8 @@ class ReadOnly(Workflow):
         if self.git_repo_cs != self.git_common_cs:
             self.verbose.error("%s has been modified (at %s) since last update (%s) - must be sorted out by hand"%(repo_string, self.git_repo_cs, self.git_common_cs))
             return False
-        if self.git_repo_cs == self.git_upstream_cs: # and upstream==common too, of course
-            self.verbose.info("%s upstream has not changed"%(repo_string))
-            return True
-        reason = self.git_repo.rebase(other_branch=self.git_upstream_cs)
-        if reason is not None:
-            raise WorkflowError("%s failed to update (%s)"%(repo_string, reason.get_reason()))
+        # The repo is at the common ancestor, so this is up to date or a fast-forward
+        self.update_to_cs(self.git_upstream_cs, common_cs=self.git_common_cs)
         return True
     #f merge
     def merge(self, force:bool=False, **kwargs:Any) -> bool:
@@ -95,9 +95,8 @@ class Single(Workflow):
         reason = self.git_repo.is_modified()
         if reason is not None:
             raise WorkflowError("%s is modified (%s)"%(self.get_repo_workflow_string(), reason.get_reason()))
-        reason = self.git_repo.rebase(other_branch="upstream")
-        if reason is not None:
-            raise WorkflowError("%s failed to merge (%s)"%(self.get_repo_workflow_string(), reason.get_reason()))
+        self.get_git_repo_cs()
+        self.update_to_cs(self.git_upstream_cs, operation="merge", common_cs=self.git_common_cs)
         return True
     #f update
     def update(self, force:bool=False, **kwargs:Any) -> bool:
@@ -106,9 +105,7 @@ class Single(Workflow):
         if self.grip_config_upstream_cs is None:
             self.verbose.info("%s has no upstream, so not updating"%(repo_string))
             return True
-        reason = self.git_repo.rebase(other_branch=self.grip_config_upstream_cs)
-        if reason is not None:
-            raise WorkflowError("%s failed to update (%s)"%(repo_string, reason.get_reason()))
+        self.update_to_cs(self.grip_config_upstream_cs)
         return True
     #f commit
     def commit(self) -> bool:
@@ -117,7 +114,7 @@ class Single(Workflow):
         reason = self.git_repo.is_modified()
         if reason is not None:
             self.verbose.message("%s is modified (%s) - attempting a commit"%(self.get_repo_workflow_string(), reason.get_reason()))
-            self.git_repo.commit()
+            self.commit_git_repo()
             pass
         is_upstreamed = self.check_git_repo_is_upstreamed()
         if not is_upstreamed:
@@ -141,13 +138,14 @@ class Single(Workflow):
     def push(self) -> bool:
         """
         prepush MUST have been run recently
-        If the push succeeds, then upstream must be at head
+        If the push succeeds, then upstream is moved to the changeset pushed
         """
         upstream = self.git_repo.get_upstream()
         if upstream is None:
             raise WorkflowError("%s cannot be pushed, it has no upstream"%(self.get_repo_workflow_string()))
+        cs = self.git_repo.get_cs()
         self.git_repo.push(dry_run=False, repo=upstream.get_origin(), ref="HEAD:%s"%(upstream.get_branch()))
-        self.git_repo.change_branch_ref(branch_name="upstream", ref=self.get_branch_name())
+        self.git_repo.change_branch_ref(branch_name="upstream", ref=cs)
         return True
     #f All done
     pass
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Memory and time benchmark of reading a large grip.toml file
+
+Generates a synthetic grip.toml with many configurations, repos and
+stages, reads it, builds every configuration (as 'grip doc' does),
+validates and resolves it, and reports the time taken and the memory
+retained by (and peak memory used in) building the descriptor, as
+measured by tracemalloc.
+"""
+
+#a Imports
+import sys, time, argparse, tracemalloc
+from pathlib import Path
+from lib.log import Log
+from lib.descriptor import GripDescriptor
+from .test_lib.grip import GripBaseTest
+
+from typing import List
+
+#a Benchmark
+#f synthetic_grip_toml
+def synthetic_grip_toml(num_configs:int, num_repos:int, num_stages:int) -> str:
+    """
+    Every repo has every stage, and every configuration uses every repo
+    but the first (which is a base repo)
+
+    The toml is written directly, as toml.dumps is too slow for large files
+    """
+    stages = ["stage_%d"%s for s in range(num_stages)]
+    repos  = ["repo_%d"%r for r in range(num_repos)]
+    configs = ["config_%d"%c for c in range(num_configs)]
+    def toml_list(l:List[str]) -> str:
+        return "[%s]"%(", ".join(['"%s"'%x for x in l]))
+    lines = ['name = "bench"', 'workflow = "readonly"', 'default_config = "config_0"',
+             'configs = %s'%toml_list(configs), 'stages = %s'%toml_list(stages), 'base_repos = ["repo_0"]']
+    for r in repos:
+        lines.append('[repo.%s]'%r)
+        lines.append('url = "https://server/%s.git"'%r)
+        lines.append('env = {REPO_ENV = "%s"}'%r)
+        for s in stages:
+            lines.append('%s = {exec = "make -C @GRIP_REPO_PATH@ %s", requires = [".%s"], doc = "Stage %s"}'%(s, s, stages[0], s))
+            pass
+        pass
+    for c in configs:
+        lines.append('[config.%s]'%c)
+        lines.append('repos = %s'%toml_list(repos[1:]))
+        lines.append('env = {CONFIG = "%s"}'%c)
+        pass
+    return "\n".join(lines)+"\n"
+
+#f main
+def main(args:List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the memory and time of reading a large grip.toml")
+    parser.add_argument("--configs", type=int, default=40, help="number of configurations")
+    parser.add_argument("--repos", type=int, default=100, help="number of repos")
+    parser.add_argument("--stages", type=int, default=10, help="number of stages per repo")
+    options = parser.parse_args(args)
+    grip_toml = synthetic_grip_toml(options.configs, options.repos, options.stages)
+    base = GripBaseTest(log=Log(), files={".grip/grip.toml":grip_toml})
+    tracemalloc.start()
+    start = time.monotonic()
+    desc = GripDescriptor(base=base)
+    desc.read_toml_file(Path(".grip/grip.toml"))
+    desc.build_all_configs()
+    desc.validate(check_stage_dependencies=False)
+    desc.resolve(config_name=None)
+    elapsed = time.monotonic() - start
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    num_stages = 0
+    for c in desc.configs.values():
+        for r in c.iter_repos():
+            num_stages += len(list(r.iter_stages()))
+            pass
+        pass
+    print("%-30s %10d"%("configurations", len(desc.configs)))
+    print("%-30s %10d"%("repo stage instances", num_stages))
+    print("%-30s %10.3f s"%("time", elapsed))
+    print("%-30s %10.1f MB"%("retained memory", current/1E6))
+    print("%-30s %10.1f MB"%("peak memory", peak/1E6))
+    if num_stages>0: print("%-30s %10.1f bytes"%("retained per stage instance", current/num_stages))
+    pass
+
+#a Toplevel
+if __name__ == "__main__":
+    main(sys.argv[1:])
+    pass
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the per-call overhead of OSCommand
+
+Runs 'git rev-parse --show-toplevel' (by default) repeatedly using a
+shell command string and using an argv list, and reports the time per
+call of each and the overhead saved by the argv path.
+"""
+
+#a Imports
+import os, sys, time, argparse
+from lib.os_command import OSCommand
+
+from typing import List, Callable
+
+#a Benchmark
+#f time_calls
+def time_calls(n:int, make_cmd:Callable[[],OSCommand]) -> float:
+    start = time.monotonic()
+    for i in range(n):
+        make_cmd().run()
+        pass
+    return (time.monotonic() - start) / n
+
+#f main
+def main(args:List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark OSCommand shell and argv execution")
+    parser.add_argument("--calls", type=int, default=200, help="number of calls of each type")
+    parser.add_argument("--cwd", default=".", help="directory to run the command in")
+    parser.add_argument("argv", nargs="*", default=["git", "rev-parse", "--show-toplevel"], help="command to run")
+    options = parser.parse_args(args)
+    cwd = os.path.abspath(options.cwd)
+    argv : List[str] = options.argv
+    shell_cmd = " ".join(argv)
+    # Warm up (and populate the executable and environment caches)
+    OSCommand(cmd=shell_cmd, cwd=cwd).run()
+    OSCommand(cmd=argv, cwd=cwd).run()
+    shell_time = time_calls(options.calls, lambda:OSCommand(cmd=shell_cmd, cwd=cwd))
+    argv_time  = time_calls(options.calls, lambda:OSCommand(cmd=argv, cwd=cwd))
+    print("%-30s %10.1f us/call"%("shell '%s'"%shell_cmd, shell_time*1E6))
+    print("%-30s %10.1f us/call"%("argv", argv_time*1E6))
+    print("%-30s %10.1f us/call (%.1f%%)"%("saved", (shell_time-argv_time)*1E6, 100*(shell_time-argv_time)/shell_time))
+    pass
+
+#a Toplevel
+if __name__ == "__main__":
+    main(sys.argv[1:])
+    pass
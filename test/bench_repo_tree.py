@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark of the grip descriptor and repository instance tree
+
+For a number of repos doubling up to (by default) 10000, builds the
+descriptor of a synthetic grip.toml with one configuration using every
+repo, builds the repository instance tree with git and the workflow
+stubbed out (and a plain repository at its root), traverses it (as
+status and fetch do), and looks every repo up by name and by path. The time per repo of each step is
+reported, along with the time divided by n log2 n; this ratio should
+not grow with n.
+"""
+
+#a Imports
+import sys, time, math, argparse
+from pathlib import Path
+from lib.log import Log
+from lib.verbose import Verbose
+from lib.options import Options
+from lib.git import Url as GitUrl
+from lib.workflow import Workflow
+from lib.descriptor import GripDescriptor
+from lib.configstate import GripConfigStateInitial # imports lib.repo, which must not be imported first
+from lib.repo import Repository
+from .test_lib.grip import GripBaseTest
+from .bench_descriptor import synthetic_grip_toml
+
+from typing import List, Dict, Callable, Optional, Any
+
+#a Stubs
+#c StubGitRepo - the parts of a git repository used by the instance tree
+class StubGitRepo:
+    def __init__(self, path:Path) -> None:
+        self._path = path
+        pass
+    def path(self, path:Optional[Path]=None) -> Path:
+        if path is None: return self._path
+        return self._path.joinpath(path)
+    def get_cs(self) -> str:
+        return "0"*40
+    pass
+
+#c StubWorkflow - a workflow that does nothing
+class StubWorkflow(Workflow):
+    name = "stub"
+    def status(self) -> bool: return True
+    def fetch(self, **kwargs:Any) -> bool: return True
+    pass
+
+#c StubToplevel - the parts of the toplevel used by the instance tree
+class StubToplevel:
+    def __init__(self) -> None:
+        self.options = Options()
+        self.options._validate()
+        self.log = Log()
+        self.verbose = Verbose(level=Verbose.level_warning)
+        pass
+    def add_log_string(self, s:str) -> None:
+        pass
+    pass
+
+#a Benchmark
+#f time_step
+def time_step(fn:Callable[[],Any]) -> float:
+    start = time.monotonic()
+    fn()
+    return time.monotonic() - start
+
+#f bench
+def bench(num_repos:int, num_stages:int) -> Dict[str,float]:
+    grip_toml = synthetic_grip_toml(1, num_repos, num_stages)
+    base = GripBaseTest(log=Log(), files={".grip/grip.toml":grip_toml})
+    desc = GripDescriptor(base=base)
+    def build_desc() -> None:
+        desc.read_toml_file(Path(".grip/grip.toml"))
+        desc.select_config()
+        desc.resolve(config_name="config_0")
+        desc.resolve_git_urls(GitUrl("https://server/grip.git"))
+        desc.validate(check_stage_dependencies=True)
+        pass
+    times = {}
+    times["descriptor"] = time_step(build_desc)
+    toplevel = StubToplevel()
+    root = Path("/grip")
+    tree = Repository(name="<toplevel>", grip_repo=toplevel, parent=None, git_repo=StubGitRepo(root), workflow=StubWorkflow) # type: ignore
+    def build_tree() -> None:
+        assert desc.selected_config is not None
+        for rd in desc.selected_config.iter_repos():
+            Repository(name=rd.name, grip_repo=toplevel, parent=tree, git_repo=StubGitRepo(root.joinpath(rd.path())), workflow=StubWorkflow) # type: ignore
+            pass
+        pass
+    times["instance tree"] = time_step(build_tree)
+    times["status"] = time_step(lambda:tree.status())
+    times["fetch"]  = time_step(lambda:tree.fetch())
+    def lookup() -> None:
+        for r in list(tree.iter_subrepos()):
+            assert tree.get_subrepo(r.name) is r
+            assert tree.get_subrepo_of_path(r.git_repo.path()) is r
+            pass
+        pass
+    times["lookups"] = time_step(lookup)
+    return times
+
+#f main
+def main(args:List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the scaling of the descriptor and repository instance tree with the number of repos")
+    parser.add_argument("--repos", type=int, default=10000, help="largest number of repos")
+    parser.add_argument("--stages", type=int, default=2, help="number of stages per repo")
+    parser.add_argument("--steps", type=int, default=4, help="number of sizes (halving each time)")
+    options = parser.parse_args(args)
+    sizes = [options.repos >> i for i in range(options.steps)]
+    sizes.reverse()
+    print("%-16s %8s %14s %14s"%("step", "repos", "us/repo", "ns/(n log n)"))
+    for n in sizes:
+        for (step, t) in bench(n, options.stages).items():
+            print("%-16s %8d %14.1f %14.1f"%(step, n, t/n*1E6, t/(n*math.log2(n))*1E9))
+            pass
+        pass
+    pass
+
+#a Toplevel
+if __name__ == "__main__":
+    main(sys.argv[1:])
+    pass
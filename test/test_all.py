@@ -23,6 +23,15 @@ def add_test_suite(module_name:str)->None:
 
 add_test_suite(".test_grip_desc")
 add_test_suite(".test_git")
+add_test_suite(".test_archive")
+add_test_suite(".test_bundle")
+add_test_suite(".test_grep")
+add_test_suite(".test_metrics")
+add_test_suite(".test_log")
+add_test_suite(".test_mirror")
+add_test_suite(".test_os_command")
+add_test_suite(".test_repo")
+add_test_suite(".test_toplevel")
 add_test_suite(".test_grip")
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+#a Imports
+import io, tarfile
+from pathlib import Path
+
+from lib.exceptions import *
+from lib.log import Log
+from lib.metrics import Metrics
+from lib.os_command import OSCommand, Cancellation
+from lib.archive import GripArchive, ArchiveSource
+
+from .test_lib.filesystem import FileSystem, FileContent
+from .test_lib.unittest import TestCase
+from .test_lib.git import Repository as GitRepository
+
+from typing import List
+
+#a Unittest for GripArchive class
+class ArchiveUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f make_sources
+    def make_sources(self, fs:FileSystem) -> List[ArchiveSource]:
+        sources = []
+        for name in ["one", "two", "three"]:
+            d = GitRepository(name=name, fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+            sources.append(ArchiveSource(name=name, path=d.abspath, changeset=d.git_repo.get_cs(), prefix="top/%s/"%name))
+            pass
+        return sources
+    #f test_archive
+    def test_archive(self) -> None:
+        fs = FileSystem(log=self._logger)
+        sources = self.make_sources(fs)
+        for filename in ["a.tar", "a.tar.xz"]:
+            path = fs.abspath(Path(filename))
+            archive = GripArchive(path=path)
+            for s in sources: archive.add_source(s)
+            archive.write(jobs=2)
+            with tarfile.open(path) as tar:
+                names = sorted(tar.getnames())
+                pass
+            self.assertEqual(names, ["top/one", "top/one/Readme.txt", "top/three", "top/three/Readme.txt", "top/two", "top/two/Readme.txt"])
+            pass
+        fs.cleanup()
+        pass
+    #f test_log_and_metrics
+    def test_log_and_metrics(self) -> None:
+        fs = FileSystem(log=self._logger)
+        sources = self.make_sources(fs)
+        log = Log()
+        metrics = Metrics()
+        archive = GripArchive(path=fs.abspath(Path("a.tar")), log=log)
+        for s in sources: archive.add_source(s)
+        metrics.start(command="archive")
+        try:
+            self.assertEqual(archive.write(jobs=2, timeout=60), 6)
+            pass
+        finally:
+            metrics.stop(0)
+            pass
+        self.assertEqual(metrics.as_dict()["subprocesses"]["git archive"]["count"], 3)
+        f = io.StringIO()
+        log.dump(f)
+        self.assertEqual(f.getvalue().lower().count("os command 'git archive --format=tar --prefix=top/"), 6)
+        fs.cleanup()
+        pass
+    #f test_deadline
+    def test_deadline(self) -> None:
+        fs = FileSystem(log=self._logger)
+        sources = self.make_sources(fs)
+        path = fs.abspath(Path("a.tar"))
+        archive = GripArchive(path=path)
+        for s in sources: archive.add_source(s)
+        with self.assertRaises(OSCommand.Timeout):
+            archive.write(jobs=2, cancellation=Cancellation(timeout=0))
+            pass
+        self.assertFalse(path.exists())
+        fs.cleanup()
+        pass
+    #f test_bad_changeset
+    def test_bad_changeset(self) -> None:
+        fs = FileSystem(log=self._logger)
+        sources = self.make_sources(fs)
+        sources[1].changeset = "0"*40
+        path = fs.abspath(Path("a.tar.gz"))
+        archive = GripArchive(path=path)
+        for s in sources: archive.add_source(s)
+        with self.assertRaises(UserError):
+            archive.write(jobs=2)
+            pass
+        self.assertFalse(path.exists())
+        fs.cleanup()
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [ArchiveUnitTest]
@@ -0,0 +1,129 @@
+#a Imports
+import tarfile, tempfile
+from pathlib import Path
+
+from lib.exceptions import *
+from lib.bundle import GripBundle, BundleManifest, BundleEntry
+from lib.git import Repository as GitRepo
+
+from .test_lib.filesystem import FileSystem, FileContent
+from .test_lib.unittest import TestCase
+from .test_lib.git import Repository as GitRepository
+
+from typing import Optional, Dict
+
+#a Unittest for GripBundle class
+class GripBundleUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f write_archive - write a bundle archive of a grip repository and subrepos as GripBundle.create does
+    def write_archive(self, path:Path, id:str, grip:GitRepository, repos:Dict[str,GitRepository], previous:Optional[BundleManifest]=None) -> BundleManifest:
+        with tempfile.TemporaryDirectory(prefix="grip_bundle_test") as tmp_dir:
+            tmp = Path(tmp_dir)
+            with tarfile.open(path, "w") as tar:
+                prev_grip = None if previous is None else previous.grip
+                grip_entry = GripBundle.add_repo(tar, tmp, BundleManifest.grip_name, grip.git_repo, grip.git_repo.get_cs(), prev_grip)
+                manifest = BundleManifest(id=id, config="cfg", grip=grip_entry, since=None if previous is None else previous.id)
+                for (n,r) in repos.items():
+                    prev_entry = None if previous is None else previous.repos.get(n,None)
+                    manifest.repos[n] = GripBundle.add_repo(tar, tmp, n, r.git_repo, r.git_repo.get_cs(), prev_entry)
+                    pass
+                GripBundle.add_string(tar, BundleManifest.filename, manifest.as_string())
+                pass
+            pass
+        return manifest
+    #f commit - add a commit to a repository
+    def commit(self, repo:GitRepository) -> str:
+        repo.append_to_file(Path("Readme.txt"), FileContent("More\n"))
+        repo.git_command(cmd="commit -m More -a")
+        return repo.git_repo.get_cs()
+    #f test_chain
+    def test_chain(self) -> None:
+        fs = FileSystem(log=self._logger)
+        grip_origin = self.make_repo(fs, "grip_origin")
+        sub_origin  = self.make_repo(fs, "sub_origin")
+        grip = GitRepository(name="grip", fs=fs, log=self._logger).git_clone(clone=grip_origin.abspath, branch_name="WIP")
+        sub  = GitRepository(name="sub", fs=fs, log=self._logger).git_clone(clone=sub_origin.abspath, branch_name="WIP")
+        g1 = grip.git_repo.get_cs()
+        s1 = sub.git_repo.get_cs()
+        full = self.write_archive(fs.abspath(Path("full.tar")), "full", grip, {"sub":sub})
+        self.assertIsNone(full.grip.prerequisite)
+        self.assertIsNotNone(full.repos["sub"].bundle)
+        self.write_archive(fs.abspath(Path("other.tar")), "other", grip, {"sub":sub})
+        g2 = self.commit(grip)
+        incr = self.write_archive(fs.abspath(Path("incr.tar")), "incr", grip, {"sub":sub}, previous=full)
+        self.assertEqual(incr.since, "full")
+        self.assertEqual(incr.grip.prerequisite, g1)
+        self.assertIsNotNone(incr.grip.bundle)
+        self.assertEqual(incr.repos["sub"].prerequisite, s1)
+        self.assertIsNone(incr.repos["sub"].bundle)
+
+        bundle = GripBundle([fs.abspath(Path("full.tar")), fs.abspath(Path("incr.tar"))])
+        self.assertEqual(bundle.manifest().id, "incr")
+        grip_bundles = bundle.get_bundles()
+        self.assertEqual(len(grip_bundles), 2)
+        self.assertEqual(len(bundle.get_bundles("sub")), 1)
+        for b in grip_bundles + bundle.get_bundles("sub"):
+            self.assertTrue(b.is_file())
+            self.assertEqual(b.suffix, ".bundle")
+            pass
+        entry = bundle.get_entry()
+        assert entry is not None
+        clone = GitRepo.clone_from_bundles(bundles=grip_bundles, repo_url=entry.url, branch=entry.branch, changeset=entry.changeset, new_branch_name="WIP", dest=fs.abspath(Path("grip_clone")), log=self._logger)
+        self.assertEqual(clone.get_cs("HEAD"), g2)
+        sub_entry = bundle.get_entry("sub")
+        assert sub_entry is not None
+        sub_clone = GitRepo.clone_from_bundles(bundles=bundle.get_bundles("sub"), repo_url=sub_entry.url, branch=sub_entry.branch, changeset=sub_entry.changeset, new_branch_name="WIP", dest=fs.abspath(Path("sub_clone")), log=self._logger)
+        self.assertEqual(sub_clone.get_cs("HEAD"), s1)
+        bundle.cleanup()
+
+        with self.assertRaisesRegex(UserError, "not incremental"):
+            GripBundle([fs.abspath(Path("full.tar")), fs.abspath(Path("other.tar"))])
+            pass
+        with self.assertRaisesRegex(UserError, "not given before it"):
+            GripBundle([fs.abspath(Path("incr.tar"))])
+            pass
+        with self.assertRaisesRegex(UserError, "not given before it"):
+            GripBundle([fs.abspath(Path("other.tar")), fs.abspath(Path("incr.tar"))])
+            pass
+        fs.cleanup()
+        pass
+    #f test_prerequisite
+    def test_prerequisite(self) -> None:
+        fs = FileSystem(log=self._logger)
+        origin = self.make_repo(fs, "origin")
+        repo = GitRepository(name="repo", fs=fs, log=self._logger).git_clone(clone=origin.abspath, branch_name="WIP")
+        c1 = repo.git_repo.get_cs()
+        c2 = self.commit(repo)
+        tmp = fs.abspath(Path("tmp"))
+        tmp.mkdir()
+        with tarfile.open(fs.abspath(Path("a.tar")), "w") as tar:
+            def previous(changeset:str) -> BundleEntry:
+                return BundleEntry(name="repo", url="", branch="master", changeset=changeset)
+            entry = GripBundle.add_repo(tar, tmp, "repo", repo.git_repo, c2, previous(c1))
+            self.assertEqual((entry.prerequisite, entry.bundle), (c1, "bundles/repo.bundle"))
+            entry = GripBundle.add_repo(tar, tmp, "repo", repo.git_repo, c1, previous(c2))
+            self.assertEqual((entry.prerequisite, entry.bundle), (None, "bundles/repo.bundle"))
+            entry = GripBundle.add_repo(tar, tmp, "repo", repo.git_repo, c2, previous("0"*40))
+            self.assertEqual((entry.prerequisite, entry.bundle), (None, "bundles/repo.bundle"))
+            entry = GripBundle.add_repo(tar, tmp, "repo", repo.git_repo, c2, previous(c2))
+            self.assertEqual((entry.prerequisite, entry.bundle), (c2, None))
+            pass
+        fs.cleanup()
+        pass
+    #f make_repo
+    def make_repo(self, fs:FileSystem, name:str) -> GitRepository:
+        return GitRepository(name=name, fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [GripBundleUnitTest]
@@ -6,6 +6,9 @@ from lib.exceptions import *
 import lib.os_command
 import lib.verbose
 from lib.git import Url as GitUrl
+from lib.git import git_dirs_of_path
+from lib.git import Repository as GitRepo
+from lib.git import LazyRepository as LazyGitRepo
 
 from .test_lib.filesystem import FileSystem, FileContent
 from .test_lib.loggable import TestLog
@@ -78,8 +81,242 @@ class RepoUnitTest(TestCase):
         pass
     pass
 
+#a Unittest for git worktrees
+class WorktreeUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_worktree(self) -> None:
+        fs = FileSystem(log=self._logger)
+        d1 = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        d2 = GitRepository(name="one_clone", fs=fs, log=self._logger).git_clone(clone=d1.abspath, branch_name="WIP_a")
+        wt = d2.git_repo.add_worktree(dest=fs.abspath(Path("one_worktree")), new_branch_name="WIP_b")
+        self.assertFalse(d2.git_repo.is_worktree())
+        self.assertTrue(wt.is_worktree())
+        self.assertEqual(wt.common_git_dir().resolve(), d2.abspath.joinpath(".git").resolve())
+        self.assertEqual(git_dirs_of_path(wt.path()), (wt.git_dir(), wt.common_git_dir()))
+        self.assertEqual(wt.get_cs("HEAD"), d2.git_repo.get_cs("upstream"))
+        self.assertEqual(wt.get_branch_name(), "WIP_b")
+        self.assertEqual(d2.git_repo.get_branch_worktree("WIP_b"), wt.path())
+        self.assertEqual(wt.get_branch_worktree("WIP_a"), d2.git_repo.path())
+        self.assertIsNone(wt.get_branch_worktree("upstream"))
+        fs.cleanup()
+        pass
+    pass
+
+#a Unittest for shallow clones
+class ShallowCloneUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def _test_shallow_changeset(self, protocol_version:str, expected_depth:int) -> None:
+        fs = FileSystem(log=self._logger)
+        d1 = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        for i in range(8):
+            d1.append_to_file(Path("Readme.txt"), FileContent("Line %d\n"%i))
+            d1.git_command(cmd="commit -m Commit%d -a"%i)
+            pass
+        changeset = d1.git_repo.get_cs("HEAD~5")
+        saved_env = dict(os.environ)
+        os.environ.update({"GIT_CONFIG_COUNT":"1", "GIT_CONFIG_KEY_0":"protocol.version", "GIT_CONFIG_VALUE_0":protocol_version})
+        lib.os_command.OSCommand.base_env = None
+        try:
+            clone = GitRepo.clone(repo_url="file://%s"%str(d1.abspath), new_branch_name="WIP", dest=fs.abspath(Path("one_clone")), depth=1, changeset=changeset)
+            pass
+        finally:
+            os.environ.clear()
+            os.environ.update(saved_env)
+            lib.os_command.OSCommand.base_env = None
+            pass
+        self.assertEqual(clone.depth, expected_depth)
+        self.assertEqual(clone.get_cs("HEAD"), changeset)
+        self.assertEqual(clone.get_branch_name(), "WIP")
+        self.assertEqual(clone.get_cs("upstream"), d1.git_repo.get_cs("HEAD"))
+        fs.cleanup()
+        pass
+    def test_shallow_changeset_direct(self) -> None:
+        self._test_shallow_changeset(protocol_version="2", expected_depth=1)
+        pass
+    def test_shallow_changeset_deepen(self) -> None:
+        # Protocol version 0 does not permit fetching an unadvertised changeset
+        self._test_shallow_changeset(protocol_version="0", expected_depth=8)
+        pass
+    pass
+
+#a Unittest for fetch
+class FetchUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_fetch_upstream(self) -> None:
+        fs = FileSystem(log=self._logger)
+        d1 = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        d2 = GitRepository(name="one_clone", fs=fs, log=self._logger).git_clone(clone=d1.abspath, branch_name="WIP")
+        d1.append_to_file(Path("Readme.txt"), FileContent("More\n"))
+        d1.git_command(cmd="commit -m More -a")
+        d1.git_command(cmd="tag a_tag")
+        d1.git_command(cmd="branch other")
+        (output, fetched_cs) = d2.git_repo.fetch()
+        self.assertEqual(fetched_cs, d1.git_repo.get_cs("HEAD"))
+        self.assertEqual(d2.git_repo.read_ref("refs/remotes/origin/master"), fetched_cs)
+        self.assertIsNone(d2.git_repo.read_ref("refs/remotes/origin/other"))
+        self.assertFalse(d2.git_repo.has_cs("a_tag"))
+        self.assertEqual(d2.git_repo.read_ref("refs/heads/upstream"), d2.git_repo.get_cs("upstream"))
+        fs.cleanup()
+        pass
+    pass
+
+#c BundleUnitTest
+class BundleUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_incremental_bundles(self) -> None:
+        fs = FileSystem(log=self._logger)
+        d1 = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        cs1 = d1.git_repo.get_cs("HEAD")
+        d1.git_repo.create_bundle(fs.abspath(Path("b1.bundle")), changeset=cs1)
+        d1.append_to_file(Path("Readme.txt"), FileContent("More\n"))
+        d1.git_command(cmd="commit -m More -a")
+        cs2 = d1.git_repo.get_cs("HEAD")
+        self.assertTrue(d1.git_repo.is_ancestor(cs1, cs2))
+        self.assertFalse(d1.git_repo.is_ancestor(cs2, cs1))
+        d1.git_repo.create_bundle(fs.abspath(Path("b2.bundle")), changeset=cs2, prerequisite=cs1)
+        self.assertFalse(d1.git_repo.has_cs(GitRepo.bundle_ref))
+        bundles = [fs.abspath(Path("b1.bundle")), fs.abspath(Path("b2.bundle"))]
+        d2 = GitRepo.clone_from_bundles(bundles=bundles, repo_url="/not/a/repo", branch="master", changeset=cs1, new_branch_name="WIP", dest=fs.abspath(Path("two")), log=self._logger)
+        self.assertEqual(d2.get_git_url_string(), "/not/a/repo")
+        self.assertEqual(d2.get_cs("HEAD"), cs1)
+        self.assertEqual(d2.get_cs("upstream"), cs2)
+        self.assertEqual(d2.get_cs("upstream@{upstream}"), cs2)
+        with self.assertRaises(UserError):
+            GitRepo.clone_from_bundles(bundles=bundles[1:], repo_url="/not/a/repo", branch="master", changeset=cs2, new_branch_name="WIP", dest=fs.abspath(Path("three")), log=self._logger)
+            pass
+        self.assertFalse(fs.abspath(Path("three")).exists())
+        fs.cleanup()
+        pass
+    pass
+
+#c FastForwardUnitTest
+class FastForwardUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_fast_forward(self) -> None:
+        fs = FileSystem(log=self._logger)
+        d1 = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        d2 = GitRepository(name="one_clone", fs=fs, log=self._logger).git_clone(clone=d1.abspath, branch_name="WIP")
+        cs1 = d2.git_repo.get_cs("HEAD")
+        d1.append_to_file(Path("Readme.txt"), FileContent("More\n"))
+        d1.git_command(cmd="commit -m More -a")
+        (output, cs2) = d2.git_repo.fetch()
+        assert cs2 is not None
+        self.assertIsNone(d2.git_repo.fast_forward(cs2))
+        self.assertEqual(d2.git_repo.get_cs("HEAD"), cs2)
+        self.assertEqual(d2.git_repo.get_cs("WIP"), cs2)
+        self.assertEqual(d2.git_repo.get_branch_name(), "WIP")
+        self.assertIsNone(d2.git_repo.is_modified())
+        self.assertIn("More", d2.abspath.joinpath("Readme.txt").read_text())
+        # A fast-forward that would overwrite a modified file fails and leaves the repo alone
+        d2.git_command(cmd="checkout -q %s"%cs1)
+        d2.append_to_file(Path("Readme.txt"), FileContent("Local\n"))
+        self.assertIsNotNone(d2.git_repo.fast_forward(cs2))
+        self.assertEqual(d2.git_repo.get_cs("HEAD"), cs1)
+        self.assertIn("Local", d2.abspath.joinpath("Readme.txt").read_text())
+        # A file rewritten with its committed content (so only its stat information is stale) does not stop a fast-forward
+        readme = d2.abspath.joinpath("Readme.txt")
+        readme.write_text(d2.git_command(cmd="show %s:Readme.txt"%cs1))
+        mtime = readme.stat().st_mtime + 10
+        os.utime(readme, (mtime, mtime))
+        self.assertIsNone(d2.git_repo.fast_forward(cs2))
+        self.assertEqual(d2.git_repo.get_cs("HEAD"), cs2)
+        fs.cleanup()
+        pass
+    pass
+
+#c LazyRepositoryUnitTest
+class LazyRepositoryUnitTest(TestCase):
+    #c CommandCounter
+    class CommandCounter(lib.os_command.OSCommand.Observer):
+        count = 0
+        def command_started(self, cmd:lib.os_command.OSCommand) -> None:
+            self.count += 1
+            pass
+        pass
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_lazy(self) -> None:
+        fs = FileSystem(log=self._logger)
+        d1 = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        d2 = GitRepository(name="one_clone", fs=fs, log=self._logger).git_clone(clone=d1.abspath, branch_name="WIP")
+        counter = self.CommandCounter()
+        lib.os_command.OSCommand.add_observer(counter)
+        try:
+            repo = LazyGitRepo(path=d2.abspath, log=self._logger)
+            self.assertEqual(counter.count, 0)
+            self.assertEqual(repo.path(), d2.git_repo.path())
+            self.assertFalse(repo.is_resolved())
+            self.assertEqual(counter.count, 0)
+            self.assertEqual(repo.get_git_url_string(), d2.git_repo.get_git_url_string())
+            self.assertTrue(repo.is_resolved())
+            self.assertGreater(counter.count, 0)
+            upstream = repo.get_upstream()
+            assert upstream is not None
+            self.assertEqual(upstream.get_branch(), "master")
+            pass
+        finally:
+            lib.os_command.OSCommand.remove_observer(counter)
+            pass
+        self.assertRaises(PathError, LazyGitRepo, path=fs.abspath(Path("missing")), log=self._logger)
+        fs.cleanup()
+        pass
+    pass
+
 #a Toplevel
 #f Create tests
-test_suite = [RepoUnitTest]
+test_suite = [RepoUnitTest, WorktreeUnitTest, ShallowCloneUnitTest, FetchUnitTest, BundleUnitTest, FastForwardUnitTest, LazyRepositoryUnitTest]
 
 
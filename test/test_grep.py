@@ -0,0 +1,92 @@
+#a Imports
+import io
+from pathlib import Path
+
+from lib.exceptions import *
+from lib.log import Log
+from lib.grep import GripGrep, GrepSource
+
+from .test_lib.filesystem import FileSystem, FileContent
+from .test_lib.unittest import TestCase
+from .test_lib.git import Repository as GitRepository
+
+from typing import List, Tuple, Optional
+
+#a Unittest for GripGrep class
+class GrepUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f make_sources - create repositories with a file of five numbered lines, the first and last of which match 'found'
+    def make_sources(self, fs:FileSystem, state:bool=False) -> List[GrepSource]:
+        sources = []
+        for name in ["one", "two", "three"]:
+            d = GitRepository(name=name, fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+            d.create_file(Path("numbers.txt"), content=FileContent("found 1\n2\n3\n4\nfound 5\n"))
+            d.git_command(cmd="add numbers.txt")
+            d.git_command(cmd="commit -m numbers")
+            changeset = d.git_repo.get_cs() if state else None
+            sources.append(GrepSource(name=name, path=d.abspath, prefix="top/%s/"%name, changeset=changeset))
+            pass
+        return sources
+    #f grep - search the sources for 'found' and return the output lines and number of results
+    def grep(self, sources:List[GrepSource], grep_options:List[str]=[], limit:Optional[int]=None, log:Optional[Log]=None) -> Tuple[List[str], int]:
+        output = io.StringIO()
+        grep = GripGrep(patterns=["found"], grep_options=grep_options, pathspecs=["numbers.txt"], limit=limit, log=log, output=output)
+        for s in sources: grep.add_source(s)
+        self.assertEqual(grep.search(jobs=1), [])
+        return (output.getvalue().rstrip("\n").split("\n"), grep.num_results)
+    #f test_prefix
+    def test_prefix(self) -> None:
+        fs = FileSystem(log=self._logger)
+        for state in [False, True]:
+            sources = self.make_sources(fs, state=state)
+            self.assertEqual(self.grep(sources),
+                             (["top/%s/numbers.txt:%s"%(n,l) for n in ["one","two","three"] for l in ["1:found 1", "5:found 5"]], 6))
+            self.assertEqual(self.grep(sources, grep_options=["-l"]),
+                             (["top/%s/numbers.txt"%(n) for n in ["one","two","three"]], 3))
+            fs.cleanup()
+            fs = FileSystem(log=self._logger)
+            pass
+        fs.cleanup()
+        pass
+    #f test_context
+    def test_context(self) -> None:
+        fs = FileSystem(log=self._logger)
+        for state in [False, True]:
+            sources = self.make_sources(fs, state=state)
+            self.assertEqual(self.grep(sources[:1], grep_options=["-A1"]),
+                             (["top/one/numbers.txt:1:found 1", "top/one/numbers.txt-2-2", "--", "top/one/numbers.txt:5:found 5"], 2))
+            fs.cleanup()
+            fs = FileSystem(log=self._logger)
+            pass
+        fs.cleanup()
+        pass
+    #f test_limit
+    def test_limit(self) -> None:
+        fs = FileSystem(log=self._logger)
+        sources = self.make_sources(fs)
+        log = Log()
+        self.assertEqual(self.grep(sources, grep_options=["-C1"], limit=2, log=log),
+                         (["top/one/numbers.txt:1:found 1", "top/one/numbers.txt-2-2", "--", "top/one/numbers.txt-4-4", "top/one/numbers.txt:5:found 5"], 2))
+        f = io.StringIO()
+        log.dump(f)
+        self.assertEqual(f.getvalue().count("OS command 'git grep"), 1)
+        fs.cleanup()
+        pass
+    #f test_no_pattern
+    def test_no_pattern(self) -> None:
+        self.assertRaises(UserError, GripGrep, patterns=[])
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [GrepUnitTest]
@@ -209,6 +209,17 @@ class TestUnconfigured(TestSet):
             pass
         initial_exception_expected = RepoDescError
         pass
+    class BadUnselectedConfig(Test):
+        """
+        Configurations other than the default are only built when selected
+        """
+        class ConfigToml(DefaultConfigToml):
+            configs=["x","y"]
+            config={"y":{"repos":["undefined_repo"]}}
+            pass
+        grd_assert = {"config_names":["x","y"], "configs":{"x":{"name":"x"}}}
+        config_name = "y"
+        pass
     pass
 
 #c TestConfigured
@@ -416,10 +427,55 @@ class TestStages(TestSet):
         pass
     pass
 
+#c TestPartialClone
+class PartialCloneToml(Toml):
+    name="y"
+    workflow="readonly"
+    default_config="x"
+    configs=["x","y"]
+    base_repos=["fred"]
+    env={"FILTER":"blob:none", "SRC":"src"}
+    repo:Dict[str,Any]={}
+    repo={"fred":{"url":'ssh://me@there/path/to/thing.git', "filter":"@FILTER@", "sparse":["@SRC@/lib/", "doc"]},
+          }
+    config = {"x":{},
+              "y":{"fred":{"filter":"tree:0"}},
+    }
+    pass
+class TestPartialClone(TestSet):
+    """
+    Repos may have a partial clone filter and sparse checkout directories, which are resolved using the environment
+    """
+    class Test(TestBase):
+        class ConfigToml(PartialCloneToml): pass
+        config_name : Union [None, bool, str] = "x"
+        pass
+    class Filter(Test):
+        cfg_assert : Asserts = {"repos":{"fred":{"filter":"blob:none", "sparse":["src/lib", "doc"]}}}
+        pass
+    class FilterInConfig(Test):
+        config_name = "y"
+        cfg_assert : Asserts = {"repos":{"fred":{"filter":"tree:0", "sparse":["src/lib", "doc"]}}}
+        pass
+    class BadFilter(Test):
+        class ConfigToml(PartialCloneToml):
+            env={"FILTER":"blob:some"}
+            pass
+        initial_exception_expected = GripTomlError
+        pass
+    class BadSparse(Test):
+        class ConfigToml(PartialCloneToml):
+            env={"FILTER":"blob:none", "SRC":"src/*"}
+            pass
+        initial_exception_expected = GripTomlError
+        pass
+    pass
+
 #a Toplevel
 #f Create tests
 TestUnconfigured._create_test_fns_of_class(TestUnconfigured.Test)
 TestConfigured._create_test_fns_of_class(TestConfigured.Test)
 TestConfiguredSubrepos._create_test_fns_of_class(TestConfiguredSubrepos.Test)
 TestStages._create_test_fns_of_class(TestStages.Test)
-test_suite = [TestUnconfigured, TestConfigured, TestConfiguredSubrepos, TestStages]
+TestPartialClone._create_test_fns_of_class(TestPartialClone.Test)
+test_suite = [TestUnconfigured, TestConfigured, TestConfiguredSubrepos, TestStages, TestPartialClone]
@@ -0,0 +1,121 @@
+#a Imports
+import io
+import threading
+from pathlib import Path
+
+from lib.log import Log
+from lib.base import GripBase
+from lib.options import Options
+from lib.os_command import OSCommand
+
+from .test_lib.filesystem import FileSystem
+from .test_lib.git import Repository as GitRepository
+from .test_lib.unittest import TestCase
+
+from typing import List
+
+#a Unittest for Log class
+class LogUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f dump_lines
+    def dump_lines(self, log:Log) -> List[str]:
+        f = io.StringIO()
+        log.dump(f)
+        return f.getvalue().rstrip("\n").split("\n")
+    #f test_ring_bound
+    def test_ring_bound(self) -> None:
+        log = Log(max_entries=3)
+        for i in range(5):
+            log.add_entry_string("entry %d"%i)
+            pass
+        self.assertEqual(len(log.entries), 3)
+        self.assertEqual(self.dump_lines(log), ["... 2 earlier log entries dropped from memory", "entry 2", "entry 3", "entry 4"])
+        log.reset()
+        self.assertEqual(log.dropped_entries, 0)
+        pass
+    #f test_sink
+    def test_sink(self) -> None:
+        log = Log(max_entries=2)
+        log.add_entry_string("before sink")
+        sink = io.StringIO()
+        log.set_sink(sink, replay=True)
+        for i in range(3):
+            log.add_entry_string("entry %d"%i)
+            pass
+        self.assertEqual(sink.getvalue().split("\n"), ["before sink", "entry 0", "entry 1", "entry 2", ""])
+        self.assertEqual(self.dump_lines(log), ["... 2 earlier log entries dropped from memory", "entry 1", "entry 2"])
+        pass
+    #f test_output_limits
+    def test_output_limits(self) -> None:
+        log = Log()
+        log.set_output_limits(head_lines=2, tail_lines=1)
+        OSCommand(cmd="seq 0 9", log=log).run()
+        dump = "\n".join(self.dump_lines(log))
+        self.assertIn("Stdout: 0\\n1\\n...<7 lines omitted>...\\n9", dump)
+        log.set_output_limits(head_lines=20, tail_lines=0)
+        OSCommand(cmd="seq 0 9", log=log).run()
+        dump = "\n".join(self.dump_lines(log))
+        self.assertIn("Stdout: %s"%("\\n".join([str(i) for i in range(10)])), dump)
+        pass
+    #f test_concurrent_entries
+    def test_concurrent_entries(self) -> None:
+        log = Log(max_entries=1000)
+        sink = io.StringIO()
+        log.set_sink(sink)
+        def add_entries(t:int) -> None:
+            for i in range(50):
+                log.add_entry_string("thread %d entry %d\nthread %d entry %d continued"%(t,i,t,i))
+                pass
+            pass
+        threads = [threading.Thread(target=add_entries, args=(t,)) for t in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        lines = sink.getvalue().rstrip("\n").split("\n")
+        self.assertEqual(len(lines), 8*50*2)
+        for i in range(0, len(lines), 2):
+            self.assertEqual(lines[i]+" continued", lines[i+1])
+            pass
+        self.assertEqual(len(log.entries), 8*50)
+        pass
+    #f test_rotate_logfile
+    def test_rotate_logfile(self) -> None:
+        fs = FileSystem(log=self._logger)
+        d = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        options = Options()
+        options._validate()
+        base = GripBase(options=options, log=self._logger, git_repo=d.git_repo)
+        base.grip_log_max_size = 10
+        base.grip_log_backups  = 2
+        path = d.abspath.joinpath("local.log")
+        def backup(i:int) -> Path:
+            return Path("%s.%d"%(str(path),i))
+        base.rotate_logfile(path)
+        self.assertFalse(path.exists())
+        path.write_text("short")
+        base.rotate_logfile(path)
+        self.assertEqual(path.read_text(), "short")
+        self.assertFalse(backup(1).exists())
+        for i in range(3):
+            path.write_text("log number %d"%i)
+            base.rotate_logfile(path)
+            self.assertFalse(path.exists())
+            self.assertEqual(backup(1).read_text(), "log number %d"%i)
+            pass
+        self.assertEqual(backup(2).read_text(), "log number 1")
+        self.assertFalse(backup(3).exists())
+        fs.cleanup()
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [LogUnitTest]
@@ -0,0 +1,90 @@
+#a Imports
+import threading
+from lib.metrics import Metrics, MetricsHistory, percentile
+from lib.os_command import OSCommand
+
+from .test_lib.unittest import TestCase
+
+from typing import List, Dict, Any
+
+#a Unittest for Metrics classes
+class MetricsUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f record
+    def record(self, command:str, duration:float, time:float=0, repos:Dict[str,float]={}) -> Dict[str,Any]:
+        return {"command":command, "duration":duration, "time":time, "repos":repos,
+                "subprocesses":{"git fetch":{"count":len(repos), "time":sum(repos.values())}}}
+    def test_percentile(self) -> None:
+        self.assertEqual(percentile([],0.5),0.0)
+        self.assertEqual(percentile([3.0],0.95),3.0)
+        values = [float(i) for i in range(1,101)]
+        self.assertEqual(percentile(values,0.5),50.0)
+        self.assertEqual(percentile(values,0.95),95.0)
+        pass
+    def test_subprocess_name(self) -> None:
+        self.assertEqual(Metrics.subprocess_name("git fetch"),"git fetch")
+        self.assertEqual(Metrics.subprocess_name("git -C a/b rev-parse HEAD"),"git rev-parse")
+        self.assertEqual(Metrics.subprocess_name("git --no-pager log"),"git log")
+        self.assertEqual(Metrics.subprocess_name("/usr/bin/make -j4"),"make")
+        pass
+    def test_observe(self) -> None:
+        m = Metrics()
+        m.start(command="test")
+        with m.phase("run"):
+            OSCommand(cmd="true", cwd=".").run()
+            OSCommand(cmd="true", cwd=".").run()
+            pass
+        m.stop(0)
+        OSCommand(cmd="true").run()
+        d = m.as_dict()
+        self.assertEqual(d["command"],"test")
+        self.assertEqual(d["rc"],0)
+        self.assertEqual(d["subprocesses"]["true"]["count"],2)
+        self.assertIn("run",d["phases"])
+        self.assertIn(".",d["repos"])
+        pass
+    def test_observe_threads(self) -> None:
+        m = Metrics()
+        commands = [OSCommand(cmd="git status", cwd="repo%d"%(i%4)) for i in range(8)]
+        def observe(cmd:OSCommand) -> None:
+            for i in range(1000):
+                m.command_started(cmd)
+                m.command_completed(cmd, 0.001)
+                pass
+            pass
+        threads = [threading.Thread(target=observe, args=(cmd,)) for cmd in commands]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        d = m.as_dict()
+        self.assertEqual(d["subprocesses"]["git status"]["count"],8000)
+        self.assertAlmostEqual(d["subprocesses"]["git status"]["time"],8.0,places=3)
+        self.assertEqual(sorted(d["repos"].keys()), ["repo0","repo1","repo2","repo3"])
+        for t in d["repos"].values(): self.assertAlmostEqual(t,2.0,places=3)
+        pass
+    def test_history(self) -> None:
+        h = MetricsHistory([self.record("fetch", 1.0, repos={"a":0.5, "b":0.25}),
+                            self.record("fetch", 3.0, repos={"a":2.0}),
+                            self.record("status", 0.5, time=86400*10, repos={"b":0.1}),
+                            ])
+        self.assertEqual(h.command_summary(), [("fetch",2,1.0,3.0), ("status",1,0.5,0.5)])
+        self.assertEqual([r[0] for r in h.slowest_repos()], ["a","b"])
+        self.assertEqual(h.slowest_repos(1)[0][1:3], (2,2.5))
+        self.assertEqual(h.subprocess_summary(), [("git fetch",4,2.85)])
+        self.assertEqual(len(h.select(command="fetch").records),2)
+        self.assertEqual(len(h.select(last=1).records),1)
+        self.assertEqual([t[1] for t in h.trend()], ["fetch","status"])
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [MetricsUnitTest]
@@ -0,0 +1,131 @@
+#a Imports
+import fcntl
+from pathlib import Path
+
+from lib.mirror import MirrorCache
+from lib.os_command import OSCommand
+from lib.git import Repository as GitRepo
+
+from .test_lib.filesystem import FileSystem, FileContent
+from .test_lib.unittest import TestCase
+from .test_lib.git import Repository as GitRepository
+
+from typing import Tuple
+
+#a Unittest for MirrorCache class
+class MirrorCacheUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f make_origin - create a file system with an origin repository and a mirror cache within it
+    def make_origin(self, dissociate:bool=False) -> Tuple[FileSystem, GitRepository, MirrorCache]:
+        fs = FileSystem(log=self._logger)
+        origin = GitRepository(name="origin", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        cache = MirrorCache(root=fs.abspath(Path("mirrors")), dissociate=dissociate, log=self._logger)
+        return (fs, origin, cache)
+    #f mirror_git - run a git command in a mirror and get its output
+    def mirror_git(self, mirror:Path, cmd:str) -> str:
+        return OSCommand(cmd="git --git-dir %s %s"%(str(mirror), cmd)).run().stdout().strip()
+    #f is_locked - determine if a lock could not be taken on a mirror without blocking
+    def is_locked(self, mirror:Path, exclusive:bool) -> bool:
+        with open(str(mirror)+".lock", "a") as f:
+            try:
+                fcntl.flock(f.fileno(), (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+                pass
+            except BlockingIOError:
+                return True
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            pass
+        return False
+    #f test_create_and_update
+    def test_create_and_update(self) -> None:
+        (fs, origin, cache) = self.make_origin()
+        url = str(origin.abspath)
+        mirror = cache.update(url, url)
+        assert mirror is not None
+        self.assertEqual(mirror, cache.mirror_path(url))
+        self.assertTrue(mirror.is_dir())
+        self.assertFalse(Path(str(mirror)+".partial").exists())
+        self.assertEqual(self.mirror_git(mirror, "config gc.auto"), "0")
+        self.assertEqual(self.mirror_git(mirror, "config gc.pruneExpire"), "never")
+        self.assertEqual(self.mirror_git(mirror, "rev-parse master"), origin.git_repo.get_cs("HEAD"))
+        origin.append_to_file(Path("Readme.txt"), FileContent("More\n"))
+        origin.git_command(cmd="commit -m More -a")
+        self.assertEqual(cache.update(url, url), mirror)
+        self.assertEqual(self.mirror_git(mirror, "rev-parse master"), origin.git_repo.get_cs("HEAD"))
+        fs.cleanup()
+        pass
+    #f test_create_failure
+    def test_create_failure(self) -> None:
+        (fs, origin, cache) = self.make_origin()
+        url = str(fs.abspath(Path("not_a_repo")))
+        self.assertIsNone(cache.update(url, url))
+        self.assertFalse(cache.mirror_path(url).exists())
+        self.assertFalse(Path(str(cache.mirror_path(url))+".partial").exists())
+        fs.cleanup()
+        pass
+    #f test_reference_lock
+    def test_reference_lock(self) -> None:
+        (fs, origin, cache) = self.make_origin()
+        url = str(origin.abspath)
+        with cache.reference(url, url) as mirror:
+            assert mirror is not None
+            self.assertTrue(self.is_locked(mirror, exclusive=True))
+            self.assertFalse(self.is_locked(mirror, exclusive=False))
+            pass
+        self.assertFalse(self.is_locked(mirror, exclusive=True))
+        with cache.lock(mirror, exclusive=True):
+            self.assertTrue(self.is_locked(mirror, exclusive=False))
+            pass
+        fs.cleanup()
+        pass
+    #f test_clone_with_reference
+    def test_clone_with_reference(self) -> None:
+        for dissociate in [False, True]:
+            (fs, origin, cache) = self.make_origin(dissociate=dissociate)
+            url = str(origin.abspath)
+            clone = GitRepo.clone(repo_url=url, new_branch_name="WIP", dest=fs.abspath(Path("clone")), log=self._logger, mirrors=cache)
+            self.assertEqual(clone.get_cs("HEAD"), origin.git_repo.get_cs("HEAD"))
+            alternates = fs.abspath(Path("clone/.git/objects/info/alternates"))
+            if dissociate:
+                self.assertFalse(alternates.exists())
+                pass
+            else:
+                self.assertIn(str(cache.mirror_path(url)), alternates.read_text())
+                pass
+            fs.cleanup()
+            pass
+        pass
+    #f test_shallow_clone_with_reference
+    def test_shallow_clone_with_reference(self) -> None:
+        for dissociate in [False, True]:
+            (fs, origin, cache) = self.make_origin(dissociate=dissociate)
+            url = str(origin.abspath)
+            cs = origin.git_repo.get_cs("HEAD")
+            origin.append_to_file(Path("Readme.txt"), FileContent("More\n"))
+            origin.git_command(cmd="commit -m More -a")
+            clone = GitRepo.clone(repo_url=url, new_branch_name="WIP", dest=fs.abspath(Path("clone")), depth=1, changeset=cs, log=self._logger, mirrors=cache)
+            self.assertEqual(clone.get_cs("HEAD"), cs)
+            alternates = fs.abspath(Path("clone/.git/objects/info/alternates"))
+            if dissociate:
+                self.assertFalse(alternates.exists())
+                self.assertEqual(OSCommand(cmd="git fsck --connectivity-only", cwd=str(fs.abspath(Path("clone")))).run().rc(), 0)
+                pass
+            else:
+                self.assertIn(str(cache.mirror_path(url)), alternates.read_text())
+                pass
+            fs.cleanup()
+            pass
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [MirrorCacheUnitTest]
@@ -0,0 +1,161 @@
+#a Imports
+import time, signal, threading
+from lib.os_command import OSCommand, Cancellation
+import io
+from lib.progress import GitProgressParser, ProgressEvent, ProgressDisplay
+from lib.parallel import ParallelJobs
+
+from typing import List, Tuple
+
+from .test_lib.unittest import TestCase
+
+#a Unittest for OSCommand class
+class OSCommandUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_argv(self) -> None:
+        cmd = OSCommand(cmd=["echo", "a b", "'c'"]).run()
+        self.assertEqual(cmd.stdout(), "a b 'c'\n")
+        self.assertEqual(cmd.rc(), 0)
+        cmd = OSCommand(cmd=["cat"], input_data="some input").run()
+        self.assertEqual(cmd.stdout(), "some input")
+        pass
+    def test_output_string(self) -> None:
+        cmd = OSCommand(cmd="")
+        s = "\n".join([str(i) for i in range(10)])
+        self.assertEqual(cmd.output_string(s, head_lines=20), s.replace("\n","\\n"))
+        self.assertEqual(cmd.output_string(s, head_lines=2, tail_lines=1), "0\\n1\\n...<7 lines omitted>...\\n9")
+        pass
+    def test_command_timeout(self) -> None:
+        start = time.monotonic()
+        cmd = OSCommand(cmd="sleep 10 & sleep 10", timeout=0.2)
+        self.assertRaises(OSCommand.Timeout, cmd.run)
+        self.assertLess(time.monotonic()-start, 5)
+        self.assertIsNotNone(cmd.timed_out)
+        pass
+    def test_cancellation(self) -> None:
+        cancellation = Cancellation(timeout=0.2)
+        start = time.monotonic()
+        self.assertRaises(OSCommand.Timeout, OSCommand(cmd=["sleep", "10"], cancellation=cancellation).run)
+        self.assertLess(time.monotonic()-start, 5)
+        cmd = OSCommand(cmd=["true"], cancellation=cancellation)
+        self.assertRaises(OSCommand.Timeout, cmd.run)
+        self.assertEqual(cmd.timed_out, "operation deadline passed")
+        cancellation = Cancellation(cancellable=True)
+        cancellation.cancel()
+        self.assertRaises(OSCommand.Timeout, OSCommand(cmd=["true"], cancellation=cancellation).run)
+        self.assertEqual(OSCommand(cmd=["true"], cancellation=Cancellation()).run().rc(), 0)
+        pass
+    def test_streaming(self) -> None:
+        lines : List[Tuple[str,str]] = []
+        def line_callback(stream:str, line:str) -> None:
+            lines.append((stream,line))
+            pass
+        cmd = OSCommand(cmd=["sh", "-c", "printf 'a\\rb\\nc\\n'; echo error >&2; printf d"], line_callback=line_callback, tail_lines=2).run()
+        self.assertEqual([l for (s,l) in lines if s=="stdout"], ["a","b","c","d"])
+        self.assertEqual([l for (s,l) in lines if s=="stderr"], ["error"])
+        self.assertEqual(cmd.stdout(), "c\nd\n")
+        self.assertEqual(cmd.stderr(), "error\n")
+        cmd = OSCommand(cmd=["cat"], input_data="x\n"*100000, line_callback=line_callback).run()
+        self.assertEqual(len(cmd.stdout().split()), OSCommand.default_tail_lines)
+        pass
+    def test_stdout_fn(self) -> None:
+        lines : List[bytes] = []
+        cmd = OSCommand(cmd=["seq", "1", "1000"], stdout_fn=lambda f:lines.extend(f.readlines())).run()
+        self.assertEqual((cmd.rc(), cmd.stdout(), len(lines)), (0, "", 1000))
+        start = time.monotonic()
+        cmd = OSCommand(cmd="echo started; sleep 10", stdout_fn=lambda f:lines.extend(f.readlines()), timeout=0.2)
+        self.assertRaises(OSCommand.Timeout, cmd.run)
+        self.assertLess(time.monotonic()-start, 5)
+        self.assertEqual(lines[-1], b"started\n")
+        pass
+    def test_progress_parser(self) -> None:
+        events : List[ProgressEvent] = []
+        p = GitProgressParser(events.append, repo="r")
+        p.line_callback("stderr", "Receiving objects:  45% (450/1000), 1.20 MiB | 2.00 MiB/s")
+        p.line_callback("stderr", "remote: Enumerating objects: 12, done.")
+        p.line_callback("stderr", "From host:path/repo")
+        p.line_callback("stdout", "Resolving deltas: 100% (5/5), done.")
+        p.done()
+        self.assertEqual(len(events), 3)
+        self.assertEqual((events[0].phase, events[0].percent, events[0].current, events[0].total), ("Receiving objects", 45, 450, 1000))
+        self.assertEqual((events[0].transferred, events[0].rate), ("1.20 MiB", "2.00 MiB/s"))
+        self.assertEqual((events[1].phase, events[1].percent, events[1].current), ("Enumerating objects", None, 12))
+        self.assertTrue(events[2].done)
+        pass
+    def test_progress_display(self) -> None:
+        f = io.StringIO()
+        display = ProgressDisplay(file=f, min_interval=0.0)
+        display.reporter("a")(ProgressEvent(phase="Receiving objects", percent=10))
+        display.reporter("b")(ProgressEvent(phase="Resolving deltas", current=3))
+        self.assertTrue(f.getvalue().endswith("\ra: Receiving objects 10% | b: Resolving deltas 3\033[K"))
+        display.finish()
+        self.assertEqual(display.active, {})
+        self.assertTrue(f.getvalue().endswith("\r\033[K"))
+        pass
+    pass
+
+#a Unittest for ParallelJobs class
+class ParallelJobsUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_results_in_order(self) -> None:
+        parallel : ParallelJobs[int,str] = ParallelJobs(jobs=4)
+        results = parallel.run(lambda i:OSCommand(cmd="sleep 0.%d; echo %d"%(9-i, i)).run().stdout().strip(), list(range(8)))
+        self.assertEqual([r.result for r in results], [str(i) for i in range(8)])
+        self.assertTrue(all([r.is_ok() for r in results]))
+        pass
+    def test_fail_fast(self) -> None:
+        parallel : ParallelJobs[int,int] = ParallelJobs(jobs=2, fail_fast=True)
+        def job(i:int) -> int:
+            if i==0: raise Exception("Job failed")
+            return OSCommand(cmd=["sleep", "10"], cancellation=parallel.cancellation).run().rc()
+        start = time.monotonic()
+        results = parallel.run(job, list(range(6)))
+        self.assertLess(time.monotonic()-start, 5)
+        self.assertIsNotNone(results[0].exception)
+        self.assertFalse(any([r.is_ok() for r in results]))
+        self.assertTrue(results[5].cancelled)
+        pass
+    def test_armed(self) -> None:
+        self.assertFalse(ParallelJobs(jobs=2).cancellation.is_armed())
+        self.assertTrue(ParallelJobs(jobs=2, fail_fast=True).cancellation.is_armed())
+        self.assertTrue(ParallelJobs(jobs=2, cancellable=True).cancellation.is_armed())
+        self.assertTrue(ParallelJobs(jobs=2, cancellation=Cancellation(timeout=10)).cancellation.is_armed())
+        pass
+    def test_interrupt(self) -> None:
+        def interrupt() -> None:
+            signal.pthread_kill(threading.main_thread().ident or 0, signal.SIGINT)
+            pass
+        for jobs in [1, 2]:
+            parallel : ParallelJobs[int,int] = ParallelJobs(jobs=jobs, cancellable=True)
+            def job(i:int) -> int:
+                return OSCommand(cmd=["sleep", "10"], cancellation=parallel.cancellation).run().rc()
+            start = time.monotonic()
+            threading.Timer(0.2, interrupt).start()
+            self.assertRaises(KeyboardInterrupt, parallel.run, job, list(range(4)))
+            self.assertLess(time.monotonic()-start, 5)
+            self.assertTrue(parallel.cancellation.is_cancelled())
+            pass
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [OSCommandUnitTest, ParallelJobsUnitTest]
@@ -0,0 +1,105 @@
+#a Imports
+import threading
+from pathlib import Path
+
+from lib.configstate import GripConfigStateInitial # imports lib.repo, which must not be imported first
+from lib.repo import Repository
+
+from .test_lib.unittest import TestCase
+from .bench_repo_tree import StubGitRepo, StubWorkflow, StubToplevel
+
+from typing import List, Tuple, Set
+
+#a Unittest for Repository.walk_parallel
+class WalkParallelUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f make_tree - create a tree of a root with subrepos 'a' (with subrepos 'a1' and 'a2') and 'b'
+    def make_tree(self) -> Repository:
+        toplevel = StubToplevel()
+        root = Path("/grip")
+        def repo(name:str, parent:Repository) -> Repository:
+            return Repository(name=name, grip_repo=toplevel, parent=parent, git_repo=StubGitRepo(root.joinpath(name)), workflow=StubWorkflow) # type: ignore
+        tree = Repository(name="<toplevel>", grip_repo=toplevel, parent=None, git_repo=StubGitRepo(root), workflow=StubWorkflow) # type: ignore
+        a = repo("a", tree)
+        repo("a1", a)
+        repo("a2", a)
+        repo("b", tree)
+        return tree
+    #f walk - walk the tree with a function that fails for some repos (returning False) and raises an exception for others
+    def walk(self, post_order:bool, fail:Set[str]=set(), broken:Set[str]=set()) -> Tuple[List[str], List[Tuple[str,str]]]:
+        """
+        Return the names of the repos visited, in order, and the names of those reported with the reasons
+        """
+        visited : List[str] = []
+        lock = threading.Lock()
+        def fn(r:Repository) -> bool:
+            with lock: visited.append(r.name)
+            if r.name in broken: raise Exception("repo %s is broken"%r.name)
+            return r.name not in fail
+        failures = self.make_tree().walk_parallel(fn, jobs=4, post_order=post_order)
+        return (visited, [(r.name, reason) for (r, reason) in failures])
+    #f assertBefore - assert that every one of a list of names was visited before every one of another
+    def assertBefore(self, visited:List[str], first:List[str], then:List[str]) -> None:
+        for f in first:
+            for t in then:
+                self.assertLess(visited.index(f), visited.index(t), "%s visited before %s"%(f, t))
+                pass
+            pass
+        pass
+    #f test_post_order
+    def test_post_order(self) -> None:
+        (visited, failures) = self.walk(post_order=True)
+        self.assertEqual(sorted(visited), ["<toplevel>", "a", "a1", "a2", "b"])
+        self.assertBefore(visited, ["a1", "a2"], ["a", "b"])
+        self.assertBefore(visited, ["a", "b"], ["<toplevel>"])
+        self.assertEqual(failures, [])
+        pass
+    #f test_pre_order
+    def test_pre_order(self) -> None:
+        (visited, failures) = self.walk(post_order=False)
+        self.assertEqual(sorted(visited), ["<toplevel>", "a", "a1", "a2", "b"])
+        self.assertBefore(visited, ["<toplevel>"], ["a", "b"])
+        self.assertBefore(visited, ["a", "b"], ["a1", "a2"])
+        self.assertEqual(failures, [])
+        pass
+    #f test_post_order_failure - the parent of a failing subrepo is not visited, but the others are
+    def test_post_order_failure(self) -> None:
+        (visited, failures) = self.walk(post_order=True, fail={"a1"})
+        self.assertEqual(sorted(visited), ["a1", "a2", "b"])
+        self.assertEqual(failures, [("a1", "failed"),
+                                    ("a", "not attempted as repo 'a1' failed"),
+                                    ("<toplevel>", "not attempted as repo 'a' failed")])
+        (visited, failures) = self.walk(post_order=True, broken={"b"})
+        self.assertEqual(sorted(visited), ["a", "a1", "a2", "b"])
+        self.assertEqual(failures, [("b", "repo b is broken"),
+                                    ("<toplevel>", "not attempted as repo 'b' failed")])
+        pass
+    #f test_pre_order_failure - the subrepos of a failing parent are not visited, but the others are
+    def test_pre_order_failure(self) -> None:
+        (visited, failures) = self.walk(post_order=False, broken={"a"})
+        self.assertEqual(sorted(visited), ["<toplevel>", "a", "b"])
+        self.assertEqual(failures, [("a", "repo a is broken"),
+                                    ("a1", "not attempted as repo 'a' failed"),
+                                    ("a2", "not attempted as repo 'a' failed")])
+        (visited, failures) = self.walk(post_order=False, fail={"<toplevel>"})
+        self.assertEqual(visited, ["<toplevel>"])
+        self.assertEqual(failures, [("<toplevel>", "failed"),
+                                    ("a", "not attempted as repo '<toplevel>' failed"),
+                                    ("b", "not attempted as repo '<toplevel>' failed"),
+                                    ("a1", "not attempted as repo 'a' failed"),
+                                    ("a2", "not attempted as repo 'a' failed")])
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [WalkParallelUnitTest]
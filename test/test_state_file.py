@@ -1,9 +1,14 @@
 #a Unittest for GripRepoState class
 from pathlib import Path
 
+import os
 from lib.configstate import StateFile
+from lib.base import GripBase
+from lib.options import Options
 
 from .test_lib.grip import GripBaseTest
+from .test_lib.filesystem import FileSystem
+from .test_lib.git import Repository as GitRepository
 from .test_lib.unittest import UnitTestObject, AKV
 from .test_lib.unittest import TestCase
 
@@ -89,6 +94,37 @@ class GripRepoStateUnitTest12(GripRepoStateUnitTestComplex):
     }}}}
     pass
 
+class WriteIfChangedUnitTest(TestCase):
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    def test_write_if_changed(self) -> None:
+        fs = FileSystem(log=self._logger)
+        d = GitRepository(name="one", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        options = Options()
+        options._validate()
+        base = GripBase(options=options, log=self._logger, git_repo=d.git_repo)
+        path = d.abspath.joinpath("state.toml")
+        base.toml_save(path, {"cfga":{"repo1":{"changeset":"1"}}})
+        self.assertEqual(base.toml_load(path), {"cfga":{"repo1":{"changeset":"1"}}})
+        os.utime(path, ns=(0,0))
+        base.toml_save(path, {"cfga":{"repo1":{"changeset":"1"}}})
+        self.assertEqual(path.stat().st_mtime_ns, 0)
+        self.assertEqual(base.writes_skipped, 1)
+        self.assertTrue(base.write_if_changed(path, "changed\n"))
+        self.assertEqual(path.read_text(), "changed\n")
+        self.assertEqual([p.name for p in d.abspath.iterdir() if p.name.endswith(".tmp")], [])
+        fs.cleanup()
+        pass
+    pass
+
 #a Toplevel
 #f Create tests
-test_suite = [GripRepoStateUnitTestComplex]
+test_suite = [GripRepoStateUnitTestComplex, WriteIfChangedUnitTest]
@@ -0,0 +1,218 @@
+#a Imports
+from pathlib import Path
+
+from lib.exceptions import *
+from lib.options import Options
+from lib.os_command import OSCommand
+from lib.grip import Toplevel
+
+from .test_lib.filesystem import FileSystem, FileContent
+from .test_lib.unittest import TestCase
+from .test_lib.git import Repository as GitRepository
+from .test_lib.grip import grip_exec
+
+from typing import Dict, List, Tuple, Optional
+
+#a Useful functions
+#f toml_list - a list of strings as toml
+def toml_list(l:List[str]) -> str:
+    return "[%s]"%(", ".join(['"%s"'%x for x in l]))
+
+#a Unittest for Toplevel operations on a grip repository with subrepos
+class ToplevelUnitTest(TestCase):
+    subrepo_names = ["s1", "s2"]
+    #f setUpClass - invoked for all tests to use
+    @classmethod
+    def setUpClass(cls) -> None:
+        TestCase.setUpSubClass(cls)
+        pass
+    #f tearDownClass - invoked when all tests completed
+    @classmethod
+    def tearDownClass(cls) -> None:
+        TestCase.tearDownSubClass(cls)
+        pass
+    #f state_toml - the content of a state.toml for the subrepos at changesets
+    def state_toml(self, changesets:Dict[str,str]) -> FileContent:
+        return FileContent("\n".join(['[cfg.%s]\nchangeset = "%s"\n'%(n, cs) for (n, cs) in changesets.items()]))
+    #f commit - add a commit to a repository, returning its changeset
+    def commit(self, repo:GitRepository, text:str="More\n") -> str:
+        repo.append_to_file(Path("Readme.txt"), FileContent(text))
+        repo.git_command(cmd="commit -m More -a")
+        return repo.git_repo.get_cs()
+    #f grip_toml - the content of a grip.toml of the subrepos, with the stages of each subrepo given as toml lines
+    def grip_toml(self, workflow:str, origins:Dict[str,GitRepository], stages:List[str]=[], repo_stages:Dict[str,str]={}) -> FileContent:
+        grip_toml = 'name="test_grip"\nworkflow="%s"\ndefault_config="cfg"\nconfigs=["cfg"]\nbase_repos=%s\nstages=%s\n'%(workflow, toml_list(self.subrepo_names), toml_list(stages))
+        for n in self.subrepo_names:
+            grip_toml += '[repo.%s]\nurl="%s"\npath="%s"\n%s'%(n, str(origins[n].abspath), n, repo_stages.get(n,""))
+            pass
+        return FileContent(grip_toml)
+    #f make_tree - create origins of subrepos and a grip repository of them, and check the grip repository out as 'main'
+    def make_tree(self, fs:FileSystem, workflow:str, stages:List[str]=[], repo_stages:Dict[str,str]={}) -> Tuple[GitRepository, Dict[str,GitRepository]]:
+        """
+        The origins accept pushes to their checked-out branch, so a 'single' workflow can publish to them;
+        the grip repository ignores the subrepos and the local grip files, so it is unmodified once checked out
+        """
+        origins = {}
+        for n in self.subrepo_names:
+            origins[n] = GitRepository(name="%s_origin"%n, fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+            self.commit(origins[n], text="%s\n"%n)
+            pass
+        grip = GitRepository(name="grip_origin", fs=fs, log=self._logger).git_init(GitRepository.add_readme)
+        grip.make_dir(Path(".grip"))
+        grip.create_file(Path(".grip/grip.toml"), content=self.grip_toml(workflow, origins, stages, repo_stages))
+        grip.create_file(Path(".grip/state.toml"), content=self.state_toml({n:r.git_repo.get_cs() for (n,r) in origins.items()}))
+        grip.create_file(Path(".gitignore"), content=FileContent("".join(["/%s/\n"%n for n in self.subrepo_names]+["/.grip/local.*\n"])))
+        grip.git_command(cmd="add .gitignore .grip")
+        grip.git_command(cmd="commit -m Grip")
+        for r in list(origins.values()) + [grip]:
+            r.git_command(cmd="config receive.denyCurrentBranch updateInstead")
+            pass
+        os_cmd = OSCommand(cmd="%s checkout %s main"%(grip_exec, str(grip.abspath)), cwd=str(fs.path), log=self._logger).run()
+        self.assertEqual(os_cmd.rc(), 0, str(os_cmd))
+        return (grip, origins)
+    #f toplevel - create a Toplevel of the 'main' grip repository
+    def toplevel(self, fs:FileSystem, options:Optional[Options]=None) -> Toplevel:
+        if options is None: options = Options()
+        options.quiet = True
+        options._validate()
+        return Toplevel(options=options, log=self._logger, path=fs.abspath(Path("main")))
+    #f main_git - run a git command in a subrepo of 'main' (or in the grip repository itself) and get its output
+    def main_git(self, fs:FileSystem, cmd:str, name:str="") -> str:
+        os_cmd = OSCommand(cmd="git %s"%cmd, cwd=str(fs.abspath(Path("main").joinpath(name))), log=self._logger).run()
+        self.assertEqual(os_cmd.rc(), 0, str(os_cmd))
+        return os_cmd.stdout().strip()
+    #f main_cs - get the changeset of a subrepo of 'main' (or of the grip repository itself)
+    def main_cs(self, fs:FileSystem, name:str="") -> str:
+        return self.main_git(fs, "rev-parse HEAD", name)
+    #f main_commit - add a commit to a subrepo of 'main', returning its changeset
+    def main_commit(self, fs:FileSystem, name:str) -> str:
+        fs.append_to_file(Path("main").joinpath(name, "Readme.txt"), content=FileContent("Local\n"), mode="a")
+        self.main_git(fs, "commit -m Local -a", name)
+        return self.main_cs(fs, name)
+    #f state_cs - get the changeset of a subrepo from the state file of 'main'
+    def state_cs(self, fs:FileSystem, name:str) -> Optional[str]:
+        return self.toplevel(fs).configured_config_state.state_file_config.get_repo_cs(name)
+    #f test_update_selected
+    def test_update_selected(self) -> None:
+        """
+        Update just s1 after upstream moved both subrepos; s2 is not moved, but
+        the state must keep its upstream changeset rather than the one from before the update
+        """
+        fs = FileSystem(log=self._logger)
+        (grip, origins) = self.make_tree(fs, workflow="readonly")
+        old_s2 = self.main_cs(fs, "s2")
+        new_cs = {n:self.commit(r) for (n,r) in origins.items()}
+        grip.create_file(Path(".grip/state.toml"), content=self.state_toml(new_cs))
+        grip_cs = self.commit(grip)
+        toplevel = self.toplevel(fs)
+        toplevel.fetch()
+        toplevel.update(repos=["s1"])
+        self.assertEqual(self.main_cs(fs), grip_cs)
+        self.assertEqual(self.main_cs(fs, "s1"), new_cs["s1"])
+        self.assertEqual(self.main_cs(fs, "s2"), old_s2)
+        self.assertEqual(self.state_cs(fs, "s1"), new_cs["s1"])
+        self.assertEqual(self.state_cs(fs, "s2"), new_cs["s2"])
+        self.assertEqual(self.main_git(fs, "status --porcelain .grip/state.toml"), "")
+        fs.cleanup()
+        pass
+    #f test_commit_modified
+    def test_commit_modified(self) -> None:
+        """
+        Commit with both subrepos of a 'readonly' workflow grip repository
+        modified; both are refused (and so the grip repository is not
+        committed) unless modified files are ignored
+        """
+        fs = FileSystem(log=self._logger)
+        self.make_tree(fs, workflow="readonly")
+        for n in self.subrepo_names:
+            fs.append_to_file(Path("main").joinpath(n, "Readme.txt"), content=FileContent("Local\n"), mode="a")
+            pass
+        with self.assertRaisesRegex(SubrepoError, "Commit failed for repos: s1, s2, <toplevel>"):
+            self.toplevel(fs).commit()
+            pass
+        options = Options()
+        setattr(options, "ignore_modified", True)
+        self.toplevel(fs, options=options).commit()
+        for n in self.subrepo_names:
+            self.assertEqual(self.main_git(fs, "status --porcelain", n), "M Readme.txt")
+            pass
+        fs.cleanup()
+        pass
+    #f test_commit_message
+    def test_commit_message(self) -> None:
+        """
+        Commit with one subrepo of a 'single' workflow grip repository modified,
+        which is committed with the message given; the workflow then
+        refuses it as it is not upstreamed, so the state is not updated
+        """
+        fs = FileSystem(log=self._logger)
+        self.make_tree(fs, workflow="single")
+        cs = {n:self.main_cs(fs, n) for n in self.subrepo_names}
+        fs.append_to_file(Path("main/s1/Readme.txt"), content=FileContent("Local\n"), mode="a")
+        options = Options()
+        setattr(options, "message", "Local change")
+        with self.assertRaisesRegex(SubrepoError, "Commit failed for repos: s1, <toplevel>"):
+            self.toplevel(fs, options=options).commit()
+            pass
+        self.assertEqual(self.main_git(fs, "log -1 --format=%s", "s1"), "Local change")
+        self.assertEqual(self.main_git(fs, "status --porcelain", "s1"), "")
+        self.assertNotEqual(self.main_cs(fs, "s1"), cs["s1"])
+        self.assertEqual(self.main_cs(fs, "s2"), cs["s2"])
+        for n in self.subrepo_names:
+            self.assertEqual(self.state_cs(fs, n), cs[n])
+            pass
+        fs.cleanup()
+        pass
+    #f test_revoke_makefile_stamps
+    def test_revoke_makefile_stamps(self) -> None:
+        """
+        Change the exec of s1.build, on which s2.build depends (and s2.test on that);
+        only those stamps (and those of the global stages of them) must be revoked
+        """
+        fs = FileSystem(log=self._logger)
+        stages = ["build", "test"]
+        def repo_stages(s1_build:str) -> Dict[str,str]:
+            return {"s1":'build={exec="%s"}\ntest={exec="s1 test"}\n'%s1_build,
+                    "s2":'build={exec="s2 build", requires=["s1.build"]}\ntest={exec="s2 test", requires=["s2.build"]}\n'}
+        (grip, origins) = self.make_tree(fs, workflow="readonly", stages=stages, repo_stages=repo_stages("s1 build"))
+        stamps = fs.abspath(Path("main/.grip/local.makefile_stamps"))
+        fingerprints = fs.abspath(Path("main/.grip/local.makefile_fingerprints.toml"))
+        all_stamps = ["build", "repo.s1.build", "repo.s1.test", "repo.s2.build", "repo.s2.test", "test"]
+        def remaining_stamps(s1_build:str) -> List[str]:
+            for t in all_stamps: stamps.joinpath(t).touch()
+            fs.create_file(Path("main/.grip/grip.toml"), content=self.grip_toml("readonly", origins, stages, repo_stages(s1_build)))
+            self.toplevel(fs).create_grip_makefiles()
+            return sorted([p.name for p in stamps.iterdir()])
+        self.assertEqual(remaining_stamps("s1 build"), all_stamps)
+        self.assertEqual(remaining_stamps("s1 build changed"), ["repo.s1.test"])
+        self.assertEqual(remaining_stamps("s1 build changed"), all_stamps)
+        fingerprints.unlink()
+        self.assertEqual(remaining_stamps("s1 build changed"), [])
+        fingerprints.write_text("not [ toml")
+        self.assertEqual(remaining_stamps("s1 build changed"), [])
+        self.assertEqual(remaining_stamps("s1 build changed"), all_stamps)
+        fs.cleanup()
+        pass
+    #f test_publish_prepush_failure
+    def test_publish_prepush_failure(self) -> None:
+        """
+        Publish after committing to both subrepos, when s2 cannot be pushed
+        as its origin has moved on; nothing must be pushed, not even s1
+        """
+        fs = FileSystem(log=self._logger)
+        (grip, origins) = self.make_tree(fs, workflow="single")
+        origin_cs = {n:r.git_repo.get_cs() for (n,r) in origins.items()}
+        for n in self.subrepo_names: self.main_commit(fs, n)
+        origin_cs["s2"] = self.commit(origins["s2"])
+        toplevel = self.toplevel(fs)
+        with self.assertRaisesRegex(SubrepoError, "Prepush failed for repos: s2, <toplevel> - nothing has been pushed"):
+            toplevel.publish()
+            pass
+        self.assertEqual({n:r.git_repo.get_cs() for (n,r) in origins.items()}, origin_cs)
+        fs.cleanup()
+        pass
+    pass
+
+#a Toplevel
+#f Create tests
+test_suite = [ToplevelUnitTest]